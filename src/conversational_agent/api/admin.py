@@ -0,0 +1,33 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, HTTPException
+
+from conversational_agent.config.dependencies.rag import get_rag_config
+from conversational_agent.data_models.api_models import IndexReleaseInfo
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def admin_router():
+    router = APIRouter(prefix="/admin", tags=["admin"])
+
+    @router.post("/rag/reload")
+    async def reload_rag_index() -> IndexReleaseInfo:
+        """Swap in the latest published index releases now, rather than at the next check."""
+        if not get_rag_config().enabled:
+            raise HTTPException(409, detail="RAG is disabled")
+        # Imported lazily so pyserini (and the JVM) are only loaded when RAG is enabled
+        from conversational_agent.services.rag_service import get_rag_service
+
+        # Opening the searchers blocks, keep it off the event loop
+        rag_service = await asyncio.to_thread(get_rag_service)
+        reloaded = await asyncio.to_thread(rag_service.reload)
+        return IndexReleaseInfo(
+            version=rag_service.version,
+            reloaded=reloaded,
+            open_tenants=rag_service.open_tenants,
+        )
+
+    return router
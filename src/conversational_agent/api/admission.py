@@ -0,0 +1,178 @@
+import json
+from uuid import UUID
+
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.websockets import WebSocketClose
+
+from conversational_agent.services.admission_service import (
+    AdmissionController,
+    RequestPriority,
+    get_admission_controller,
+)
+
+
+class AdmissionMiddleware:
+    """Sheds agent requests (fast 429/503 with Retry-After) before any DB or LLM work is done.
+
+    Plain ASGI rather than `BaseHTTPMiddleware`: it runs on every agent request, so it avoids the
+    extra task and response streaming the latter adds. Only `start_conversation` bodies (tiny) are
+    read, to rate limit by customer and learn which customer each new conversation belongs to.
+
+    Chat WebSockets are admitted on connect (closed with 1013 when overloaded, 1008 when over the
+    rate) but don't hold an in-flight slot while open: they mostly idle between turns, and their
+    messages are charged to the customer's rate one by one by the chat socket service.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or not scope["path"].startswith("/agent/"):
+            await self.app(scope, receive, send)
+            return
+        controller = get_admission_controller()
+        if not controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        priority, conversation_id = _classify(scope["path"])
+        if scope["type"] == "websocket":
+            await self._admit_websocket(scope, receive, send, controller, priority, conversation_id)
+            return
+
+        customer_id = None
+        if scope["path"] == "/agent/start_conversation":
+            body, receive = await _buffer_body(receive)
+            customer_id = _parse_uuid(body, "customer_id")
+            send = _register_new_conversation(controller, customer_id, send)
+
+        rejection = controller.admit(
+            priority,
+            _client_ip(scope, controller.trust_forwarded_for),
+            controller.customer_key(customer_id, conversation_id),
+        )
+        if rejection is not None:
+            response = JSONResponse(
+                {"detail": rejection.detail},
+                status_code=rejection.status_code,
+                headers={"Retry-After": str(rejection.retry_after_s)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
+
+    async def _admit_websocket(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        controller: AdmissionController,
+        priority: RequestPriority,
+        conversation_id: UUID | None,
+    ) -> None:
+        rejection = controller.admit(
+            priority,
+            _client_ip(scope, controller.trust_forwarded_for),
+            controller.customer_key(None, conversation_id),
+        )
+        if rejection is not None:
+            code = (
+                status.WS_1013_TRY_AGAIN_LATER
+                if rejection.status_code == 503
+                else status.WS_1008_POLICY_VIOLATION
+            )
+            # Closing before accepting refuses the handshake
+            await WebSocketClose(code, rejection.detail)(scope, receive, send)
+            return
+        controller.release()
+        await self.app(scope, receive, send)
+
+
+def _classify(path: str) -> tuple[RequestPriority, UUID | None]:
+    """Priority of an agent request, and the conversation it continues (if any)."""
+    match path.strip("/").split("/"):
+        case (
+            ["agent", "chat", conversation_id]
+            | ["agent", "ws", conversation_id]
+            | ["agent", conversation_id, "summary"]
+        ):
+            return RequestPriority.ONGOING, _to_uuid(conversation_id)
+        case _:
+            return RequestPriority.NEW, None
+
+
+async def _buffer_body(receive: Receive) -> tuple[bytes, Receive]:
+    """Read the whole request body, returning it and a `receive` replaying it to the app."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+def _register_new_conversation(
+    controller: AdmissionController, customer_id: UUID | None, send: Send
+) -> Send:
+    """Wrap `send` to record the owner of the conversation created by `start_conversation`."""
+    if customer_id is None:
+        return send
+    status_code = 0
+    chunks: list[bytes] = []
+
+    async def wrapped_send(message: Message) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body" and status_code == 200:
+            chunks.append(message.get("body", b""))
+            body_complete = not message.get("more_body", False)
+            if body_complete and (
+                conversation_id := _parse_uuid(b"".join(chunks), "conversation_id")
+            ):
+                controller.register_conversation(conversation_id, customer_id)
+        await send(message)
+
+    return wrapped_send
+
+
+def _client_ip(scope: Scope, trust_forwarded_for: bool) -> str | None:
+    if trust_forwarded_for:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _parse_uuid(body: bytes, field: str) -> UUID | None:
+    try:
+        return _to_uuid(json.loads(body).get(field))
+    except (ValueError, AttributeError):
+        return None
+
+
+def _to_uuid(value: object) -> UUID | None:
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
@@ -1,9 +1,11 @@
 import logging
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, WebSocket
 
 from conversational_agent.config.dependencies.database import SessionDep
+from conversational_agent.config.dependencies.rag import TENANT_PATTERN
 from conversational_agent.data_models.api_models import (
     ChatRequest,
     ChatResponse,
@@ -12,9 +14,11 @@ from conversational_agent.data_models.api_models import (
     StartConversationRequest,
     StartConversationResponse,
 )
-from conversational_agent.data_models.db_models import Customer
-from conversational_agent.services.agent_service import get_agent_service
-from conversational_agent.services.llm_service import get_llm_service
+from conversational_agent.services.agent_service import AgentServiceDep
+from conversational_agent.services.chat_socket_service import ChatSocketServiceDep
+from conversational_agent.services.deadline import DEADLINE_HEADER, Deadline
+from conversational_agent.services.index_releases import TENANT_HEADER
+from conversational_agent.services.llm_service import LLMServiceDep
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -24,31 +28,60 @@ def agent_router():
     router = APIRouter(prefix="/agent", tags=["agent"])
 
     @router.post("/log_in")
-    async def log_in_user(request: LogInRequest, session: SessionDep) -> LogInResponse:
-        service = get_agent_service()
+    async def log_in_user(
+        request: LogInRequest, session: SessionDep, service: AgentServiceDep
+    ) -> LogInResponse:
         return await service.log_in_user(request, session)
 
     @router.post("/start_conversation")
     async def start_conversation(
-        request: StartConversationRequest, session: SessionDep
+        request: StartConversationRequest, session: SessionDep, service: AgentServiceDep
     ) -> StartConversationResponse:
-        service = get_agent_service()
-        customer = await session.get(Customer, request.customer_id)
-        if not customer:
+        if not await service.customer_exists(request.customer_id, session):
             raise HTTPException(401, detail="Customer not recognized - please log in first.")
 
         return await service.start_conversation(request, session)
 
     @router.post("/chat/{conversation_id}")
     async def chat(
-        conversation_id: UUID, request: ChatRequest, session: SessionDep
+        conversation_id: UUID,
+        request: ChatRequest,
+        session: SessionDep,
+        service: LLMServiceDep,
+        deadline_ms: Annotated[
+            int | None,
+            Header(alias=DEADLINE_HEADER, gt=0, description="Client-side time budget"),
+        ] = None,
+        tenant: Annotated[
+            str | None,
+            Header(
+                alias=TENANT_HEADER,
+                pattern=TENANT_PATTERN,
+                description="Tenant whose knowledge base is searched (default: the customer's)",
+            ),
+        ] = None,
     ) -> ChatResponse:
-        service = get_llm_service()
-        return await service.chat(conversation_id, request, session)
+        deadline = Deadline.for_chat(deadline_ms)
+        response = await service.chat(conversation_id, request, session, deadline, tenant)
+        # Save the turn before responding (rather than after the response is built), even past the
+        # deadline: the reply is only returned once it is saved
+        await deadline.run_to_completion("commit", session.commit())
+        return response
+
+    @router.websocket("/ws/{conversation_id}")
+    async def chat_socket(
+        websocket: WebSocket,
+        conversation_id: UUID,
+        service: ChatSocketServiceDep,
+        last_seq: int | None = None,
+    ):
+        """Chat over a WebSocket kept open for the conversation (pass `last_seq` to resume)."""
+        await service.serve(websocket, conversation_id, last_seq)
 
     @router.get("/{conversation_id}/summary")
-    async def conversation_summary(conversation_id: UUID, session: SessionDep) -> str:
-        service = get_llm_service()
+    async def conversation_summary(
+        conversation_id: UUID, session: SessionDep, service: LLMServiceDep
+    ) -> str:
         return await service.summarize_conversation(conversation_id, session)
 
     return router
@@ -1,10 +1,20 @@
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from conversational_agent.api.admin import admin_router
+from conversational_agent.api.admission import AdmissionMiddleware
 from conversational_agent.api.agent import agent_router
+from conversational_agent.api.support import support_router
+from conversational_agent.api.usage import usage_router
+from conversational_agent.config.dependencies.container import get_container
 from conversational_agent.config.dependencies.database import init_db
+from conversational_agent.services.metrics import get_metrics
+from conversational_agent.services.warmup_service import get_warmup_service
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -15,9 +25,37 @@ async def health():
     return {"status": "ok"}
 
 
+async def ready(response: Response):
+    """Readiness probe: only succeeds once the process has finished warming up."""
+    warmup_service = get_warmup_service()
+    if not warmup_service.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "warming_up", "failed_steps": warmup_service.failed_steps}
+    return {"status": "ready"}
+
+
+async def metrics():
+    """Process metrics (e.g chat stage timings and timeouts) in the Prometheus text format."""
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Build resources on startup and dispose of them (DB pool, HTTP clients, searchers) on shutdown."""
+    # Initialize DB (create tables, etc.)
+    await init_db()
+    # Optionally warm up expensive resources in the background once the DB is initialized
+    await get_warmup_service().start()
+    yield
+    await get_container().aclose()
+
+
 def app():
-    fastapi_app = FastAPI(version="0.1.0")
+    fastapi_app = FastAPI(version="0.1.0", lifespan=lifespan)
 
+    # Shed agent requests over the configured rates/capacity (added first so that CORS headers
+    # still wrap its 429/503 responses)
+    fastapi_app.add_middleware(AdmissionMiddleware)
     fastapi_app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -26,12 +64,15 @@ def app():
         allow_headers=["*"],
     )
 
-    # Initialize DB on startup (create tables, etc.)
-    fastapi_app.add_event_handler("startup", init_db)
-    # Simple health check endpoint
+    # Simple health check endpoint (liveness) and readiness endpoint (only ready once warm)
     fastapi_app.add_api_route("/health", health, tags=["health"])
+    fastapi_app.add_api_route("/ready", ready, tags=["health"])
+    fastapi_app.add_api_route("/metrics", metrics, tags=["health"])
 
     # Add routers for different API areas in the application
     fastapi_app.include_router(agent_router())
+    fastapi_app.include_router(support_router())
+    fastapi_app.include_router(usage_router())
+    fastapi_app.include_router(admin_router())
 
     return fastapi_app
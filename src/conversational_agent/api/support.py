@@ -0,0 +1,84 @@
+import logging
+from uuid import UUID
+
+from fastapi import APIRouter, Query, Response
+from fastapi import status as http_status
+
+from conversational_agent.config.dependencies.database import ReadSessionDep, SessionDep
+from conversational_agent.data_models.api_models import (
+    ClaimIssueRequest,
+    ConversationInfo,
+    IssueInfo,
+    IssueSearchHit,
+    Page,
+    TranscriptTurn,
+)
+from conversational_agent.data_models.db_models import IssueStatus, IssueType, UrgencyLevel
+from conversational_agent.services.pagination import MAX_PAGE_SIZE
+from conversational_agent.services.search_service import SearchServiceDep
+from conversational_agent.services.support_service import SupportServiceDep
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def support_router():
+    router = APIRouter(prefix="/support", tags=["support"])
+
+    @router.get("/search")
+    async def search_issues(
+        session: ReadSessionDep,
+        service: SearchServiceDep,
+        q: str = Query(min_length=1, description="Free-text query over issues and transcripts"),
+        issue_type: IssueType | None = None,
+        urgency: UrgencyLevel | None = None,
+        status: IssueStatus | None = None,
+        customer_id: UUID | None = None,
+        limit: int = Query(default=20, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+    ) -> Page[IssueSearchHit]:
+        return await service.search_issues(
+            session, q, issue_type, urgency, status, customer_id, limit, cursor
+        )
+
+    @router.get("/customers/{customer_id}/conversations")
+    async def list_customer_conversations(
+        customer_id: UUID,
+        session: ReadSessionDep,
+        service: SupportServiceDep,
+        limit: int = Query(default=20, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+    ) -> Page[ConversationInfo]:
+        return await service.list_conversations(session, customer_id, limit, cursor)
+
+    @router.get("/conversations/{conversation_id}/transcript")
+    async def get_transcript(
+        conversation_id: UUID, session: ReadSessionDep, service: SupportServiceDep
+    ) -> list[TranscriptTurn]:
+        return await service.get_transcript(session, conversation_id)
+
+    @router.get("/issues")
+    async def list_issues(
+        session: ReadSessionDep,
+        service: SupportServiceDep,
+        status: IssueStatus = IssueStatus.REQUIRES_MANUAL_REVIEW,
+        urgency: UrgencyLevel | None = None,
+        limit: int = Query(default=20, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+    ) -> Page[IssueInfo]:
+        return await service.list_issues(session, status, urgency, limit, cursor)
+
+    @router.post(
+        "/queue/claim",
+        response_model=IssueInfo,
+        responses={http_status.HTTP_204_NO_CONTENT: {"description": "No issue awaiting review"}},
+    )
+    async def claim_next_issue(
+        request: ClaimIssueRequest, session: SessionDep, service: SupportServiceDep
+    ):
+        issue = await service.claim_next_issue(session, request.agent)
+        if issue is None:
+            return Response(status_code=http_status.HTTP_204_NO_CONTENT)
+        return issue
+
+    return router
@@ -0,0 +1,29 @@
+import logging
+from datetime import datetime
+
+from fastapi import APIRouter
+
+from conversational_agent.config.dependencies.database import ReadSessionDep
+from conversational_agent.data_models.api_models import UsageGroupBy, UsageReportRow
+from conversational_agent.data_models.db_models import CallType
+from conversational_agent.services.usage_service import UsageServiceDep
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def usage_router():
+    router = APIRouter(prefix="/usage", tags=["usage"])
+
+    @router.get("/report")
+    async def usage_report(
+        session: ReadSessionDep,
+        service: UsageServiceDep,
+        group_by: UsageGroupBy = UsageGroupBy.DAY,
+        call_type: CallType | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[UsageReportRow]:
+        return await service.report(session, group_by, call_type, since, until)
+
+    return router
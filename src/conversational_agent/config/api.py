@@ -1,6 +1,27 @@
+import asyncio
+import gc
+import os
+import signal
+import socket
+import time
+from logging import getLogger
+
 import uvicorn
 
 from conversational_agent.api.endpoints import app
+from conversational_agent.config.dependencies.api import get_api_config
+from conversational_agent.config.dependencies.database import get_db_config
+from conversational_agent.config.dependencies.rag import get_rag_config
+from conversational_agent.config.dependencies.sqlite import is_in_memory_sqlite
+from conversational_agent.services.document_store import get_document_store
+
+logger = getLogger(__name__)
+
+# Backoff of respawning workers that die early (doubling on each failure in a row, up to the max)
+_RESPAWN_BACKOFF_S = 1.0
+_MAX_RESPAWN_BACKOFF_S = 30.0
+# Workers dying after serving this long are respawned right away
+_WORKER_STABLE_S = 60.0
 
 
 def api_server(host: str = "0.0.0.0", port: int = 5020):
@@ -12,3 +33,104 @@ def api_server(host: str = "0.0.0.0", port: int = 5020):
 async def run_api_server(host: str = "0.0.0.0", port: int = 5020):
     server = api_server(host, port)
     await server.serve()
+
+
+def preload_shared_assets() -> None:
+    """Load read-only assets in the parent process so forked workers share their memory pages.
+
+    NOTE: nothing started here may own sockets, threads or the JVM (e.g the Lucene searcher), since
+    those do not survive a fork. Those are built per worker by the (per-process) singletons.
+    """
+    if get_rag_config().enabled:
+        get_document_store()
+    # Move everything loaded so far (modules, prompt templates, shared assets) out of the GC's reach
+    # so collections in the workers don't dirty (and therefore copy) the shared pages
+    gc.freeze()
+
+
+def run_api_workers(
+    host: str = "0.0.0.0", port: int = 5020, workers: int = 2, max_respawns: int = 5
+) -> None:
+    """Pre-fork serving mode: bind once, load shared assets, then fork `workers` uvicorn servers
+    accepting connections from the same listening socket.
+
+    Workers that die are respawned, after an exponential backoff if they died soon after starting
+    (e.g a bad config or an unreachable DB). After `max_respawns` such failures in a row the other
+    workers are stopped and a `RuntimeError` raised, rather than fork-looping forever.
+
+    Refuses to start (`RuntimeError`) on an in-memory SQLite DB: each worker would get its own
+    empty one, requests seeing different data depending on the worker they land on.
+    """
+    if is_in_memory_sqlite(get_db_config().url):
+        raise RuntimeError(
+            "API workers need a shared DB: set DB_CONFIG__URL to a SQLite file or a DB server"
+        )
+    preload_shared_assets()
+    sock = uvicorn.Config(app, host=host, port=port).bind_socket()
+    # Start time of each running worker
+    pids = {_spawn_worker(sock, host, port): time.monotonic() for _ in range(workers)}
+    shutting_down = False
+    failures = 0
+
+    def _shutdown(signum: int, _frame) -> None:
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(pids):
+            os.kill(pid, signum)
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    while pids:
+        pid, status = os.wait()
+        started_at = pids.pop(pid, None)
+        if shutting_down or started_at is None:
+            continue
+        # A worker that served for a while before dying is not failing to start
+        if time.monotonic() - started_at >= _WORKER_STABLE_S:
+            failures, delay = 0, 0.0
+        else:
+            failures += 1
+            delay = min(_RESPAWN_BACKOFF_S * 2 ** (failures - 1), _MAX_RESPAWN_BACKOFF_S)
+        if failures > max_respawns:
+            logger.error(f"API worker {pid} exited with status {status}, giving up respawning")
+            _shutdown(signal.SIGTERM, None)
+            continue
+        logger.warning(
+            f"API worker {pid} exited with status {status}, respawning in {delay:.0f}s..."
+        )
+        time.sleep(delay)
+        if not shutting_down:
+            pids[_spawn_worker(sock, host, port)] = time.monotonic()
+    sock.close()
+    if failures > max_respawns:
+        raise RuntimeError(f"API workers failed {failures} times in a row")
+
+
+def _spawn_worker(sock: socket.socket, host: str, port: int) -> int:
+    pid = os.fork()
+    if pid != 0:
+        logger.info(f"Started API worker {pid}")
+        return pid
+
+    # Worker process: let uvicorn install its own signal handlers and serve until told to stop
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    exit_code = 0
+    try:
+        api_server(host, port).run(sockets=[sock])
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+if __name__ == "__main__":
+    api_config = get_api_config()
+    if api_config.workers > 1:
+        run_api_workers(
+            api_config.host, api_config.port, api_config.workers, api_config.worker_max_respawns
+        )
+    else:
+        asyncio.run(run_api_server(api_config.host, api_config.port))
@@ -0,0 +1,50 @@
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from conversational_agent.utils import singleton
+
+
+class AdmissionConfig(BaseSettings):
+    """Admission control (rate limiting and load shedding) settings for the agent endpoints."""
+
+    enabled: bool = Field(default=False, description="Whether to apply admission control")
+    customer_rate_per_s: float = Field(
+        default=1.0, gt=0, description="Sustained requests per second allowed per customer"
+    )
+    customer_burst: int = Field(
+        default=5, ge=1, description="Requests a customer can make in a burst"
+    )
+    ip_rate_per_s: float = Field(
+        default=5.0, gt=0, description="Sustained requests per second allowed per client IP"
+    )
+    ip_burst: int = Field(default=20, ge=1, description="Requests a client IP can make in a burst")
+    max_in_flight: int = Field(
+        default=64, ge=1, description="Max agent requests processed at once by this process"
+    )
+    reserved_for_ongoing: float = Field(
+        default=0.25,
+        ge=0,
+        lt=1,
+        description="Share of `max_in_flight` only usable by conversations already in progress",
+    )
+    overload_retry_after_s: int = Field(
+        default=1, ge=1, description="Retry-After sent when shedding load (503)"
+    )
+    trust_forwarded_for: bool = Field(
+        default=False,
+        description="Take the client IP from X-Forwarded-For (only behind a trusted proxy)",
+    )
+
+    # Admission config settings can be passed as env vars (e.g in .env file) and must match "ADMISSION__<ATTR>"
+    model_config = SettingsConfigDict(
+        env_prefix="ADMISSION__",
+        env_nested_delimiter="__",
+        env_file=".env",
+        extra="ignore",
+    )
+
+
+@singleton
+def get_admission_config() -> AdmissionConfig:
+    """Get the admission control configuration."""
+    return AdmissionConfig()
@@ -0,0 +1,73 @@
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from conversational_agent.utils import singleton
+
+
+class APIConfig(BaseSettings):
+    """API server configuration settings."""
+
+    host: str = Field(default="0.0.0.0", description="Interface the API server binds to")
+    port: int = Field(default=5020, description="Port the API server listens on")
+    workers: int = Field(
+        default=1,
+        ge=1,
+        description="Number of API worker processes (forked from a parent sharing read-only assets)",
+    )
+    worker_max_respawns: int = Field(
+        default=5,
+        ge=0,
+        description="Consecutive failed worker respawns (with backoff) before the server gives up",
+    )
+    warm_up: bool = Field(
+        default=False,
+        description="Whether to prime the RAG index, DB pool and LLM provider connection on startup",
+    )
+    ws_heartbeat_s: float = Field(
+        default=20.0,
+        gt=0,
+        description="Interval of chat WebSocket pings (sockets silent for 2 intervals are closed)",
+    )
+    ws_max_pending_messages: int = Field(
+        default=4,
+        ge=1,
+        description="User messages queued per chat WebSocket before new ones are refused as busy",
+    )
+    ws_replay_events: int = Field(
+        default=50, ge=0, description="Chat WebSocket events kept per conversation for resuming"
+    )
+    ws_resume_ttl_s: float = Field(
+        default=300.0,
+        gt=0,
+        description="How long a disconnected chat WebSocket can resume without missing events",
+    )
+    chat_deadline_ms: int = Field(
+        default=30_000,
+        ge=0,
+        description="Time budget of a chat turn (0: none), clients can shorten it via a header",
+    )
+    chat_commit_reserve_ms: int = Field(
+        default=500, ge=0, description="Budget kept for saving the turn once a reply is ready"
+    )
+    chat_min_llm_budget_ms: int = Field(
+        default=3_000,
+        ge=0,
+        description="Budget retrieval must leave to the LLM, else it is skipped or cut short",
+    )
+    chat_min_retrieval_budget_ms: int = Field(
+        default=200, ge=0, description="Retrieval is skipped when it would get less than this"
+    )
+
+    # API config settings can be passed as env vars (e.g in .env file) and must match "API__<ATTR__SUBATTR>"
+    model_config = SettingsConfigDict(
+        env_prefix="API__",
+        env_nested_delimiter="__",
+        env_file=".env",
+        extra="ignore",  # Ignore unrecognized env vars in .env
+    )
+
+
+@singleton
+def get_api_config() -> APIConfig:
+    """Get the API server configuration."""
+    return APIConfig()
@@ -0,0 +1,34 @@
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from conversational_agent.utils import singleton
+
+
+class ArchiveConfig(BaseSettings):
+    """Settings of the job archiving finished conversations into cold storage."""
+
+    older_than_days: float = Field(
+        default=30,
+        gt=0,
+        description="Archive resolved/closed conversations idle (no new turn) for this long",
+    )
+    batch_size: int = Field(
+        default=100, ge=1, description="Conversations archived per (short) transaction"
+    )
+    pause_s: float = Field(
+        default=0.5, ge=0, description="Pause between batches, leaving the DB to live traffic"
+    )
+
+    # Archive config settings can be passed as env vars (e.g in .env file) and must match "ARCHIVE__<ATTR>"
+    model_config = SettingsConfigDict(
+        env_prefix="ARCHIVE__",
+        env_nested_delimiter="__",
+        env_file=".env",
+        extra="ignore",
+    )
+
+
+@singleton
+def get_archive_config() -> ArchiveConfig:
+    """Get the archival job configuration."""
+    return ArchiveConfig()
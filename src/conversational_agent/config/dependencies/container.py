@@ -0,0 +1,129 @@
+"""Lifespan-managed container for the application's long-lived resources.
+
+Resources (DB engine, OpenAI client, RAG searcher, services, ...) are declared with the `@resource`
+decorator on their zero-argument factory. The decorated factory:
+- builds its resource exactly once per process, even under concurrent first access,
+- can be used directly as a FastAPI dependency (e.g `Depends(get_llm_service)`),
+- can be swapped for tests/benchmarks via `get_container().override(...)` (or FastAPI's
+  `app.dependency_overrides`),
+- is torn down (in reverse creation order) when the container is closed at app shutdown.
+"""
+
+import inspect
+import os
+import threading
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from functools import wraps
+from logging import getLogger
+from typing import Any, TypeVar
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+Teardown = Callable[[Any], Awaitable[None] | None]
+
+
+class ServiceContainer:
+    """Process-wide registry of built resources and their teardown callbacks."""
+
+    def __init__(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._factory_locks: dict[Callable, threading.RLock] = {}
+        self._instances: dict[Callable, Any] = {}
+        self._overrides: dict[Callable, Any] = {}
+        self._teardowns: list[tuple[Callable, Teardown]] = []
+
+    def resolve(
+        self, key: Callable[[], T], factory: Callable[[], T], teardown: Teardown | None
+    ) -> T:
+        """Get the resource registered under `key`, building it with `factory` on first access."""
+        if key in self._overrides:
+            return self._overrides[key]
+        self._reset_if_forked()
+        if key in self._instances:
+            return self._instances[key]
+
+        with self._lock:
+            factory_lock = self._factory_locks.setdefault(key, threading.RLock())
+        # Per-factory lock: concurrent first callers wait for a single build, while factories
+        # resolving other resources (e.g LLMService -> OpenAI client) don't deadlock each other
+        with factory_lock:
+            if key not in self._instances:
+                instance = factory()
+                self._instances[key] = instance
+                if teardown is not None:
+                    self._teardowns.append((key, teardown))
+                logger.info(f"Built resource {_name(factory)}")
+            return self._instances[key]
+
+    @contextmanager
+    def override(self, key: Callable[[], T], instance: T) -> Iterator[T]:
+        """Temporarily resolve `key` to `instance` (e.g a fake service in tests/benchmarks)."""
+        previous = self._overrides.get(key, _MISSING)
+        self._overrides[key] = instance
+        try:
+            yield instance
+        finally:
+            if previous is _MISSING:
+                self._overrides.pop(key, None)
+            else:
+                self._overrides[key] = previous
+
+    async def aclose(self) -> None:
+        """Tear down every built resource (most recently built first) and forget them."""
+        with self._lock:
+            teardowns, self._teardowns = self._teardowns, []
+            instances, self._instances = self._instances, {}
+
+        for key, teardown in reversed(teardowns):
+            try:
+                result = teardown(instances[key])
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Failed to tear down {_name(key)}: {e}", exc_info=True)
+
+    def _reset_if_forked(self) -> None:
+        # Resources built by a parent process (sockets, threads, JVM) are unusable after a fork:
+        # forget them (without tearing them down, they still belong to the parent)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._factory_locks = {}
+                    self._instances = {}
+                    self._teardowns = []
+
+
+_MISSING = object()
+
+
+def _name(factory: Callable) -> str:
+    return getattr(factory, "__qualname__", repr(factory))
+
+
+_container = ServiceContainer()
+
+
+def get_container() -> ServiceContainer:
+    """Get the process-wide service container."""
+    return _container
+
+
+def resource(teardown: Teardown | None = None) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """Declare a zero-argument factory as a container-managed resource.
+
+    `teardown` is called with the built instance when the container is closed and may be async.
+    """
+
+    def decorator(factory: Callable[[], T]) -> Callable[[], T]:
+        @wraps(factory)
+        def wrapper() -> T:
+            return _container.resolve(wrapper, factory, teardown)
+
+        return wrapper
+
+    return decorator
@@ -1,10 +1,16 @@
-from collections.abc import AsyncIterator
+import asyncio
+import itertools
+import time
+from collections.abc import AsyncIterator, Callable
 from http.client import HTTPException
 from logging import getLogger
+from typing import Literal
 
 from fastapi import Depends
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -16,6 +22,14 @@ from typing_extensions import Annotated
 
 # Ensure models are imported so SQLModel metadata is populated
 import conversational_agent.data_models  # noqa: F401
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.sqlite import (
+    create_embedded_sqlite_engine,
+    create_sqlite_reader_engine,
+    is_embedded_sqlite,
+)
+from conversational_agent.data_models.search_index import create_search_indexes
+from conversational_agent.migrations import run_migrations
 from conversational_agent.utils import singleton
 
 logger = getLogger(__name__)
@@ -24,8 +38,30 @@ logger = getLogger(__name__)
 class DatabaseConfig(BaseSettings):
     """Database configuration settings."""
 
-    # Use in-memory SQLite by default (use e.g PostgreSQL for robustness via env vars)
+    # Use in-memory SQLite by default (use e.g PostgreSQL for robustness via env vars, or a SQLite
+    # file such as "sqlite+aiosqlite:///storage/agent.db" for single-node deployments)
     url: str = Field(default="sqlite+aiosqlite:///:memory:")
+    # Optional read replicas of `url`, load-balanced by read-only endpoints (see `ReadSessionDep`)
+    replica_urls: list[str] = Field(default_factory=list)
+    max_replica_lag_s: float = Field(
+        default=5.0, ge=0, description="Replicas lagging further behind are skipped for reads"
+    )
+    replica_check_interval_s: float = Field(
+        default=10.0, gt=0, description="How long a replica's measured lag is trusted for"
+    )
+
+    # Embedded (SQLite file) mode settings, see `config/dependencies/sqlite.py`
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL"] = Field(
+        default="NORMAL", description="NORMAL: durable across crashes, not power losses (WAL)"
+    )
+    sqlite_cache_size_kib: int = Field(default=64 * 1024, ge=0, description="Page cache size")
+    sqlite_mmap_size_mb: int = Field(default=256, ge=0, description="Memory-mapped I/O size")
+    sqlite_busy_timeout_s: float = Field(
+        default=5.0, gt=0, description="Max wait for the write lock before failing"
+    )
+    sqlite_reader_pool_size: int = Field(
+        default=8, ge=1, description="Read-only connections used by read-only endpoints"
+    )
 
     # Database config settings can be passed as env vars (e.g in .env file) and must match "DB_CONFIG__<ATTR__SUBATTR>"
     model_config = SettingsConfigDict(
@@ -42,23 +78,152 @@ def get_db_config() -> DatabaseConfig:
     return DatabaseConfig()
 
 
-@singleton
+@resource(teardown=lambda engine: engine.dispose())
 def create_engine() -> AsyncEngine:
-    """Create the SQLAlchemy engine."""
+    """Create the SQLAlchemy engine (disposed of, closing pooled connections, on shutdown)."""
     db_config = get_db_config()
+    if is_embedded_sqlite(db_config.url):
+        return create_embedded_sqlite_engine(db_config)
     return create_async_engine(db_config.url, future=True)
 
 
+@resource()
+def get_session_maker() -> async_sessionmaker[AsyncSession]:
+    """Get the session factory bound to the configured engine."""
+    return async_sessionmaker(create_engine(), expire_on_commit=False)
+
+
+async def _dispose_all(engines: list[AsyncEngine]) -> None:
+    for engine in engines:
+        await engine.dispose()
+
+
+@resource(teardown=_dispose_all)
+def create_replica_engines() -> list[AsyncEngine]:
+    """Create one engine per configured read replica (disposed of on shutdown).
+
+    An embedded SQLite database without replicas gets a pool of read-only connections instead.
+    """
+    db_config = get_db_config()
+    if not db_config.replica_urls and is_embedded_sqlite(db_config.url):
+        return [create_sqlite_reader_engine(db_config)]
+    return [create_async_engine(url, future=True) for url in db_config.replica_urls]
+
+
+# Replication lag of a PostgreSQL standby, NULL when the server is not a standby. 0 when it streams
+# from the primary and has replayed everything it received (an idle primary would otherwise look
+# like growing lag). A standby that is not streaming (e.g its WAL receiver is disconnected) has
+# also replayed everything it received, so is measured by its last replayed transaction instead
+# (infinite if there is none)
+_PG_REPLICA_LAG = text(
+    """SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+            AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+            'Infinity'::float8
+        )
+    END"""
+)
+
+
+class ReplicaRouter:
+    """Round-robins read-only sessions across the replicas, skipping lagging or unreachable ones.
+
+    Each replica's lag is measured at most once per `replica_check_interval_s` (a failed check
+    counts as unusable until the next one). Reads fall back to the primary when no replica is
+    usable, so they are never failed because of replicas.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replicas: list[AsyncEngine],
+        max_lag_s: float,
+        check_interval_s: float,
+    ) -> None:
+        self._primary = primary
+        self._replicas = [async_sessionmaker(engine, expire_on_commit=False) for engine in replicas]
+        self._engines = replicas
+        self._max_lag_s = max_lag_s
+        self._check_interval_s = check_interval_s
+        self._next = itertools.cycle(range(len(replicas)))
+        # Per replica: (checked at, usable)
+        self._health: dict[int, tuple[float, bool]] = {}
+        self._locks = [asyncio.Lock() for _ in replicas]
+
+    async def session_maker(self) -> async_sessionmaker[AsyncSession]:
+        """Session factory of the next usable replica (the primary's if there is none)."""
+        for _ in range(len(self._replicas)):
+            index = next(self._next)
+            if await self._is_usable(index):
+                return self._replicas[index]
+        return self._primary
+
+    async def _is_usable(self, index: int) -> bool:
+        checked_at, usable = self._health.get(index, (float("-inf"), False))
+        if time.monotonic() - checked_at < self._check_interval_s:
+            return usable
+        async with self._locks[index]:
+            # Another request may have checked it while we waited
+            checked_at, usable = self._health.get(index, (float("-inf"), False))
+            if time.monotonic() - checked_at < self._check_interval_s:
+                return usable
+            usable = await self._check(self._engines[index])
+            self._health[index] = (time.monotonic(), usable)
+            return usable
+
+    async def _check(self, engine: AsyncEngine) -> bool:
+        try:
+            async with engine.connect() as conn:
+                if engine.dialect.name != "postgresql":
+                    # No replication lag to measure, reachable is good enough
+                    return True
+                lag_s = (await conn.execute(_PG_REPLICA_LAG)).scalar()
+        except Exception as e:
+            logger.warning(f"Read replica {engine.url.host} unreachable: {e}")
+            return False
+        if lag_s is not None and lag_s > self._max_lag_s:
+            logger.warning(f"Read replica {engine.url.host} lagging by {lag_s:.1f}s, skipping it")
+            return False
+        return True
+
+
+@resource()
+def get_replica_router() -> ReplicaRouter:
+    db_config = get_db_config()
+    return ReplicaRouter(
+        get_session_maker(),
+        create_replica_engines(),
+        db_config.max_replica_lag_s,
+        db_config.replica_check_interval_s,
+    )
+
+
+def get_dialect_insert(session: AsyncSession) -> Callable:
+    """Get the dialect-specific `insert` construct (supporting `ON CONFLICT`) for the session's DB."""
+    match session.get_bind().dialect.name:
+        case "postgresql":
+            return postgresql.insert
+        case "sqlite":
+            return sqlite.insert
+        case name:
+            raise NotImplementedError(f"Upserts are not supported for the '{name}' dialect")
+
+
 async def init_db() -> None:
-    """Initialize database tables."""
+    """Initialize database tables: create missing ones, then migrate existing ones (see
+    `conversational_agent.migrations`) and create the search indexes."""
     async with create_engine().begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(run_migrations)
+        await conn.run_sync(create_search_indexes)
 
 
 async def get_session() -> AsyncIterator[AsyncSession]:
     """Context manager to get a new database session from the configured engine."""
-    session_maker = async_sessionmaker(create_engine(), expire_on_commit=False)
-    session = session_maker()
+    session = get_session_maker()()
     try:
         yield session
         await session.commit()
@@ -75,3 +240,21 @@ async def get_session() -> AsyncIterator[AsyncSession]:
 
 # Annotated fastapi dependency for getting DB session
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
+
+
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Get a read-only session, from a read replica when any is configured and usable.
+
+    Data written in the last few seconds (up to `max_replica_lag_s`) may not be visible yet, so
+    only use it for endpoints that tolerate that and never write.
+    """
+    session = (await get_replica_router().session_maker())()
+    try:
+        yield session
+    finally:
+        # Nothing to commit: end the (read) transaction and return the connection to its pool
+        await session.close()
+
+
+# Annotated fastapi dependency for getting a read-only DB session (possibly on a replica)
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
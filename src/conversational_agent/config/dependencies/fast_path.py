@@ -0,0 +1,99 @@
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from conversational_agent.utils import singleton
+
+
+class FastPathConfig(BaseSettings):
+    """Settings of the rule-based stage replying to trivial chat turns without the LLM.
+
+    Patterns are matched in full against the normalized message: lowercased, with punctuation
+    other than apostrophes and `#` replaced by spaces.
+    """
+
+    enabled: bool = Field(default=False, description="Reply to trivial turns without the LLM")
+    # Defaults only match explicit ends of conversation: bare acknowledgements ("ok thanks",
+    # "perfect") usually answer the assistant's question, and "cancel"/"stop" are usually about
+    # an order in a support chat
+    close_patterns: list[str] = Field(
+        default_factory=lambda: [
+            r"(quit|exit|bye|goodbye)",
+            r"(never ?mind|i no longer need help|i don't need (any )?(more )?help( anymore)?)",
+            r"(no more help( needed)?|i'm done( here)?)( thanks| thank you)?",
+        ],
+        description="Messages closing the conversation (the customer no longer needs help)",
+    )
+    resolve_patterns: list[str] = Field(
+        default_factory=lambda: [
+            r"((ok |great )?(thanks|thank you)( (so|very) much)? )?that's (all|it)( for now)?"
+            r"( thanks| thank you)?",
+            r"(it's|that's|all|problem) (fixed|solved|sorted|resolved)( now)?( thanks| thank you)?",
+        ],
+        description="Messages resolving the conversation (the customer's issue is solved)",
+    )
+    order_number_pattern: str = Field(
+        default=r"(?:my )?order(?: number| no)?(?: is)? ?#? ?(\d{4,12})",
+        description="A message restating a labelled order number, captured by the first group",
+    )
+    bare_order_number_pattern: str = Field(
+        default=r"#? ?(\d{4,12})",
+        description="A bare number, only an order number if already mentioned in the conversation",
+    )
+    # Tiny classifier, for short messages the patterns miss: a message only made of one
+    # intent's keywords (and filler words) has that intent
+    close_keywords: list[str] = Field(
+        default_factory=lambda: ["quit", "exit", "bye", "goodbye", "nevermind"]
+    )
+    resolve_keywords: list[str] = Field(
+        default_factory=lambda: ["solved", "resolved", "fixed", "sorted"]
+    )
+    filler_words: list[str] = Field(
+        default_factory=lambda: [
+            "ok",
+            "okay",
+            "great",
+            "so",
+            "very",
+            "much",
+            "thanks",
+            "thank",
+            "you",
+            "that's",
+            "it's",
+            "all",
+            "now",
+            "it",
+            "a",
+            "lot",
+            "again",
+            "for",
+            "the",
+            "help",
+            "please",
+            "then",
+        ]
+    )
+    classifier_max_words: int = Field(
+        default=8, ge=1, description="Longer messages are always left to the LLM"
+    )
+
+    close_reply: str = (
+        "No problem, I've closed this conversation. Reach out anytime if you need us!"
+    )
+    resolve_reply: str = "Glad that's sorted! Thanks for your time, have a great day."
+    order_number_reply: str = "Thanks, I've added order #{order_number} to your request."
+    empty_reply: str = "I didn't catch that. Could you tell me how I can help?"
+
+    # Fast path config settings can be passed as env vars (e.g in .env file) and must match "FAST_PATH__<ATTR>"
+    model_config = SettingsConfigDict(
+        env_prefix="FAST_PATH__",
+        env_nested_delimiter="__",
+        env_file=".env",
+        extra="ignore",
+    )
+
+
+@singleton
+def get_fast_path_config() -> FastPathConfig:
+    """Get the chat fast path configuration."""
+    return FastPathConfig()
@@ -1,19 +1,36 @@
 from logging import getLogger
 
-from pydantic import Field
+from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-# Ensure models are imported so SQLModel metadata is populated
-from conversational_agent.utils import singleton  # noqa: F401
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.utils import singleton
 
 logger = getLogger(__name__)
 
 
+class ModelPricing(BaseModel):
+    """Price (USD) per 1M tokens of a model, used to estimate the cost of recorded usage."""
+
+    prompt: float
+    cached_prompt: float
+    completion: float
+
+
 class OpenAIAPIConfig(BaseSettings):
     """OpenAI API configuration settings."""
 
     # No default, must be set via env var or .env file
     key: str = Field(default=..., description="OpenAI API key")
+    pricing: dict[str, ModelPricing] = Field(
+        default_factory=lambda: {
+            "gpt-5-nano": ModelPricing(prompt=0.05, cached_prompt=0.005, completion=0.40),
+            "gpt-5-mini": ModelPricing(prompt=0.25, cached_prompt=0.025, completion=2.00),
+            "gpt-5": ModelPricing(prompt=1.25, cached_prompt=0.125, completion=10.00),
+        },
+        description="Per-model token pricing (models missing here are reported without a cost)",
+    )
 
     # OpenAI API config settings can be passed as env vars (e.g in .env file) and must match "OPENAI_API__<ATTR__SUBATTR>"
     model_config = SettingsConfigDict(
@@ -28,3 +45,9 @@ class OpenAIAPIConfig(BaseSettings):
 def get_openai_api_config() -> OpenAIAPIConfig:
     """Get the OpenAI API configuration."""
     return OpenAIAPIConfig()
+
+
+@resource(teardown=lambda client: client.close())
+def get_openai_client() -> AsyncOpenAI:
+    """Get the OpenAI client (its HTTP connection pool is closed on shutdown)."""
+    return AsyncOpenAI(api_key=get_openai_api_config().key)
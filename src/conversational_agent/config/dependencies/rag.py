@@ -9,6 +9,9 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from conversational_agent.utils import STORAGE_PATH, singleton
 
+# Tenant names double as directory names under `RAGConfig.tenants_path`
+TENANT_PATTERN = r"^[a-z0-9][a-z0-9_-]{0,62}$"
+
 
 class RAGConfig(BaseSettings):
     """RAG configuration settings."""
@@ -19,9 +22,103 @@ class RAGConfig(BaseSettings):
     kb_path: Path = Field(
         default=STORAGE_PATH / "knowledge_base.jsonl", description="Path to knowledge base"
     )
+    shards_path: Path = Field(
+        default=STORAGE_PATH / "indexes/shards",
+        description="Directory holding one sparse sub-index per knowledge base category",
+    )
+    releases_path: Path = Field(
+        default=STORAGE_PATH / "indexes/releases",
+        description="Directory of versioned index releases (used instead of the paths above once "
+        "build_rag_index.py has published one)",
+    )
+    reload_interval_s: float = Field(
+        default=30.0,
+        ge=0,
+        description="How often to check for a newly published index release (0: never)",
+    )
+    keep_releases: int = Field(
+        default=3,
+        ge=2,
+        description="Index releases kept on disk (older ones may still be served by lagging pods)",
+    )
+    multi_tenant: bool = Field(
+        default=False,
+        description="Whether to search each tenant's own knowledge base (see tenants_path)",
+    )
+    tenants_path: Path = Field(
+        default=STORAGE_PATH / "tenants",
+        description="Registry of per-tenant knowledge bases: one directory per tenant, holding "
+        "its knowledge_base.jsonl and its published index releases",
+    )
+    tenant_pool_size: int = Field(
+        default=32,
+        ge=1,
+        description="Max tenant indexes kept open at once (least recently used "
+        "ones are closed first)",
+    )
+    tenant_pool_memory_mb: int = Field(
+        default=4096,
+        ge=1,
+        description="Max estimated memory (index and knowledge base sizes) of the open tenant "
+        "indexes, least recently used ones are closed beyond it",
+    )
+    # Keyed by IssueType value. Issue types without an entry (or whose shards are missing) are
+    # searched against the global index
+    shard_routing: dict[str, list[str]] = Field(
+        default={
+            "delivery": ["shipping", "returns"],
+            "product": ["product", "returns"],
+            "billing": ["billing", "account"],
+        },
+        description="Knowledge base categories searched for each conversation issue type",
+    )
     enabled: bool = Field(
         default=False, description="Whether to enable RAG for the chat service endpoint"
     )
+    context_token_budget: int = Field(
+        default=500, ge=1, description="Max (estimated) tokens of RAG context in the prompt"
+    )
+    context_min_score: float | None = Field(
+        default=None, description="Retrieved documents scoring below this are left out"
+    )
+    context_min_relative_score: float = Field(
+        default=0.3,
+        ge=0,
+        le=1,
+        description="Retrieved documents scoring below this fraction of the best one are left out",
+    )
+    context_duplicate_similarity: float = Field(
+        default=0.8,
+        gt=0,
+        le=1,
+        description="Word-trigram Jaccard similarity above which documents are near-duplicates",
+    )
+    rerank_enabled: bool = Field(
+        default=False, description="Whether to rerank retrieved documents with a cross-encoder"
+    )
+    rerank_model: str = Field(
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        description="sentence-transformers cross-encoder used (on CPU) to rerank documents",
+    )
+    rerank_candidates: int = Field(
+        default=20, ge=1, description="Number of first-stage (BM25) candidates to rerank"
+    )
+    rerank_top_k: int = Field(
+        default=3, ge=1, description="Number of reranked documents kept for the prompt"
+    )
+    rerank_budget_ms: float = Field(
+        default=50.0,
+        gt=0,
+        description="Reranking time budget, after which the first-stage order is used",
+    )
+    rerank_workers: int = Field(
+        default=2,
+        ge=1,
+        description="Threads scoring reranks, further ones are skipped (first-stage order kept)",
+    )
+    rerank_cache_size: int = Field(
+        default=10_000, ge=0, description="Number of (query, document) scores kept in memory"
+    )
     model_config = SettingsConfigDict(
         env_prefix="RAG__",
         env_nested_delimiter="__",
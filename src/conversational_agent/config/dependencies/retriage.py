@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from conversational_agent.utils import STORAGE_PATH, singleton
+
+
+class RetriageConfig(BaseSettings):
+    """Settings of the job re-running triage over historical conversations."""
+
+    concurrency: int = Field(default=8, ge=1, description="LLM calls in flight at once")
+    batch_size: int = Field(
+        default=50, ge=1, description="Results written back per upsert (and checkpoint)"
+    )
+    page_size: int = Field(
+        default=200, ge=1, description="Conversations read from the database per query"
+    )
+    max_attempts: int = Field(
+        default=3, ge=1, description="LLM attempts per conversation before it counts as failed"
+    )
+    checkpoint_path: Path = Field(
+        default=STORAGE_PATH / "retriage_checkpoint.json",
+        description="Progress of the current run, resumed from when the job is restarted",
+    )
+    report_interval_s: float = Field(
+        default=10.0, gt=0, description="How often throughput and cost are reported"
+    )
+
+    # Re-triage config settings can be passed as env vars (e.g in .env file) and must match "RETRIAGE__<ATTR>"
+    model_config = SettingsConfigDict(
+        env_prefix="RETRIAGE__",
+        env_nested_delimiter="__",
+        env_file=".env",
+        extra="ignore",
+    )
+
+
+@singleton
+def get_retriage_config() -> RetriageConfig:
+    """Get the re-triage job configuration."""
+    return RetriageConfig()
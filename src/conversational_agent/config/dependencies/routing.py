@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from conversational_agent.data_models.db_models import CallType
+from conversational_agent.utils import singleton
+
+
+class RoutingRule(BaseModel):
+    """Routes the LLM calls matching all of its conditions (those set) to `model`."""
+
+    name: str = Field(description="Recorded with the usage of the calls the rule routes")
+    model: str
+    call_types: list[CallType] | None = Field(
+        default=None, description="Call types routed (None: any)"
+    )
+    min_turns: int | None = Field(
+        default=None, ge=0, description="Minimum number of turns in the conversation"
+    )
+    min_context_chars: int | None = Field(
+        default=None, ge=0, description="Minimum size of the RAG context in the prompt"
+    )
+    retry: bool | None = Field(
+        default=None,
+        description="Only route retries of an unusable response (True) or first attempts (False)",
+    )
+
+
+class ModelRoutingConfig(BaseSettings):
+    """Which model each LLM call is made with: the first matching rule's, else the default one."""
+
+    default_model: str = Field(default="gpt-5-nano", description="Cheap, fast")
+    rules: list[RoutingRule] = Field(
+        default_factory=lambda: [
+            # Only pay for a stronger model once the cheap one failed to produce a usable response
+            RoutingRule(name="escalate_on_retry", model="gpt-5-mini", retry=True),
+        ],
+        description="Evaluated in order, e.g add a rule for long conversations after retries",
+    )
+
+    # Routing config settings can be passed as env vars (e.g in .env file) and must match "MODEL_ROUTING__<ATTR>"
+    model_config = SettingsConfigDict(
+        env_prefix="MODEL_ROUTING__",
+        env_nested_delimiter="__",
+        env_file=".env",
+        extra="ignore",
+    )
+
+
+@singleton
+def get_model_routing_config() -> ModelRoutingConfig:
+    """Get the LLM model routing configuration."""
+    return ModelRoutingConfig()
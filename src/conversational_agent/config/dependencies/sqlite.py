@@ -0,0 +1,112 @@
+"""Embedded (file-backed) SQLite mode, for single-node and edge deployments.
+
+- WAL journal: readers never block the writer (nor the writer readers), with `synchronous=NORMAL`
+  commits only append to the WAL, which is fsynced at checkpoints rather than on every commit. A
+  crash never corrupts the database, a power loss may only lose the last commits.
+- Bigger page cache, memory-mapped reads and in-memory temp tables.
+- Writers queue up (FIFO) on an in-process lock, taken by a connection's first write and released
+  once its transaction ends, instead of polling SQLite's file lock with growing sleeps (the usual
+  source of latency spikes and "database is locked" errors under concurrent writers).
+- Reads of read-only endpoints go through a separate pool of read-only connections.
+"""
+
+import asyncio
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.util import await_only
+
+if TYPE_CHECKING:
+    from conversational_agent.config.dependencies.database import DatabaseConfig
+
+logger = getLogger(__name__)
+
+_WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+# Connection info key flagging that the connection holds the writer lock
+_HOLDS_WRITER_LOCK = "holds_sqlite_writer_lock"
+
+
+def is_embedded_sqlite(url: str | URL) -> bool:
+    """Whether `url` points to a SQLite database file (rather than an in-memory database)."""
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def is_in_memory_sqlite(url: str | URL) -> bool:
+    """Whether `url` points to an in-memory SQLite database (private to the process opening it)."""
+    return make_url(url).get_backend_name() == "sqlite" and not is_embedded_sqlite(url)
+
+
+def _pragmas(config: "DatabaseConfig", read_only: bool) -> list[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config.sqlite_busy_timeout_s * 1000)}",
+        # Negative: in KiB rather than pages
+        f"PRAGMA cache_size = -{config.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size = {config.sqlite_mmap_size_mb * 1024 * 1024}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if not read_only:
+        pragmas += [
+            "PRAGMA journal_mode = WAL",
+            f"PRAGMA synchronous = {config.sqlite_synchronous}",
+        ]
+    return pragmas
+
+
+def _set_pragmas(engine: AsyncEngine, pragmas: list[str]) -> None:
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _queue_writers(engine: AsyncEngine, timeout_s: float) -> None:
+    writer_lock = asyncio.Lock()
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def acquire_writer_lock(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        if conn.info.get(_HOLDS_WRITER_LOCK) or not statement.lstrip().upper().startswith(
+            _WRITE_STATEMENTS
+        ):
+            return
+        # Runs in the greenlet of an async call: wait for the lock without blocking the event loop
+        try:
+            await_only(asyncio.wait_for(writer_lock.acquire(), timeout_s))
+        except TimeoutError as e:
+            raise TimeoutError(f"database is locked: no write slot within {timeout_s}s") from e
+        conn.info[_HOLDS_WRITER_LOCK] = True
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def release_writer_lock(dbapi_connection: Any, connection_record: Any) -> None:
+        # Back in the pool: its transaction has been committed or rolled back
+        if connection_record.info.pop(_HOLDS_WRITER_LOCK, False):
+            writer_lock.release()
+
+
+def create_embedded_sqlite_engine(config: "DatabaseConfig") -> AsyncEngine:
+    """Create the (writer) engine of an embedded SQLite database."""
+    engine = create_async_engine(config.url, future=True)
+    _set_pragmas(engine, _pragmas(config, read_only=False))
+    _queue_writers(engine, config.sqlite_busy_timeout_s)
+    logger.info(f"Using embedded SQLite database {make_url(config.url).database}")
+    return engine
+
+
+def create_sqlite_reader_engine(config: "DatabaseConfig") -> AsyncEngine:
+    """Create a pool of read-only connections to an embedded SQLite database."""
+    url = make_url(config.url)
+    reader_url = url.set(
+        database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"}
+    )
+    engine = create_async_engine(
+        reader_url, future=True, pool_size=config.sqlite_reader_pool_size, max_overflow=0
+    )
+    _set_pragmas(engine, _pragmas(config, read_only=True))
+    return engine
@@ -1,20 +1,41 @@
+from datetime import datetime
+from enum import StrEnum
+from typing import Generic, TypeVar
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from conversational_agent.data_models.db_models import IssueStatus
+from conversational_agent.config.dependencies.rag import TENANT_PATTERN
+from conversational_agent.data_models.db_models import (
+    IssueStatus,
+    IssueType,
+    Role,
+    UrgencyLevel,
+)
+
+T = TypeVar("T")
+
+
+# --- Pagination ---
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    # Pass back to get the next page, None when there are no more results
+    next_cursor: str | None = None
 
 
 # --- Log in ---
 class LogInRequest(BaseModel):
     name: str
     email: str
+    # Brand the customer signs up with, selecting its knowledge base (only set on sign up)
+    tenant: str | None = Field(default=None, pattern=TENANT_PATTERN)
 
 
 class LogInResponse(BaseModel):
     id: UUID
     name: str
     email: str
+    tenant: str | None
     new_user: bool
 
 
@@ -36,3 +57,78 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
     status: IssueStatus
+
+
+# --- Usage reporting ---
+class UsageGroupBy(StrEnum):
+    DAY = "day"
+    ISSUE_TYPE = "issue_type"
+    RAG = "rag"
+    MODEL = "model"
+
+
+class UsageReportRow(BaseModel):
+    group: str
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    retries: int
+    avg_latency_ms: float
+    # None when any of the group's models has no configured pricing
+    estimated_cost_usd: float | None
+
+
+# --- Support ---
+class IssueSearchHit(BaseModel):
+    issue_id: UUID
+    customer_id: UUID
+    description: str
+    issue_type: IssueType
+    urgency: UrgencyLevel
+    status: IssueStatus
+    created_at: datetime
+    rank: float
+    # Best-matching text: the issue description or a turn from one of its conversations
+    snippet: str
+
+
+class IssueInfo(BaseModel):
+    issue_id: UUID
+    customer_id: UUID
+    description: str
+    issue_type: IssueType
+    urgency: UrgencyLevel
+    status: IssueStatus
+    order_number: int | None
+    created_at: datetime
+    claimed_by: str | None
+    claimed_at: datetime | None
+
+
+class ConversationInfo(BaseModel):
+    conversation_id: UUID
+    created_at: datetime
+    issue_id: UUID | None
+    archived_at: datetime | None = None
+
+
+class TranscriptTurn(BaseModel):
+    role: Role
+    text: str
+    created_at: datetime
+
+
+class ClaimIssueRequest(BaseModel):
+    # Identifier of the human agent claiming the issue
+    agent: str
+
+
+# --- Admin ---
+class IndexReleaseInfo(BaseModel):
+    # Version of the index release now served
+    version: str
+    # Whether a newly published release was swapped in (or tenant evicted) by this request
+    reloaded: bool
+    # Tenants whose knowledge base is open, least recently searched first
+    open_tenants: list[str]
@@ -7,6 +7,10 @@
 - Each Issue can have 1 or more Conversations associated with it.
     - Note: not all conversations need to be linked to an issue, e.g. general inquiries.
             but all Issues must have come from a Conversation
+- Once its issue is resolved or closed (and it has been idle long enough), a Conversation's Turns
+  are moved to a single compressed ConversationArchive row (see `services/archive_service.py`).
+- Each LLM call made for a Conversation (triage turns and summaries) records its token usage,
+  latency and retries in an LLMUsage row, linked to the assistant Turn it produced (if any).
 """
 
 from datetime import datetime, timezone
@@ -14,6 +18,7 @@ from enum import StrEnum
 from typing import Optional
 from uuid import UUID, uuid4
 
+from sqlalchemy import Column, Index, LargeBinary
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -43,10 +48,19 @@ class Role(StrEnum):
     SYSTEM = "system"
 
 
+class CallType(StrEnum):
+    TRIAGE = "triage"
+    SUMMARY = "summary"
+    # Offline re-triage of a past conversation (see scripts/retriage_conversations.py)
+    RETRIAGE = "retriage"
+
+
 class Customer(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str = Field()
-    email: str = Field()
+    email: str = Field(unique=True)
+    # Brand the customer belongs to, whose knowledge base is searched (the default one if None)
+    tenant: str | None = Field(default=None)
 
     conversations: list["Conversation"] = Relationship(
         back_populates="customer", cascade_delete=True
@@ -55,11 +69,21 @@ class Customer(SQLModel, table=True):
 
 
 class Conversation(SQLModel, table=True):
+    __table_args__ = (
+        # Backs keyset-paginated listing of a customer's conversations (newest first)
+        Index("ix_conversation_customer_created", "customer_id", "created_at", "id"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Set once the turns have been moved to the conversation's archive (`turns` is then empty)
+    archived_at: datetime | None = Field(default=None)
 
     # A conversation consists of multiple turns
     turns: list["Turn"] = Relationship(back_populates="conversation", cascade_delete=True)
+    archive: Optional["ConversationArchive"] = Relationship(
+        back_populates="conversation", cascade_delete=True
+    )
 
     # A conversation is always linked to a customer
     customer_id: UUID = Field(foreign_key="customer.id")
@@ -70,8 +94,16 @@ class Conversation(SQLModel, table=True):
     # NO CASCADE: Deleting a conversations should not delete the issue
     issue: Optional["Issue"] = Relationship(back_populates="conversations")
 
+    # Token usage of every LLM call made for this conversation
+    llm_usages: list["LLMUsage"] = Relationship(back_populates="conversation", cascade_delete=True)
+
 
 class Turn(SQLModel, table=True):
+    __table_args__ = (
+        # Backs loading a conversation's history and the archival job's idleness check
+        Index("ix_turn_conversation_created", "conversation_id", "created_at"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     role: Role
     text: str
@@ -82,7 +114,27 @@ class Turn(SQLModel, table=True):
     conversation: "Conversation" = Relationship(back_populates="turns")
 
 
+class ConversationArchive(SQLModel, table=True):
+    """Cold storage of a finished conversation's turns, as one zlib-compressed JSON blob."""
+
+    conversation_id: UUID = Field(foreign_key="conversation.id", primary_key=True)
+    conversation: Conversation = Relationship(back_populates="archive")
+    turns_blob: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    turn_count: int
+    # Full-text indexed (see search_index.py) so that archived transcripts stay searchable
+    search_text: str = Field(
+        default="", description="Text of the archived non-system turns, one turn per line"
+    )
+    archived_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
 class Issue(SQLModel, table=True):
+    __table_args__ = (
+        # Back keyset-paginated listings per status (and urgency) and the manual review work queue
+        Index("ix_issue_status_created", "status", "created_at", "id"),
+        Index("ix_issue_status_urgency_created", "status", "urgency", "created_at", "id"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     description: str = Field(
         max_length=1000, description="Freeform text describing the issue, max 1000 chars"
@@ -93,6 +145,10 @@ class Issue(SQLModel, table=True):
     order_number: int | None = Field(default=None, description="Optional order number")
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    # Human agent currently working the issue from the manual review queue (claims expire)
+    claimed_by: str | None = Field(default=None)
+    claimed_at: datetime | None = Field(default=None)
+
     # Each issue is linked to a customer (who can have 0+ issues)
     customer_id: UUID = Field(foreign_key="customer.id")
     customer: Customer = Relationship(back_populates="issues")
@@ -100,3 +156,28 @@ class Issue(SQLModel, table=True):
     # Each issue must have 1+ conversations associated with it
     # NO CASCADE: Keep conversations when issue is deleted
     conversations: list["Conversation"] = Relationship(back_populates="issue")
+
+
+class LLMUsage(SQLModel, table=True):
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    call_type: CallType
+    # Attempts of a call routed to different models (e.g a retry escalated to a stronger one) are
+    # recorded per model, each with the rule that picked it
+    model: str
+    routing_rule: str | None = Field(default=None, description="Routing rule that picked the model")
+    # Token counts are summed over every attempt with the model (retries are billed too)
+    prompt_tokens: int = Field(default=0)
+    completion_tokens: int = Field(default=0)
+    cached_tokens: int = Field(default=0, description="Prompt tokens served from the prompt cache")
+    latency_ms: float = Field(default=0.0, description="Wall time of the attempts with the model")
+    retries: int = Field(default=0)
+    rag_enabled: bool = Field(default=False)
+    rag_context_chars: int = Field(default=0, description="Size of the RAG context in the prompt")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+
+    # Each usage record is linked to the conversation the call was made for
+    conversation_id: UUID = Field(foreign_key="conversation.id", index=True)
+    conversation: Conversation = Relationship(back_populates="llm_usages")
+
+    # ...and to the assistant turn it produced (None for summaries)
+    turn_id: UUID | None = Field(default=None, foreign_key="turn.id", ondelete="SET NULL")
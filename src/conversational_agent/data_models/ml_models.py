@@ -67,6 +67,12 @@ Rules:
 Never mention forms, statuses, or internal logic. Keep the interaction natural and caring.
 """
 
+# Appended to a finished conversation to re-extract its issue offline (no reply is sent)
+RETRIAGE_MESSAGE = """
+The conversation above has ended. Fill the fields from the whole conversation, as they stand at
+its end: set create_issue as you would have by then, and leave assistant_reply empty.
+"""
+
 
 class OpenAIAPIIssueFormat(BaseModel):
     """Mirrors Issue's format of non-DB-related attributes alongside the assistant reply
@@ -0,0 +1,94 @@
+"""Full-text search indexes over Issue.description, Turn.text and ConversationArchive.search_text.
+
+- PostgreSQL: GIN expression indexes over `to_tsvector('english', ...)`, matched by the exact same
+  expression in the search queries so the planner can use them.
+- SQLite: contentless FTS5 tables (no duplicated text), kept in sync with triggers. They are keyed
+  through a `<table>_fts_key` table mapping each row's id to an INTEGER PRIMARY KEY: unlike the
+  implicit rowid of the (UUID-keyed) indexed tables, it is never renumbered by VACUUM.
+"""
+
+from logging import getLogger
+
+from sqlalchemy import Connection, text
+
+logger = getLogger(__name__)
+
+# Text search configuration used by both the indexes and the queries (they must match)
+TS_CONFIG = "english"
+
+_POSTGRES_DDL = [
+    f"""CREATE INDEX IF NOT EXISTS ix_issue_description_fts
+        ON issue USING GIN (to_tsvector('{TS_CONFIG}'::regconfig, description))""",
+    f"""CREATE INDEX IF NOT EXISTS ix_turn_text_fts
+        ON turn USING GIN (to_tsvector('{TS_CONFIG}'::regconfig, text))""",
+    f"""CREATE INDEX IF NOT EXISTS ix_conversationarchive_search_text_fts
+        ON conversationarchive USING GIN (to_tsvector('{TS_CONFIG}'::regconfig, search_text))""",
+]
+
+# Tables indexed on SQLite: (table, text column, id column)
+_SQLITE_INDEXED = [
+    ("issue", "description", "id"),
+    ("turn", "text", "id"),
+    ("conversationarchive", "search_text", "conversation_id"),
+]
+
+
+def _sqlite_fts_ddl(table: str, column: str, id_column: str) -> list[str]:
+    fts, key = f"{table}_fts", f"{table}_fts_key"
+    # Index entries of the row being triggered on (contentless: deletes must pass the old text)
+    old_entry = (
+        f"SELECT 'delete', fts_rowid, old.{column} FROM {key} WHERE row_id = old.{id_column}"
+    )
+    new_entry = f"SELECT fts_rowid, new.{column} FROM {key} WHERE row_id = new.{id_column}"
+    return [
+        f"CREATE TABLE {key} (fts_rowid INTEGER PRIMARY KEY, row_id NOT NULL UNIQUE)",
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='')",
+        f"""CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {key}(row_id) VALUES (new.{id_column});
+            INSERT INTO {fts}(rowid, {column}) {new_entry};
+        END""",
+        f"""CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {column}) {old_entry};
+            DELETE FROM {key} WHERE row_id = old.{id_column};
+        END""",
+        f"""CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {column}) {old_entry};
+            INSERT INTO {fts}(rowid, {column}) {new_entry};
+        END""",
+        # Index any rows that existed before the FTS table did
+        f"INSERT INTO {key}(row_id) SELECT {id_column} FROM {table}",
+        f"""INSERT INTO {fts}(rowid, {column})
+            SELECT {key}.fts_rowid, {table}.{column}
+            FROM {key} JOIN {table} ON {table}.{id_column} = {key}.row_id""",
+    ]
+
+
+def _drop_sqlite_fts_ddl(table: str) -> list[str]:
+    """Drop an index keyed on the indexed table's implicit rowid (as first created)."""
+    fts = f"{table}_fts"
+    return [f"DROP TRIGGER IF EXISTS {fts}_{event}" for event in ("ai", "ad", "au")] + [
+        f"DROP TABLE IF EXISTS {fts}"
+    ]
+
+
+def create_search_indexes(conn: Connection) -> None:
+    """Idempotently create the full-text search indexes for the connection's dialect.
+
+    Must run after the tables themselves have been created (see `init_db`).
+    """
+    match conn.dialect.name:
+        case "postgresql":
+            for ddl in _POSTGRES_DDL:
+                conn.execute(text(ddl))
+        case "sqlite":
+            for table, column, id_column in _SQLITE_INDEXED:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": f"{table}_fts_key"},
+                ).first()
+                if exists:
+                    continue
+                for ddl in _drop_sqlite_fts_ddl(table) + _sqlite_fts_ddl(table, column, id_column):
+                    conn.execute(text(ddl))
+        case name:
+            logger.warning(f"Full-text search is not supported for the '{name}' dialect")
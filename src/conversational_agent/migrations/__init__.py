@@ -0,0 +1,41 @@
+"""Alembic migrations bringing databases created by an earlier version up to the current schema.
+
+`init_db` first creates any missing table in full (`SQLModel.metadata.create_all`), then upgrades
+to the latest revision. A table (or column, index...) may thus already be in its latest shape on
+a database created after the change, so every revision checks for what it adds before adding it.
+
+New revisions go in `versions/`, e.g with `alembic revision -m "..."` from the repository root.
+"""
+
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Connection, inspect
+
+SCRIPT_LOCATION = Path(__file__).parent
+
+
+def get_alembic_config(conn: Connection | None = None) -> Config:
+    """Alembic config of the packaged migrations, run on `conn` if given (else on `DB_CONFIG__URL`)."""
+    config = Config()
+    config.set_main_option("script_location", str(SCRIPT_LOCATION))
+    config.attributes["connection"] = conn
+    return config
+
+
+def run_migrations(conn: Connection) -> None:
+    """Upgrade the connection's database to the latest revision (in the caller's transaction)."""
+    command.upgrade(get_alembic_config(conn), "head")
+
+
+def has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def has_index(conn: Connection, table: str, index: str) -> bool:
+    return any(i["name"] == index for i in inspect(conn).get_indexes(table))
@@ -0,0 +1,36 @@
+import asyncio
+
+from alembic import context
+from sqlalchemy import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from conversational_agent.config.dependencies.database import get_db_config
+
+config = context.config
+
+
+def _run(conn: Connection) -> None:
+    context.configure(connection=conn, target_metadata=SQLModel.metadata)
+    # A no-op when the connection is already in a transaction (that of `init_db`)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def _run_on_configured_db() -> None:
+    engine = create_async_engine(get_db_config().url)
+    try:
+        async with engine.connect() as conn:
+            await conn.run_sync(_run)
+            await conn.commit()
+    finally:
+        await engine.dispose()
+
+
+if context.is_offline_mode():
+    raise RuntimeError("Migrations inspect the database to be idempotent, so cannot run offline")
+elif (conn := config.attributes.get("connection")) is not None:
+    _run(conn)
+else:
+    # Run from the alembic CLI
+    asyncio.run(_run_on_configured_db())
@@ -0,0 +1,67 @@
+"""Make customer emails unique, merging the customers sharing one.
+
+Logging in used to pick any of the customers with the email, and could race into creating
+several. Each set of duplicates is merged into the one with the earliest conversation: the others'
+conversations and issues are moved to it, then they are deleted.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from collections import defaultdict
+
+import sqlalchemy as sa
+from alembic import op
+
+from conversational_agent.migrations import has_table
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+customer = sa.table("customer", sa.column("id"), sa.column("email"))
+conversation = sa.table("conversation", sa.column("customer_id"), sa.column("created_at"))
+issue = sa.table("issue", sa.column("customer_id"))
+
+
+def _email_is_unique(conn: sa.Connection) -> bool:
+    inspector = sa.inspect(conn)
+    unique_columns = [c["column_names"] for c in inspector.get_unique_constraints("customer")] + [
+        i["column_names"] for i in inspector.get_indexes("customer") if i["unique"]
+    ]
+    return ["email"] in unique_columns
+
+
+def _merge_duplicate_customers(conn: sa.Connection) -> None:
+    first_conversation = sa.func.min(conversation.c.created_at)
+    rows = conn.execute(
+        sa.select(customer.c.id, customer.c.email, first_conversation)
+        .select_from(customer.outerjoin(conversation, conversation.c.customer_id == customer.c.id))
+        .group_by(customer.c.id, customer.c.email)
+    ).all()
+    by_email = defaultdict(list)
+    # Customers without conversations last, ties broken by id so that reruns agree
+    for id_, email, _ in sorted(rows, key=lambda row: (row[2] is None, row[2] or "", str(row[0]))):
+        by_email[email].append(id_)
+    for kept, *duplicates in by_email.values():
+        if not duplicates:
+            continue
+        for table in (conversation, issue):
+            conn.execute(
+                table.update().where(table.c.customer_id.in_(duplicates)).values(customer_id=kept)
+            )
+        conn.execute(customer.delete().where(customer.c.id.in_(duplicates)))
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not has_table(conn, "customer") or _email_is_unique(conn):
+        return
+    _merge_duplicate_customers(conn)
+    op.create_index("ix_customer_email", "customer", ["email"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_customer_email", table_name="customer")
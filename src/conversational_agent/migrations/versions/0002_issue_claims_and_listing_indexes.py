@@ -0,0 +1,43 @@
+"""Add the claim of issues by human agents, and the indexes backing paginated listings.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from conversational_agent.migrations import has_column, has_index, has_table
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+_INDEXES = [
+    ("ix_conversation_customer_created", "conversation", ["customer_id", "created_at", "id"]),
+    ("ix_issue_status_created", "issue", ["status", "created_at", "id"]),
+    ("ix_issue_status_urgency_created", "issue", ["status", "urgency", "created_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if has_table(conn, "issue"):
+        for column in (
+            sa.Column("claimed_by", sa.String()),
+            sa.Column("claimed_at", sa.DateTime()),
+        ):
+            if not has_column(conn, "issue", column.name):
+                op.add_column("issue", column)
+    for name, table, columns in _INDEXES:
+        if has_table(conn, table) and not has_index(conn, table, name):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in _INDEXES:
+        op.drop_index(name, table_name=table)
+    op.drop_column("issue", "claimed_at")
+    op.drop_column("issue", "claimed_by")
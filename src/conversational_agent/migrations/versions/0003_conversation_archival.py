@@ -0,0 +1,29 @@
+"""Add the archival date of conversations, and the index backing the archival job.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from conversational_agent.migrations import has_column, has_index, has_table
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if has_table(conn, "conversation") and not has_column(conn, "conversation", "archived_at"):
+        op.add_column("conversation", sa.Column("archived_at", sa.DateTime()))
+    if has_table(conn, "turn") and not has_index(conn, "turn", "ix_turn_conversation_created"):
+        op.create_index("ix_turn_conversation_created", "turn", ["conversation_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_turn_conversation_created", table_name="turn")
+    op.drop_column("conversation", "archived_at")
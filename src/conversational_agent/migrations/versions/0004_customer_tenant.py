@@ -0,0 +1,26 @@
+"""Add the tenant (brand) of customers, existing ones staying on the default knowledge base.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from conversational_agent.migrations import has_column, has_table
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if has_table(conn, "customer") and not has_column(conn, "customer", "tenant"):
+        op.add_column("customer", sa.Column("tenant", sa.String()))
+
+
+def downgrade() -> None:
+    op.drop_column("customer", "tenant")
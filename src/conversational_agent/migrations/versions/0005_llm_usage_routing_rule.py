@@ -0,0 +1,26 @@
+"""Add the routing rule that picked the model of each LLM call.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from conversational_agent.migrations import has_column, has_table
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if has_table(conn, "llmusage") and not has_column(conn, "llmusage", "routing_rule"):
+        op.add_column("llmusage", sa.Column("routing_rule", sa.String()))
+
+
+def downgrade() -> None:
+    op.drop_column("llmusage", "routing_rule")
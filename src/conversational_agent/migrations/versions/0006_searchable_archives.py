@@ -0,0 +1,56 @@
+"""Keep the text of archived conversations searchable.
+
+Archiving used to delete the turns from the (full-text indexed) turn table without keeping their
+text anywhere searchable. Archives get an uncompressed `search_text`, backfilled from their blobs,
+which `create_search_indexes` then indexes.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+
+import json
+import zlib
+
+import sqlalchemy as sa
+from alembic import op
+
+from conversational_agent.migrations import has_column, has_table
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+archive = sa.table(
+    "conversationarchive",
+    sa.column("conversation_id"),
+    sa.column("turns_blob", sa.LargeBinary),
+    sa.column("search_text"),
+)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not has_table(conn, "conversationarchive") or has_column(
+        conn, "conversationarchive", "search_text"
+    ):
+        return
+    op.add_column(
+        "conversationarchive",
+        sa.Column("search_text", sa.String(), nullable=False, server_default=""),
+    )
+    rows = conn.execute(sa.select(archive.c.conversation_id, archive.c.turns_blob)).all()
+    for conversation_id, blob in rows:
+        # As `archive_service.searchable_text` (frozen here, as the blob format of this revision)
+        turns = json.loads(zlib.decompress(blob))
+        search_text = "\n".join(turn["text"] for turn in turns if turn["role"] != "system")
+        conn.execute(
+            archive.update()
+            .where(archive.c.conversation_id == conversation_id)
+            .values(search_text=search_text)
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("conversationarchive", "search_text")
@@ -0,0 +1,53 @@
+# src/conversational_agent/scripts/archive_conversations.py
+"""Script to archive finished conversations into cold storage.
+
+The turns of conversations whose issue is resolved or closed, and which have had no new turn for
+`--older-than-days`, are moved from the turn table into one compressed `ConversationArchive` row
+per conversation. Summaries and transcript exports rehydrate them transparently. Safe to run
+(e.g from cron) alongside the API: work is done in small batches, pausing in between.
+
+Usage:
+    python src/conversational_agent/scripts/archive_conversations.py \\
+        [--older-than-days 30] [--batch-size 100] [--pause-s 0.5] [--max-batches N]
+"""
+
+import argparse
+import asyncio
+from datetime import timedelta
+
+from conversational_agent.config.dependencies.archive import get_archive_config
+from conversational_agent.config.dependencies.container import get_container
+from conversational_agent.config.dependencies.database import init_db
+from conversational_agent.services.archive_service import get_archive_service
+
+
+async def run(
+    older_than_days: float, batch_size: int, pause_s: float, max_batches: int | None
+) -> int:
+    try:
+        # Creates the archive table on databases initialized before it existed
+        await init_db()
+        return await get_archive_service().archive(
+            timedelta(days=older_than_days), batch_size, pause_s, max_batches
+        )
+    finally:
+        await get_container().aclose()
+
+
+def main() -> None:
+    config = get_archive_config()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--older-than-days", type=float, default=config.older_than_days)
+    parser.add_argument("--batch-size", type=int, default=config.batch_size)
+    parser.add_argument("--pause-s", type=float, default=config.pause_s)
+    parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+    args = parser.parse_args()
+
+    archived = asyncio.run(
+        run(args.older_than_days, args.batch_size, args.pause_s, args.max_batches)
+    )
+    print(f"Archived {archived} conversations")
+
+
+if __name__ == "__main__":
+    main()
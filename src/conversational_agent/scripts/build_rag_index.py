@@ -1,29 +1,87 @@
+import argparse
+import json
+import os
 import shutil
 import subprocess
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+from typing import TextIO
 
 from pyserini.search.lucene import LuceneSearcher
 
 from conversational_agent.config.dependencies.rag import get_rag_config
-from conversational_agent.services.rag_service import RAGService
+from conversational_agent.scripts.ingest_knowledge_base import document_category
+from conversational_agent.services.document_store import DocumentStore
+from conversational_agent.services.index_releases import (
+    IndexRelease,
+    mark_failed,
+    new_release,
+    publish_release,
+    source_kb_path,
+)
+from conversational_agent.services.rag_service import hits_to_documents
 
 
-def build_sparse_index():
-    """Build sparse index using Pyserini's LuceneIndexer directly"""
-    rag_config = get_rag_config()
-    idx_path = rag_config.index_path
-    kb_path = rag_config.kb_path
-    if idx_path.exists():
-        # Remove existing index directory and its contents
-        shutil.rmtree(idx_path)
-    idx_path.mkdir(parents=True)
-
+def snapshot_knowledge_base(release: IndexRelease, tenant: str | None = None) -> bool:
+    """Copy the knowledge base into the release, which must not change once published"""
+    kb_path = source_kb_path(get_rag_config(), tenant)
     if not kb_path.exists():
         print(f"Knowledge base file not found: {kb_path}")
-        print("Run 'python src/conversational_agent/scripts/create_knowledge_base.py' first")
-        return
+        print(
+            "Run 'python src/conversational_agent/scripts/create_knowledge_base.py' "
+            "or 'python src/conversational_agent/scripts/ingest_knowledge_base.py' first"
+        )
+        return False
+    shutil.copyfile(kb_path, release.kb_path)
+    return True
+
+
+def build_sparse_index(release: IndexRelease):
+    """Build the release's sparse index using Pyserini's LuceneIndexer directly"""
+    kb_path = release.kb_path
+    release.index_path.mkdir(parents=True)
+
+    # Pyserini indexes every JSON file under --input (recursively), so stage the knowledge base
+    # on its own. Hard-linked when possible: the indexer streams it, we never copy it in memory.
+    with tempfile.TemporaryDirectory(dir=kb_path.parent, prefix=".index_input_") as input_dir:
+        staged_kb_path = os.path.join(input_dir, kb_path.name)
+        try:
+            os.link(kb_path, staged_kb_path)
+        except OSError:
+            shutil.copyfile(kb_path, staged_kb_path)
+        run_indexer(Path(input_dir), release.index_path)
+
+
+def build_shard_indexes(release: IndexRelease):
+    """Build one sparse sub-index per knowledge base category (explicit field or id prefix)"""
+    kb_path = release.kb_path
+    with tempfile.TemporaryDirectory(dir=kb_path.parent, prefix=".shard_input_") as input_dir:
+        # Stream the knowledge base into one JSONL file per category
+        shard_files: dict[str, TextIO] = {}
+        with open(kb_path, encoding="utf-8") as kb, ExitStack() as stack:
+            for line in kb:
+                if not line.strip():
+                    continue
+                category = document_category(json.loads(line))
+                if category not in shard_files:
+                    (Path(input_dir) / category).mkdir()
+                    shard_files[category] = stack.enter_context(
+                        open(Path(input_dir) / category / kb_path.name, "w", encoding="utf-8")
+                    )
+                shard_files[category].write(line)
+
+        for category in sorted(shard_files):
+            shard_idx_path = release.shards_path / category
+            shard_idx_path.mkdir(parents=True)
+            run_indexer(Path(input_dir) / category, shard_idx_path)
+        print(f"Built {len(shard_files)} category shards: {', '.join(sorted(shard_files))}")
+
+
+def run_indexer(input_dir: Path, idx_path: Path):
     cmd = f"python -m pyserini.index.lucene \
   --collection JsonCollection \
-  --input {kb_path.parent} \
+  --input {input_dir} \
   --index {idx_path} \
   --generator DefaultLuceneDocumentGenerator \
   --threads 1 \
@@ -31,24 +89,94 @@ def build_sparse_index():
     subprocess.run(cmd, shell=True)
 
 
-def verify_index():
-    """Verify the index was built correctly"""
+# Number of the release's documents that must each be retrieved (in the top `_CHECK_K` hits) by
+# their opening words, when no check queries are given
+_N_CHECKED_DOCUMENTS = 5
+_CHECK_K = 10
+_CHECK_QUERY_WORDS = 12
+
+
+def derive_check_queries(kb_path: Path, n: int = _N_CHECKED_DOCUMENTS) -> list[tuple[str, str]]:
+    """(query, expected document id) pairs: the opening words of `n` documents spread over the
+    knowledge base, each expected to retrieve its own document."""
+    with open(kb_path, encoding="utf-8") as kb:
+        n_documents = sum(1 for line in kb if line.strip())
+    n = min(n, n_documents)
+    picked = {i * n_documents // n for i in range(n)}
+    queries = []
+    with open(kb_path, encoding="utf-8") as kb:
+        for i, line in enumerate(line for line in kb if line.strip()):
+            if i in picked:
+                document = json.loads(line)
+                queries.append(
+                    (" ".join(document["contents"].split()[:_CHECK_QUERY_WORDS]), document["id"])
+                )
+    return queries
+
+
+def verify_index(release: IndexRelease, check_queries: list[str] | None = None) -> bool:
+    """Verify the release's index was built correctly.
+
+    Each of `check_queries` must get at least one hit. Without any, documents of the release must
+    be retrieved by their own opening words (see `derive_check_queries`).
+    """
     try:
-        rag_config = get_rag_config()
-        idx_path = rag_config.index_path
-        searcher = LuceneSearcher(str(idx_path))
-        hits = searcher.search("shipping times", k=3)
-        for i, doc in enumerate(RAGService().convert_lucene_hits_to_documents(hits)):
-            print(f"Hit {i + 1}:")
-            print(f"  Doc ID: {doc.id}")
-            print(f"  Score: {doc.score}")
-            print(f"  Title: {doc.title}")
-            print(f"  Contents: {doc.contents[:200]}...")  # Print first 200 characters
-        assert len(hits) > 0, "No hits found, expected at least 1 for query = 'shipping times'"
+        if check_queries:
+            expected = [(query, None) for query in check_queries]
+        else:
+            expected = derive_check_queries(release.kb_path)
+        assert expected, f"No documents in the knowledge base {release.kb_path}"
+        searcher = LuceneSearcher(str(release.index_path))
+        document_store = DocumentStore(release.kb_path)
+        for query, doc_id in expected:
+            documents = hits_to_documents(searcher.search(query, k=_CHECK_K), document_store)
+            print(f"Query {query!r}: top hits {[doc.id for doc in documents[:3]]}")
+            assert documents, f"No hits found for query {query!r}"
+            if doc_id is not None:
+                assert doc_id in [doc.id for doc in documents], (
+                    f"Document {doc_id} not in the top {_CHECK_K} hits of its own words {query!r}"
+                )
+        searcher.close()
+        return True
     except Exception as e:
         print(f"Index verification failed: {e}")
+        return False
+
+
+def build_release(tenant: str | None = None, check_queries: list[str] | None = None):
+    """Build the indexes into a new release, then publish it if it passes verification.
+
+    Running API processes swap the new release in within `RAG__RELOAD_INTERVAL_S` (or right away
+    via `POST /admin/rag/reload`), no restart needed.
+    """
+    rag_config = get_rag_config()
+    release = new_release(rag_config, tenant)
+    release_path = release.index_path.parent
+    if not snapshot_knowledge_base(release, tenant):
+        shutil.rmtree(release_path)
+        return
+    build_sparse_index(release)
+    build_shard_indexes(release)
+    if not verify_index(release, check_queries):
+        mark_failed(release)
+        print(f"Release {release.version} not published (left in {release_path} for inspection)")
+        return
+    publish_release(rag_config, release, tenant)
+    print(f"Published index release {release.version}")
 
 
 if __name__ == "__main__":
-    build_sparse_index()
-    verify_index()
+    parser = argparse.ArgumentParser(description="Build and publish a release of the indexes")
+    parser.add_argument(
+        "--tenant",
+        help="Index the knowledge base registered for this tenant, rather than the default one",
+    )
+    parser.add_argument(
+        "--check-query",
+        action="append",
+        dest="check_queries",
+        help="Query that must get hits for the release to be published (repeatable). By default, "
+        "documents of the release must be retrieved by their own opening words",
+    )
+    args = parser.parse_args()
+    build_release(args.tenant, args.check_queries)
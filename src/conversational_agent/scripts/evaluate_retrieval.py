@@ -0,0 +1,304 @@
+# src/conversational_agent/scripts/evaluate_retrieval.py
+"""Script to evaluate retrieval quality and latency over a labelled query set.
+
+Every retrieval configuration (index profile x BM25 parameters x top-k x reranking) is run over the
+queries, reporting recall@k, MRR and nDCG@k (binary relevance, at the source-document level so
+passages of the same document count once), p50/p95/p99 search latency and peak RSS. Each
+configuration is run in a fresh process, so that its peak RSS isn't an earlier one's. Reranked
+configurations keep the configuration's top-k (not `RAG__RERANK_TOP_K`), to compare like for like.
+Their quality is that of the reranker itself (scored without its time budget), while their latency
+is timed as served, with the share of searches that fell back to BM25 order reported alongside.
+
+Usage:
+    python src/conversational_agent/scripts/evaluate_retrieval.py \\
+        --profile global sharded --k1 0.9 1.2 --b 0.4 0.75 --top-k 3 5 [--rerank]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import multiprocessing
+import resource
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel, Field, ValidationError
+
+from conversational_agent.services.metrics import get_metrics
+from conversational_agent.services.rag_service import Document, RAGService
+
+
+class LabelledQuery(BaseModel):
+    query: str
+    # Ids of the (source) documents answering the query (recall and nDCG are undefined without)
+    relevant_ids: list[str] = Field(min_length=1)
+    # Issue type triaged for the conversation, used by the sharded profile
+    issue_type: str | None = None
+
+
+class RetrievalConfig(BaseModel):
+    profile: str
+    k1: float
+    b: float
+    top_k: int
+    rerank: bool = False
+
+    @property
+    def name(self) -> str:
+        rerank = " +rerank" if self.rerank else ""
+        return f"{self.profile} k1={self.k1} b={self.b} k={self.top_k}{rerank}"
+
+
+class EvaluationResult(BaseModel):
+    config: RetrievalConfig
+    recall: float
+    mrr: float
+    ndcg: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_rss_mb: float
+    # Share of the timed (reranked) searches that exceeded the budget, kept BM25 order
+    rerank_fallback_rate: float = 0.0
+
+
+def create_seed_query_set() -> list[LabelledQuery]:
+    """Labelled queries seeded from SAMPLE_CONVOS.md user turns and the sample knowledge base"""
+    queries = [
+        # From SAMPLE_CONVOS.md
+        ("I received a faulty keyboard recently, i'd like a refund", ["product_003", "billing_003", "returns_001"], "product"),
+        ("ordered headphones a month ago but they haven't arrived i'm worried they're lost. When should they have arrived?", ["shipping_001", "shipping_004"], "delivery"),
+        ("it's been much longer than 3-5 business days", ["shipping_001"], "delivery"),
+        ("I have a problem with the last charge, I was charged too much", ["billing_002", "billing_003"], "billing"),
+        # From the knowledge base
+        ("how long does standard shipping take", ["shipping_001"], "delivery"),
+        ("do you ship internationally and who pays customs duties", ["shipping_002"], "delivery"),
+        ("where is my tracking number", ["shipping_003"], "delivery"),
+        ("my package arrived damaged", ["shipping_004"], "delivery"),
+        ("what is your return policy", ["returns_001"], "product"),
+        ("how do I print a return label", ["returns_002"], "product"),
+        ("can I exchange a shirt for a different size", ["returns_003", "product_001"], "product"),
+        ("can I return swimwear or a gift card", ["returns_004"], "product"),
+        ("do you accept apple pay", ["billing_001"], "billing"),
+        ("my card payment was declined", ["billing_002"], "billing"),
+        ("when will my refund appear on my credit card statement", ["billing_003"], "billing"),
+        ("can I cancel my order after placing it", ["billing_004"], "billing"),
+        ("which size should I pick if I'm between sizes", ["product_001"], "product"),
+        ("how should I wash this jacket", ["product_002"], "product"),
+        ("is my headset covered by the warranty", ["product_003"], "product"),
+        ("when will an out of stock item be available again", ["product_004"], "product"),
+        ("how do I create an account", ["account_001"], None),
+        ("what does shipped status mean for my order", ["account_002"], "delivery"),
+        ("I forgot my password", ["account_003"], None),
+        ("what are your customer service phone hours", ["service_001"], None),
+        ("how can you look up my order without the confirmation number", ["service_002"], None),
+        ("do you offer volume discounts for corporate orders", ["service_003"], None),
+    ]  # fmt: skip
+    return [
+        LabelledQuery(query=query, relevant_ids=relevant_ids, issue_type=issue_type)
+        for query, relevant_ids, issue_type in queries
+    ]
+
+
+def load_query_set(path: Path) -> list[LabelledQuery]:
+    """Load a JSONL query set (one `{"query", "relevant_ids", "issue_type"?}` per line)"""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                queries.append(LabelledQuery.model_validate_json(line))
+            except ValidationError as e:
+                raise ValueError(f"Invalid labelled query at {path}:{line_number}: {e}") from e
+    return queries
+
+
+def ranked_source_ids(docs: list[Document]) -> list[str]:
+    """Source document ids in rank order, each kept at its best-ranked passage"""
+    return list(dict.fromkeys(doc.parent_id or doc.id for doc in docs))
+
+
+def recall_at_k(ranked_ids: list[str], relevant_ids: set[str], k: int) -> float:
+    _check_relevant_ids(relevant_ids)
+    return len(relevant_ids.intersection(ranked_ids[:k])) / len(relevant_ids)
+
+
+def reciprocal_rank(ranked_ids: list[str], relevant_ids: set[str]) -> float:
+    for rank, doc_id in enumerate(ranked_ids, start=1):
+        if doc_id in relevant_ids:
+            return 1 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_ids: list[str], relevant_ids: set[str], k: int) -> float:
+    _check_relevant_ids(relevant_ids)
+    dcg = sum(
+        1 / math.log2(rank + 1)
+        for rank, doc_id in enumerate(ranked_ids[:k], start=1)
+        if doc_id in relevant_ids
+    )
+    ideal_dcg = sum(1 / math.log2(rank + 1) for rank in range(1, min(k, len(relevant_ids)) + 1))
+    return dcg / ideal_dcg
+
+
+def _check_relevant_ids(relevant_ids: set[str]) -> None:
+    if not relevant_ids:
+        raise ValueError("Queries must be labelled with at least one relevant document")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile (`pct` in 0-100)"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux. Includes the JVM heap, which tracemalloc would not see. It is
+    # the peak over the process' lifetime, hence each configuration is evaluated in its own process
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def evaluate(
+    rag_service: RAGService,
+    config: RetrievalConfig,
+    queries: list[LabelledQuery],
+    repeats: int,
+) -> EvaluationResult:
+    """Score the rankings of `config` over the queries, then time `repeats` passes over them.
+
+    Quality is measured on exact rankings (reranked without the time budget), so that it isn't
+    silently BM25's when the reranker runs over budget. Timed passes search as served, with the
+    reranker's score cache cleared before each so that repeats aren't all cache hits.
+    """
+    for searcher in [rag_service.sparse_searcher, *rag_service.shard_searchers.values()]:
+        searcher.set_bm25(config.k1, config.b)
+    rerank_service = None
+    if config.rerank:
+        from conversational_agent.services.rerank_service import get_rerank_service
+
+        rerank_service = get_rerank_service()
+
+    def search(query: LabelledQuery, exact: bool = False) -> list[Document]:
+        issue_type = query.issue_type if config.profile == "sharded" else None
+        if rerank_service is None:
+            return rag_service.search(query.query, k=config.top_k, issue_type=issue_type)
+        candidates = rag_service.search(
+            query.query, k=max(rerank_service.n_candidates, config.top_k), issue_type=issue_type
+        )
+        if exact:
+            return rerank_service.rerank_exact(query.query, candidates, top_k=config.top_k)
+        return asyncio.run(rerank_service.rerank(query.query, candidates, top_k=config.top_k))
+
+    # Also the (untimed) warm-up pass
+    recalls: list[float] = []
+    reciprocal_ranks: list[float] = []
+    ndcgs: list[float] = []
+    for query in queries:
+        ranked_ids = ranked_source_ids(search(query, exact=True))
+        relevant_ids = set(query.relevant_ids)
+        recalls.append(recall_at_k(ranked_ids, relevant_ids, config.top_k))
+        reciprocal_ranks.append(reciprocal_rank(ranked_ids, relevant_ids))
+        ndcgs.append(ndcg_at_k(ranked_ids, relevant_ids, config.top_k))
+
+    latencies_ms: list[float] = []
+    fallbacks = get_metrics().value("rerank_fallbacks_total")
+    for _ in range(repeats):
+        if rerank_service is not None:
+            rerank_service.clear_cache()
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+    fallbacks = get_metrics().value("rerank_fallbacks_total") - fallbacks
+
+    return EvaluationResult(
+        config=config,
+        recall=statistics.fmean(recalls),
+        mrr=statistics.fmean(reciprocal_ranks),
+        ndcg=statistics.fmean(ndcgs),
+        p50_ms=percentile(latencies_ms, 50),
+        p95_ms=percentile(latencies_ms, 95),
+        p99_ms=percentile(latencies_ms, 99),
+        peak_rss_mb=peak_rss_mb(),
+        rerank_fallback_rate=fallbacks / len(latencies_ms) if latencies_ms else 0.0,
+    )
+
+
+def evaluate_in_own_process(
+    config: RetrievalConfig, queries: list[LabelledQuery], repeats: int
+) -> EvaluationResult:
+    """`evaluate` in a fresh (spawned, the JVM doesn't survive a fork) process loading its own
+    indexes, so that the peak RSS reported is that of serving `config` alone."""
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return pool.submit(_load_and_evaluate, config, queries, repeats).result()
+
+
+def _load_and_evaluate(
+    config: RetrievalConfig, queries: list[LabelledQuery], repeats: int
+) -> EvaluationResult:
+    rag_service = RAGService()
+    try:
+        return evaluate(rag_service, config, queries, repeats)
+    finally:
+        rag_service.close()
+
+
+def format_table(results: list[EvaluationResult]) -> str:
+    """Markdown comparison table, best nDCG first"""
+    rows = [
+        "| config | recall@k | MRR | nDCG@k | p50 ms | p95 ms | p99 ms | rerank fallbacks "
+        "| peak RSS MB |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for result in sorted(results, key=lambda result: result.ndcg, reverse=True):
+        rows.append(
+            f"| {result.config.name} | {result.recall:.3f} | {result.mrr:.3f} | "
+            f"{result.ndcg:.3f} | {result.p50_ms:.2f} | {result.p95_ms:.2f} | "
+            f"{result.p99_ms:.2f} | {result.rerank_fallback_rate:.0%} | "
+            f"{result.peak_rss_mb:.0f} |"
+        )
+    return "\n".join(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queries", type=Path, help="JSONL query set (defaults to the seed set)")
+    parser.add_argument(
+        "--profile", nargs="+", choices=["global", "sharded"], default=["global", "sharded"]
+    )
+    parser.add_argument("--k1", type=float, nargs="+", default=[0.9])
+    parser.add_argument("--b", type=float, nargs="+", default=[0.4])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3])
+    parser.add_argument("--rerank", action="store_true", help="Also evaluate with reranking")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed passes over the queries")
+    parser.add_argument("--output", type=Path, help="Also save the results as JSON")
+    args = parser.parse_args()
+
+    queries = load_query_set(args.queries) if args.queries else create_seed_query_set()
+    configs = [
+        RetrievalConfig(profile=profile, k1=k1, b=b, top_k=top_k, rerank=rerank)
+        for profile, k1, b, top_k, rerank in itertools.product(
+            args.profile, args.k1, args.b, args.top_k, [False, True] if args.rerank else [False]
+        )
+    ]
+
+    results = []
+    for config in configs:
+        print(f"Evaluating {config.name} over {len(queries)} queries...")
+        results.append(evaluate_in_own_process(config, queries, args.repeats))
+
+    print(format_table(results))
+    if args.output:
+        args.output.write_text(json.dumps([result.model_dump() for result in results], indent=2))
+        print(f"Saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
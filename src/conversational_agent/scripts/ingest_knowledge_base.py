@@ -0,0 +1,256 @@
+# src/conversational_agent/scripts/ingest_knowledge_base.py
+"""Script to ingest knowledge base sources into the passage JSONL file indexed by Pyserini.
+
+Sources (JSONL, Markdown, HTML or CSV files, found recursively under the given directories) are
+streamed one document at a time through generators: read -> deduplicate -> split into overlapping
+passages -> written straight to disk. Only the ids and content hashes seen so far (for
+deduplication) are held in memory, so arbitrarily large source directories can be ingested.
+
+Usage:
+    python src/conversational_agent/scripts/ingest_knowledge_base.py --source path/to/docs
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+from collections.abc import Iterable, Iterator
+from html.parser import HTMLParser
+from pathlib import Path
+
+from conversational_agent.config.dependencies.rag import get_rag_config
+from conversational_agent.scripts.create_knowledge_base import create_sample_knowledge_base
+
+SUPPORTED_SUFFIXES = {".jsonl", ".md", ".markdown", ".html", ".htm", ".csv"}
+# Category of documents with neither a category field nor a prefixed id (not one shard each)
+DEFAULT_CATEGORY = "general"
+
+# Sentences are kept whole when packing passages (falls back to words for huge sentences)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def iter_source_files(sources: Iterable[Path]) -> Iterator[Path]:
+    """Yield every supported source file under `sources` (files or directories), in a stable order."""
+    for source in sources:
+        if source.is_file():
+            yield source
+            continue
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = Path(dirpath) / filename
+                if path.suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield path
+
+
+def iter_documents(path: Path, root: Path | None = None) -> Iterator[dict[str, str]]:
+    """Yield `{"id", "title", "contents"}` documents (plus `category` when the source has one).
+
+    Documents without an id of their own are identified by `path` relative to `root` (the source
+    directory it was found under, its parent by default), so that e.g `faq/refunds.md` and
+    `policies/refunds.md` don't collide.
+    """
+    file_id = path.relative_to(root or path.parent).with_suffix("").as_posix()
+    match path.suffix.lower():
+        case ".jsonl":
+            yield from _read_jsonl(path, file_id)
+        case ".md" | ".markdown":
+            yield from _read_markdown(path, file_id)
+        case ".html" | ".htm":
+            yield from _read_html(path, file_id)
+        case ".csv":
+            yield from _read_csv(path, file_id)
+        case suffix:
+            print(f"Skipping unsupported source {path} ({suffix})")
+
+
+def _read_jsonl(path: Path, file_id: str) -> Iterator[dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            yield {
+                "id": str(raw.get("id") or f"{file_id}_{line_number}"),
+                "title": raw.get("title", ""),
+                "contents": raw.get("contents") or raw.get("text") or "",
+                "category": raw.get("category", ""),
+            }
+
+
+def _read_markdown(path: Path, file_id: str) -> Iterator[dict[str, str]]:
+    text = path.read_text(encoding="utf-8")
+    title = path.stem
+    if heading := re.search(r"^#\s+(.+)$", text, flags=re.MULTILINE):
+        title = heading.group(1).strip()
+        text = text.replace(heading.group(0), "", 1)
+    yield {"id": file_id, "title": title, "contents": text}
+
+
+class _HTMLTextExtractor(HTMLParser):
+    _skipped_tags = {"script", "style", "head"}
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.title = ""
+        self.chunks: list[str] = []
+        self._stack: list[str] = []
+
+    def handle_starttag(self, tag, attrs) -> None:
+        self._stack.append(tag)
+
+    def handle_endtag(self, tag) -> None:
+        if tag in self._stack:
+            # Tolerate unclosed tags by popping back to the matching one
+            while self._stack and self._stack.pop() != tag:
+                pass
+
+    def handle_data(self, data) -> None:
+        if "title" in self._stack:
+            self.title += data.strip()
+        elif not self._skipped_tags.intersection(self._stack):
+            self.chunks.append(data)
+
+
+def _read_html(path: Path, file_id: str) -> Iterator[dict[str, str]]:
+    parser = _HTMLTextExtractor()
+    parser.feed(path.read_text(encoding="utf-8"))
+    yield {"id": file_id, "title": parser.title or path.stem, "contents": " ".join(parser.chunks)}
+
+
+def _read_csv(path: Path, file_id: str) -> Iterator[dict[str, str]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        for row_number, row in enumerate(csv.DictReader(f)):
+            yield {
+                "id": row.get("id") or f"{file_id}_{row_number}",
+                "title": row.get("title", ""),
+                "contents": row.get("contents") or row.get("text") or "",
+                "category": row.get("category", ""),
+            }
+
+
+def document_category(doc: dict[str, str]) -> str:
+    """Category of a document: its explicit `category` field, else the prefix of its id's last
+    path segment (`billing_001`, `faq/billing_refunds`), else `DEFAULT_CATEGORY`."""
+    if category := doc.get("category"):
+        return category.strip().lower()
+    prefix, separator, _ = doc["id"].rsplit("/", 1)[-1].partition("_")
+    return prefix.lower() if separator and prefix else DEFAULT_CATEGORY
+
+
+def normalize_whitespace(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def deduplicate(docs: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    """Drop empty documents, repeated ids and documents whose (normalized) contents were seen."""
+    seen_hashes: set[bytes] = set()
+    seen_ids: set[str] = set()
+    for doc in docs:
+        contents = normalize_whitespace(doc["contents"])
+        if not contents:
+            continue
+        digest = hashlib.blake2b(contents.lower().encode(), digest_size=16).digest()
+        if digest in seen_hashes or doc["id"] in seen_ids:
+            continue
+        seen_hashes.add(digest)
+        seen_ids.add(doc["id"])
+        yield {**doc, "contents": contents, "category": document_category(doc)}
+
+
+def split_into_passages(
+    doc: dict[str, str], passage_words: int, overlap_words: int
+) -> Iterator[dict[str, str]]:
+    """Split a document into passages of at most `passage_words` words (whole sentences where
+    possible), each starting with the last ~`overlap_words` words of the previous one.
+
+    Every passage keeps its parent's id (`parent_id`) and title. Documents fitting in a single
+    passage keep their original id.
+    """
+    words_per_sentence = [
+        sentence.split() for sentence in _SENTENCE_END.split(doc["contents"]) if sentence
+    ]
+    # Break up sentences that are too long to ever fit in a passage
+    units: list[list[str]] = []
+    for words in words_per_sentence:
+        for start in range(0, len(words), passage_words):
+            units.append(words[start : start + passage_words])
+
+    passages: list[list[str]] = []
+    current: list[str] = []
+    for unit in units:
+        if current and len(current) + len(unit) > passage_words:
+            passages.append(current)
+            current = current[-overlap_words:] if overlap_words else []
+            # Drop overlap that wouldn't leave room for the next unit
+            current = current[max(0, len(current) + len(unit) - passage_words) :]
+        current = current + unit
+    if current:
+        passages.append(current)
+
+    extra_fields = {key: value for key, value in doc.items() if key not in {"id", "contents"}}
+    for number, words in enumerate(passages):
+        yield {
+            **extra_fields,
+            "id": doc["id"] if len(passages) == 1 else f"{doc['id']}#{number}",
+            "parent_id": doc["id"],
+            "contents": " ".join(words),
+        }
+
+
+def ingest(
+    docs: Iterable[dict[str, str]], output: Path, passage_words: int, overlap_words: int
+) -> tuple[int, int]:
+    """Stream `docs` into passages written to `output` (atomically replaced once complete).
+
+    Returns the number of (deduplicated) documents and passages written.
+    """
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = output.with_name(f".{output.name}.tmp")
+    n_docs = n_passages = 0
+    with open(tmp_output, "w", encoding="utf-8") as f:
+        for doc in deduplicate(docs):
+            n_docs += 1
+            for passage in split_into_passages(doc, passage_words, overlap_words):
+                n_passages += 1
+                f.write(json.dumps(passage) + "\n")
+    os.replace(tmp_output, output)
+    return n_docs, n_passages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--source",
+        type=Path,
+        action="append",
+        default=[],
+        help="Source file/directory (repeatable). Defaults to the built-in sample knowledge base",
+    )
+    parser.add_argument("--output", type=Path, default=get_rag_config().kb_path)
+    parser.add_argument("--passage-words", type=int, default=120)
+    parser.add_argument("--overlap-words", type=int, default=30)
+    args = parser.parse_args()
+    if not 0 <= args.overlap_words < args.passage_words:
+        parser.error("--overlap-words must be smaller than --passage-words")
+
+    if args.source:
+        docs = (
+            doc
+            for source in args.source
+            for path in iter_source_files([source])
+            for doc in iter_documents(path, source if source.is_dir() else None)
+        )
+    else:
+        docs = iter(create_sample_knowledge_base())
+
+    n_docs, n_passages = ingest(docs, args.output, args.passage_words, args.overlap_words)
+    print(f"Ingested {n_docs} documents into {n_passages} passages")
+    print(f"Saved to: {args.output}")
+    print("Run 'python src/conversational_agent/scripts/build_rag_index.py' to (re)build the index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# src/conversational_agent/scripts/retriage_conversations.py
+"""Script to re-run triage over historical conversations and backfill their issues.
+
+Run after changing the triage prompt (`SYSTEM_MESSAGE`) or extraction schema
+(`OpenAIAPIIssueFormat`): each conversation's transcript (archived ones included) is re-extracted
+with the current ones, and the extracted fields are upserted into its issue (created if the
+conversation had none and the model would now create one). Transcripts are read from the database,
+or from a JSONL export (`{"conversation_id": ..., "turns": [{"role": ..., "text": ...}]}` lines).
+
+Progress is checkpointed after every batch: rerunning the command after a crash resumes where it
+stopped (pass `--restart` to start a new run over). Throughput and cost are reported as it runs.
+Transcripts whose extraction failed are saved next to the checkpoint (`<checkpoint>.failed.jsonl`),
+and can be re-triaged by passing that file as `--source` (with a checkpoint of its own).
+
+Usage:
+    python src/conversational_agent/scripts/retriage_conversations.py \\
+        [--source db|path/to/transcripts.jsonl] [--concurrency 8] [--batch-size 50] \\
+        [--checkpoint path/to/checkpoint.json] [--restart] [--limit N]
+"""
+
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+from conversational_agent.config.dependencies.container import get_container
+from conversational_agent.config.dependencies.database import init_db
+from conversational_agent.config.dependencies.retriage import get_retriage_config
+from conversational_agent.services.retriage_service import (
+    DB_SOURCE,
+    Checkpoint,
+    RetriageStats,
+    db_transcripts,
+    failed_transcripts_path,
+    get_retriage_service,
+    jsonl_transcripts,
+)
+
+
+async def run(args: argparse.Namespace) -> RetriageStats:
+    config = get_retriage_config()
+    failed_path = failed_transcripts_path(args.checkpoint)
+    if args.restart:
+        args.checkpoint.unlink(missing_ok=True)
+        if Path(args.source) != failed_path:
+            failed_path.unlink(missing_ok=True)
+    checkpoint = Checkpoint.load(args.checkpoint, args.source)
+    if checkpoint.cursor is not None:
+        print(f"Resuming from checkpoint {args.checkpoint}: {checkpoint.stats.summary()}")
+    if args.source == DB_SOURCE:
+        transcripts = db_transcripts(checkpoint.cursor, config.page_size)
+    else:
+        transcripts = jsonl_transcripts(Path(args.source), checkpoint.cursor)
+    try:
+        # Creates the tables (e.g of usage records) on databases initialized before they existed
+        await init_db()
+        stats = await get_retriage_service().run(
+            transcripts,
+            checkpoint,
+            args.checkpoint,
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            max_attempts=config.max_attempts,
+            report_interval_s=config.report_interval_s,
+            limit=args.limit,
+        )
+    finally:
+        await get_container().aclose()
+    if stats.failed:
+        print(
+            f"{stats.failed} transcripts failed, saved to {failed_path}: re-triage them with "
+            f"--source {failed_path} --checkpoint {failed_path.with_suffix('.checkpoint.json')}"
+        )
+    return stats
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    config = get_retriage_config()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--source", default=DB_SOURCE, help="'db', or the path of a JSONL transcript export"
+    )
+    parser.add_argument("--concurrency", type=int, default=config.concurrency)
+    parser.add_argument("--batch-size", type=int, default=config.batch_size)
+    parser.add_argument("--checkpoint", type=Path, default=config.checkpoint_path)
+    parser.add_argument(
+        "--restart", action="store_true", help="Discard the checkpoint of a previous run"
+    )
+    parser.add_argument("--limit", type=int, help="Stop after this many conversations")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run(args))
+    print(f"Done: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
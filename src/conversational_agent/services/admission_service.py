@@ -0,0 +1,138 @@
+import math
+import time
+from collections import Counter, OrderedDict
+from enum import StrEnum
+from logging import getLogger
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from conversational_agent.config.dependencies.admission import get_admission_config
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.utils import TTLCache
+
+logger = getLogger(__name__)
+
+
+class RequestPriority(StrEnum):
+    # Turns (and summaries) of conversations already in progress
+    ONGOING = "ongoing"
+    # Log-ins and new conversations, shed first under load
+    NEW = "new"
+
+
+class Rejection(BaseModel):
+    status_code: int
+    detail: str
+    retry_after_s: int
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets refilled at `rate_per_s`, holding at most `burst` tokens.
+
+    Only the least recently used `max_keys` buckets are kept (a forgotten key starts full again).
+    """
+
+    def __init__(self, rate_per_s: float, burst: int, max_keys: int = 100_000) -> None:
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def acquire(self, key: str, now: float | None = None) -> float:
+        """Take a token for `key`. Returns 0 if granted, else the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self._buckets.pop(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate_per_s)
+        wait_s = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait_s = (1 - tokens) / self.rate_per_s
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait_s
+
+
+class AdmissionController:
+    """Decides, before any DB or LLM work, whether an agent request is processed or shed.
+
+    Requests are checked against (cheapest first):
+    - a global cap of requests in flight, of which a share is reserved for ongoing conversations
+      (503: the process is overloaded, retry shortly),
+    - token buckets per client IP and per customer (429: this client is over its rate).
+    """
+
+    def __init__(self) -> None:
+        config = get_admission_config()
+        self.enabled = config.enabled
+        self.trust_forwarded_for = config.trust_forwarded_for
+        self._max_in_flight = config.max_in_flight
+        self._max_new_in_flight = math.floor(
+            config.max_in_flight * (1 - config.reserved_for_ongoing)
+        )
+        self._overload_retry_after_s = config.overload_retry_after_s
+        self._ip_limiter = TokenBucketLimiter(config.ip_rate_per_s, config.ip_burst)
+        self._customer_limiter = TokenBucketLimiter(
+            config.customer_rate_per_s, config.customer_burst
+        )
+        # Chat requests only carry a conversation id, remember whose conversations they are
+        self._conversation_owners: TTLCache[UUID, UUID] = TTLCache(
+            ttl_s=24 * 3600, max_size=100_000
+        )
+        self.in_flight = 0
+        self.shed: Counter[str] = Counter()
+
+    def register_conversation(self, conversation_id: UUID, customer_id: UUID) -> None:
+        self._conversation_owners.set(conversation_id, customer_id)
+
+    def customer_key(self, customer_id: UUID | None, conversation_id: UUID | None) -> str | None:
+        """Rate limiting key of the customer behind a request (its conversation if unknown)."""
+        if customer_id is None and conversation_id is not None:
+            customer_id = self._conversation_owners.get(conversation_id)
+            if customer_id is None:
+                return f"conversation:{conversation_id}"
+        return f"customer:{customer_id}" if customer_id is not None else None
+
+    def admit(
+        self, priority: RequestPriority, client_ip: str | None, customer_key: str | None
+    ) -> Rejection | None:
+        """Admit a request (to be `release`d once done), or get why it is rejected."""
+        max_in_flight = (
+            self._max_in_flight if priority == RequestPriority.ONGOING else self._max_new_in_flight
+        )
+        if self.in_flight >= max_in_flight:
+            return self._reject(
+                f"overloaded_{priority}", 503, "Server busy, please retry shortly", None
+            )
+        if client_ip is not None and (wait_s := self._ip_limiter.acquire(client_ip)):
+            return self._reject("ip_rate", 429, "Too many requests from this address", wait_s)
+        if customer_key is not None and (wait_s := self._customer_limiter.acquire(customer_key)):
+            return self._reject("customer_rate", 429, "Too many requests, slow down", wait_s)
+
+        self.in_flight += 1
+        return None
+
+    def charge_customer(self, customer_key: str) -> Rejection | None:
+        """Charge a message of an already admitted connection (chat WebSocket) to its customer's
+        rate, or get why it is rejected."""
+        if wait_s := self._customer_limiter.acquire(customer_key):
+            return self._reject("customer_rate", 429, "Too many requests, slow down", wait_s)
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def _reject(
+        self, reason: str, status_code: int, detail: str, wait_s: float | None
+    ) -> Rejection:
+        self.shed[reason] += 1
+        logger.debug(f"Shedding request ({reason})")
+        retry_after_s = self._overload_retry_after_s if wait_s is None else math.ceil(wait_s)
+        return Rejection(status_code=status_code, detail=detail, retry_after_s=retry_after_s)
+
+
+@resource()
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController()
@@ -1,8 +1,12 @@
 from logging import getLogger
+from typing import Annotated
+from uuid import UUID, uuid4
 
+from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
 
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.database import get_dialect_insert
 from conversational_agent.config.dependencies.rag import get_rag_config
 from conversational_agent.data_models.api_models import (
     LogInRequest,
@@ -20,30 +24,51 @@ from conversational_agent.data_models.ml_models import (
     SYSTEM_MESSAGE,
     SYSTEM_MESSAGE_WITH_RAG,
 )
-from conversational_agent.utils import singleton
+from conversational_agent.utils import TTLCache
 
 logger = getLogger(__name__)
 
 
 class AgentService:
     agent_name: str = "FakeAgentWhoDefinitelyCaresAboutYou"
+    _customer_cache_ttl_s: float = 60.0
 
-    async def log_in_user(self, request: LogInRequest, session: AsyncSession) -> LogInResponse:
-        # Check if user exists
-        result = await session.execute(select(Customer).where(Customer.email == request.email))
-        customer = result.scalar_one_or_none()
-        new_user = False
+    def __init__(self) -> None:
+        # Ids of customers recently seen to exist, saves a DB lookup per start_conversation
+        self._known_customers: TTLCache[UUID, bool] = TTLCache(self._customer_cache_ttl_s)
 
-        if customer is None:
-            # Customer is new (didn't previously exist), create them
-            new_user = True
-            customer = Customer(name=request.name, email=request.email)
-            session.add(customer)
+    async def log_in_user(self, request: LogInRequest, session: AsyncSession) -> LogInResponse:
+        # Atomically create the customer unless one with this email already exists, in one
+        # round-trip. The no-op update on conflict lets RETURNING hand back the existing row.
+        new_id = uuid4()
+        insert = get_dialect_insert(session)(Customer).values(
+            id=new_id, name=request.name, email=request.email, tenant=request.tenant
+        )
+        stmt = insert.on_conflict_do_update(
+            index_elements=["email"], set_={"email": insert.excluded.email}
+        ).returning(Customer.id, Customer.name, Customer.email, Customer.tenant)
+        customer = (await session.execute(stmt)).one()
+        # Customer is new (didn't previously exist) iff our freshly generated id was the one inserted
+        new_user = customer.id == new_id
 
+        self._known_customers.set(customer.id, True)
         return LogInResponse(
-            id=customer.id, name=customer.name, email=customer.email, new_user=new_user
+            id=customer.id,
+            name=customer.name,
+            email=customer.email,
+            tenant=customer.tenant,
+            new_user=new_user,
         )
 
+    async def customer_exists(self, customer_id: UUID, session: AsyncSession) -> bool:
+        """Check whether the customer exists, hitting the DB only if not recently seen."""
+        if customer_id in self._known_customers:
+            return True
+        if await session.get(Customer, customer_id) is None:
+            return False
+        self._known_customers.set(customer_id, True)
+        return True
+
     async def start_conversation(
         self, request: StartConversationRequest, session: AsyncSession
     ) -> StartConversationResponse:
@@ -72,6 +97,10 @@ class AgentService:
         return StartConversationResponse(conversation_id=conversation.id, message=initial_turn.text)
 
 
-@singleton
+@resource()
 def get_agent_service() -> AgentService:
     return AgentService()
+
+
+# Annotated fastapi dependency for getting the agent service
+AgentServiceDep = Annotated[AgentService, Depends(get_agent_service)]
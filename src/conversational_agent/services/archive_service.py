@@ -0,0 +1,183 @@
+import asyncio
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import delete, exists, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.database import get_session_maker
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    ConversationArchive,
+    Issue,
+    IssueStatus,
+    LLMUsage,
+    Role,
+    Turn,
+)
+
+logger = getLogger(__name__)
+
+# Issue statuses after which a conversation is finished (manual reviews may still be worked on)
+FINISHED_STATUSES = (IssueStatus.RESOLVED, IssueStatus.CLOSED)
+
+
+def compress_turns(turns: list[dict[str, Any]]) -> bytes:
+    """Compress turns (`id`, `role`, `text`, `created_at`) into an archive blob."""
+    payload = [
+        {
+            "id": str(turn["id"]),
+            "role": turn["role"],
+            "text": turn["text"],
+            "created_at": turn["created_at"].isoformat(),
+        }
+        for turn in turns
+    ]
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), level=9)
+
+
+def decompress_turns(blob: bytes, conversation_id: UUID) -> list[Turn]:
+    """Rehydrate an archive blob into (transient, never to be added to a session) turns."""
+    return [
+        Turn(
+            id=UUID(turn["id"]),
+            role=Role(turn["role"]),
+            text=turn["text"],
+            created_at=datetime.fromisoformat(turn["created_at"]),
+            conversation_id=conversation_id,
+        )
+        for turn in json.loads(zlib.decompress(blob))
+    ]
+
+
+def searchable_text(turns: list[dict[str, Any]]) -> str:
+    """Text of archived turns kept uncompressed for full-text search (system prompts excluded)."""
+    return "\n".join(turn["text"] for turn in turns if turn["role"] != Role.SYSTEM)
+
+
+async def load_turns(conversation: Conversation, session: AsyncSession) -> list[Turn]:
+    """A conversation's turns in order, transparently rehydrated from its archive if archived."""
+    await session.refresh(conversation, ["turns"])
+    if conversation.archived_at is None:
+        return list(conversation.turns)
+    archive = await session.get(ConversationArchive, conversation.id)
+    archived = decompress_turns(archive.turns_blob, conversation.id) if archive else []
+    # Turns written while the conversation was being archived stay in the hot table
+    return sorted(archived + list(conversation.turns), key=lambda turn: turn.created_at)
+
+
+class ArchiveService:
+    """Moves the turns of finished conversations out of the hot turn table into cold storage.
+
+    A conversation is archived once its issue is resolved or closed and it has had no new turn for
+    `older_than_days`: its turns become a single compressed `ConversationArchive` row. Work is done
+    in small batches, each in its own short transaction (candidate conversations are locked with
+    `FOR UPDATE SKIP LOCKED` on PostgreSQL, so rows in use are skipped rather than waited on), with
+    a pause in between so that live traffic is never blocked for long. The text of the archived
+    turns is also kept uncompressed (and full-text indexed) for `/support/search`.
+    """
+
+    async def archive(
+        self,
+        older_than: timedelta,
+        batch_size: int,
+        pause_s: float = 0.0,
+        max_batches: int | None = None,
+    ) -> int:
+        """Archive every conversation finished before `older_than` ago. Returns how many were."""
+        finished_before = datetime.now(timezone.utc) - older_than
+        archived = batches = 0
+        while max_batches is None or batches < max_batches:
+            async with get_session_maker()() as session:
+                count = await self.archive_batch(session, finished_before, batch_size)
+            archived += count
+            batches += 1
+            logger.info(f"Archived batch {batches} ({count} conversations, {archived} in total)")
+            if count < batch_size:
+                break
+            await asyncio.sleep(pause_s)
+        return archived
+
+    async def archive_batch(
+        self, session: AsyncSession, finished_before: datetime, batch_size: int
+    ) -> int:
+        """Archive (and commit) up to `batch_size` conversations finished before `finished_before`."""
+        conversation_ids = (
+            (
+                await session.execute(
+                    select(Conversation.id)
+                    .join(Issue, Conversation.issue_id == Issue.id)
+                    .where(
+                        Conversation.archived_at.is_(None),
+                        Issue.status.in_(FINISHED_STATUSES),
+                        # Idle: no turn since the cutoff (index-backed per conversation)
+                        ~exists().where(
+                            Turn.conversation_id == Conversation.id,
+                            Turn.created_at >= finished_before,
+                        ),
+                    )
+                    .order_by(Conversation.created_at)
+                    .limit(batch_size)
+                    .with_for_update(of=Conversation, skip_locked=True)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        if not conversation_ids:
+            return 0
+
+        # Turns written since the candidates were selected are newer than the cutoff and left as is
+        archived_turns = (
+            Turn.conversation_id.in_(conversation_ids),
+            Turn.created_at < finished_before,
+        )
+        rows = await session.execute(
+            select(Turn.id, Turn.role, Turn.text, Turn.created_at, Turn.conversation_id)
+            .where(*archived_turns)
+            .order_by(Turn.conversation_id, Turn.created_at)
+        )
+        turns_by_conversation: dict[UUID, list[dict[str, Any]]] = defaultdict(list)
+        for row in rows.mappings():
+            turns_by_conversation[row["conversation_id"]].append(dict(row))
+
+        now = datetime.now(timezone.utc)
+        session.add_all(
+            ConversationArchive(
+                conversation_id=conversation_id,
+                turns_blob=compress_turns(turns_by_conversation[conversation_id]),
+                turn_count=len(turns_by_conversation[conversation_id]),
+                search_text=searchable_text(turns_by_conversation[conversation_id]),
+                archived_at=now,
+            )
+            for conversation_id in conversation_ids
+        )
+        await session.execute(
+            update(LLMUsage)
+            .where(LLMUsage.turn_id.in_(select(Turn.id).where(*archived_turns)))
+            .values(turn_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            delete(Turn).where(*archived_turns).execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            update(Conversation)
+            .where(Conversation.id.in_(conversation_ids))
+            .values(archived_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return len(conversation_ids)
+
+
+@resource()
+def get_archive_service() -> ArchiveService:
+    return ArchiveService()
@@ -0,0 +1,328 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+from logging import getLogger
+from typing import Annotated, Any
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conversational_agent.config.dependencies.api import get_api_config
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.database import get_session_maker
+from conversational_agent.data_models.db_models import Conversation, IssueStatus
+from conversational_agent.services.admission_service import (
+    AdmissionController,
+    get_admission_controller,
+)
+from conversational_agent.services.deadline import Deadline
+from conversational_agent.services.llm_service import LLMService, get_llm_service
+from conversational_agent.utils import TTLCache
+
+logger = getLogger(__name__)
+
+
+class ClientMessage(BaseModel):
+    """Frame sent by the client: a user `message` (with a client-chosen id), `ping` or `pong`"""
+
+    type: str
+    id: str | None = None
+    text: str | None = None
+
+
+class ChatChannel:
+    """Per-conversation event log outliving its sockets, so that clients can resume.
+
+    Events (replies, status changes, errors) are numbered with `seq`. A reconnecting client passes
+    the last `seq` it received to get the events it missed replayed, and re-sends unanswered
+    messages: those already replied to (by id) get their reply replayed instead of a new LLM call.
+    """
+
+    def __init__(self, max_events: int) -> None:
+        self.status = IssueStatus.IN_PROGRESS
+        self.websocket: WebSocket | None = None
+        # Bumped by each attached socket, whose worker processes turns (one at a time) until then
+        self.generation = 0
+        self.turn_lock = asyncio.Lock()
+        self._seq = 0
+        self._events: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self._replies: dict[str, dict[str, Any]] = {}
+
+    async def attach(self, websocket: WebSocket, last_seq: int | None) -> bool:
+        """Make `websocket` the channel's socket (superseding any other) and replay missed events.
+
+        The superseded socket's worker starts no new turn, but its turn in flight is waited for
+        (its events are logged, then replayed) so that turns never interleave. Returns whether a
+        turn was waited for: the conversation loaded before attaching is then stale.
+        """
+        self.generation += 1
+        generation = self.generation
+        previous, self.websocket = self.websocket, None
+        if previous is not None:
+            await _close_quietly(previous, reason="Superseded by a newer connection")
+        waited = self.turn_lock.locked()
+        async with self.turn_lock:
+            if generation != self.generation:
+                # Superseded in turn while waiting
+                await _close_quietly(websocket, reason="Superseded by a newer connection")
+                return waited
+            self.websocket = websocket
+            if last_seq is not None:
+                for event in list(self._events):
+                    if event["seq"] > last_seq:
+                        await self.send(event)
+        return waited
+
+    def detach(self, websocket: WebSocket) -> None:
+        if self.websocket is websocket:
+            self.websocket = None
+
+    async def publish(self, event: dict[str, Any]) -> dict[str, Any]:
+        """Number, log and send (if a socket is attached) an event. Replies are kept by message id."""
+        self._seq += 1
+        event = {"seq": self._seq, **event}
+        self._events.append(event)
+        if event["type"] == "reply":
+            self._replies[event["reply_to"]] = event
+            # Only remember replies still in the replay window
+            while len(self._replies) > (self._events.maxlen or 0):
+                self._replies.pop(next(iter(self._replies)))
+        await self.send(event)
+        return event
+
+    def reply_to(self, message_id: str) -> dict[str, Any] | None:
+        return self._replies.get(message_id)
+
+    async def send(self, event: dict[str, Any]) -> None:
+        """Send an event to the attached socket. Lost events can be recovered by resuming."""
+        if (websocket := self.websocket) is None:
+            return
+        try:
+            await websocket.send_json(event)
+        except Exception as e:
+            logger.debug(f"Failed to send event to a closing WebSocket: {e}")
+
+
+class ChatSocketService:
+    """Serves a conversation's chat over a long-lived WebSocket.
+
+    The conversation and its history are loaded once per socket and replies are pushed back over
+    it, saving the HTTP setup, session creation and history reload paid by each `POST /chat` turn.
+    Messages are processed in order from a bounded queue (refused as `busy` when full), sockets are
+    pinged every `ws_heartbeat_s` and closed when silent for two intervals. With admission
+    control, each message is charged to the customer's rate (refused as `rate_limited` when over).
+    """
+
+    def __init__(self, llm_service: LLMService, admission: AdmissionController) -> None:
+        api_config = get_api_config()
+        self._llm_service = llm_service
+        self._admission = admission
+        self._heartbeat_s = api_config.ws_heartbeat_s
+        self._max_pending = api_config.ws_max_pending_messages
+        self._max_events = api_config.ws_replay_events
+        self._channels: TTLCache[UUID, ChatChannel] = TTLCache(api_config.ws_resume_ttl_s)
+
+    async def serve(
+        self, websocket: WebSocket, conversation_id: UUID, last_seq: int | None
+    ) -> None:
+        async with get_session_maker()() as session:
+            try:
+                conversation = await self._load(conversation_id, session)
+            except HTTPException as e:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+                return
+            await websocket.accept()
+            customer_key = None
+            if self._admission.enabled:
+                self._admission.register_conversation(conversation_id, conversation.customer_id)
+                customer_key = self._admission.customer_key(conversation.customer_id, None)
+
+            channel = self._channels.get(conversation_id) or ChatChannel(self._max_events)
+            self._channels.set(conversation_id, channel)
+            if await channel.attach(websocket, last_seq):
+                # The superseded socket's last turn was committed meanwhile
+                session.expire_all()
+                try:
+                    conversation = await self._load(conversation_id, session)
+                except HTTPException as e:
+                    await _close_quietly(websocket, reason=e.detail)
+                    channel.detach(websocket)
+                    return
+
+            inbox: asyncio.Queue[ClientMessage | None] = asyncio.Queue(self._max_pending)
+            last_seen = [time.monotonic()]
+            worker = asyncio.create_task(
+                self._process(inbox, channel, conversation_id, conversation, session)
+            )
+            reader = asyncio.create_task(
+                self._receive(websocket, inbox, channel, last_seen, customer_key)
+            )
+            heartbeat = asyncio.create_task(self._heartbeat(websocket, last_seen))
+            try:
+                # Until the client disconnects, or stops answering (its reads would hang forever)
+                await asyncio.wait({reader, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                reader.cancel()
+                heartbeat.cancel()
+                # Drop messages not started yet (the client re-sends them when resuming), but let
+                # the one in flight finish: its reply is kept for replay
+                while not inbox.empty():
+                    inbox.get_nowait()
+                inbox.put_nowait(None)
+                await worker
+                channel.detach(websocket)
+                # Restart the resume window from the disconnection
+                self._channels.set(conversation_id, channel)
+
+    async def _load(self, conversation_id: UUID, session: AsyncSession) -> Conversation:
+        """Load the conversation, then end the transaction: an idle socket must not keep its
+        pooled connection checked out (objects are not expired by the commit)."""
+        conversation = await self._llm_service.load_conversation(conversation_id, session)
+        await session.commit()
+        return conversation
+
+    async def _receive(
+        self,
+        websocket: WebSocket,
+        inbox: asyncio.Queue[ClientMessage | None],
+        channel: ChatChannel,
+        last_seen: list[float],
+        customer_key: str | None = None,
+    ) -> None:
+        while channel.websocket is websocket:
+            try:
+                frame = await websocket.receive_json()
+                message = ClientMessage.model_validate(frame)
+            except (WebSocketDisconnect, RuntimeError):
+                return
+            except (ValidationError, ValueError):
+                await websocket.send_json({"type": "error", "detail": "Invalid frame"})
+                continue
+
+            last_seen[0] = time.monotonic()
+            match message.type:
+                case "ping":
+                    await websocket.send_json({"type": "pong"})
+                case "pong":
+                    pass
+                case "message" if message.id and message.text:
+                    # Re-sent messages already answered are replayed for free
+                    if (
+                        customer_key is not None
+                        and channel.reply_to(message.id) is None
+                        and (rejection := self._admission.charge_customer(customer_key))
+                    ):
+                        await websocket.send_json(
+                            {
+                                "type": "rate_limited",
+                                "id": message.id,
+                                "retry_after_s": rejection.retry_after_s,
+                            }
+                        )
+                        continue
+                    try:
+                        inbox.put_nowait(message)
+                    except asyncio.QueueFull:
+                        # Backpressure: the client should wait for replies before sending more
+                        await websocket.send_json({"type": "busy", "id": message.id})
+                case _:
+                    await websocket.send_json({"type": "error", "detail": "Invalid frame"})
+
+    async def _heartbeat(self, websocket: WebSocket, last_seen: list[float]) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_s)
+            if time.monotonic() - last_seen[0] > 2 * self._heartbeat_s:
+                logger.info("Closing unresponsive chat WebSocket")
+                await _close_quietly(websocket, reason="Heartbeat timeout")
+                return
+            try:
+                await websocket.send_json({"type": "ping"})
+            except Exception:
+                return
+
+    async def _process(
+        self,
+        inbox: asyncio.Queue[ClientMessage | None],
+        channel: ChatChannel,
+        conversation_id: UUID,
+        conversation: Conversation,
+        session: AsyncSession,
+    ) -> None:
+        generation = channel.generation
+        while (message := await inbox.get()) is not None:
+            async with channel.turn_lock:
+                if channel.generation != generation:
+                    # Superseded: the client re-sends its unanswered messages over the new socket
+                    return
+                next_conversation = await self._turn(
+                    message, channel, conversation_id, conversation, session
+                )
+            if next_conversation is None:
+                return
+            conversation = next_conversation
+
+    async def _turn(
+        self,
+        message: ClientMessage,
+        channel: ChatChannel,
+        conversation_id: UUID,
+        conversation: Conversation,
+        session: AsyncSession,
+    ) -> Conversation | None:
+        """Reply to a message. Returns the conversation to reply to next (None if it can't be)."""
+        assert message.id is not None and message.text is not None
+        if (reply := channel.reply_to(message.id)) is not None:
+            # Already answered (re-sent after a reconnection): replay instead of re-asking the LLM
+            await channel.send(reply)
+            return conversation
+
+        await channel.send({"type": "typing", "reply_to": message.id})
+        deadline = Deadline.for_chat()
+        try:
+            response = await self._llm_service.reply(
+                conversation, message.text, session, deadline=deadline
+            )
+            await deadline.run_to_completion("commit", session.commit())
+        except Exception as e:
+            await session.rollback()
+            detail = e.detail if isinstance(e, HTTPException) else "Failed to process message"
+            logger.error(f"Chat WebSocket turn failed: {e}", exc_info=True)
+            await channel.publish({"type": "error", "reply_to": message.id, "detail": detail})
+            try:
+                # The rollback expired the conversation (and its history): reload it whole
+                return await self._load(conversation_id, session)
+            except HTTPException as e:
+                # e.g archived meanwhile: no further message can be replied to
+                if channel.websocket is not None:
+                    await _close_quietly(channel.websocket, reason=e.detail)
+                return None
+
+        await channel.publish(
+            {
+                "type": "reply",
+                "reply_to": message.id,
+                "text": response.reply,
+                "status": response.status,
+            }
+        )
+        if response.status != channel.status:
+            channel.status = response.status
+            await channel.publish({"type": "status", "status": response.status})
+        return conversation
+
+
+async def _close_quietly(websocket: WebSocket, reason: str) -> None:
+    with suppress(Exception):
+        await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason=reason)
+
+
+@resource()
+def get_chat_socket_service() -> ChatSocketService:
+    return ChatSocketService(get_llm_service(), get_admission_controller())
+
+
+# Annotated fastapi dependency for getting the chat WebSocket service
+ChatSocketServiceDep = Annotated[ChatSocketService, Depends(get_chat_socket_service)]
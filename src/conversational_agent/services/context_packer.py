@@ -0,0 +1,112 @@
+import re
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from conversational_agent.services.rag_service import Document
+
+logger = getLogger(__name__)
+
+# Rough English average, good enough to bound prompt size without a tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class ContextPacker:
+    """Packs retrieved documents into a prompt context of bounded size.
+
+    Documents are taken best-first and:
+    - dropped when scoring below `min_score`, or below `min_relative_score` x the best score,
+    - dropped when near-duplicates (word-trigram Jaccard similarity >= `duplicate_similarity`) of
+      an already packed document,
+    - truncated at a sentence boundary when they don't fully fit the remaining `token_budget`.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        min_score: float | None = None,
+        min_relative_score: float = 0.0,
+        duplicate_similarity: float = 0.8,
+    ) -> None:
+        self.token_budget = token_budget
+        self.min_score = min_score
+        self.min_relative_score = min_relative_score
+        self.duplicate_similarity = duplicate_similarity
+
+    def pack(self, docs: list["Document"]) -> str:
+        docs = self._filter_scores(sorted(docs, key=lambda doc: doc.score, reverse=True))
+        entries: list[str] = []
+        packed_shingles: list[set[tuple[str, ...]]] = []
+        remaining_tokens = self.token_budget
+        for doc in docs:
+            shingles = _shingles(doc.contents)
+            if any(
+                _jaccard(shingles, packed) >= self.duplicate_similarity
+                for packed in packed_shingles
+            ):
+                logger.debug(f"Skipping near-duplicate document {doc.id}")
+                continue
+
+            # Entries are joined by a blank line, count it against the budget too
+            separator_tokens = estimate_tokens("\n\n") if entries else 0
+            entry = self._truncate(
+                f"- {doc.title}: " if doc.title else "- ",
+                doc.contents,
+                remaining_tokens - separator_tokens,
+            )
+            if entry is None:
+                break
+            entries.append(entry)
+            packed_shingles.append(shingles)
+            remaining_tokens -= separator_tokens + estimate_tokens(entry)
+
+        logger.debug(
+            f"Packed {len(entries)}/{len(docs)} documents into "
+            f"~{self.token_budget - remaining_tokens}/{self.token_budget} tokens"
+        )
+        return "\n\n".join(entries)
+
+    def _filter_scores(self, docs: list["Document"]) -> list["Document"]:
+        if not docs:
+            return docs
+        threshold = self.min_score
+        best_score = docs[0].score
+        if self.min_relative_score and best_score > 0:
+            relative_threshold = self.min_relative_score * best_score
+            threshold = (
+                relative_threshold if threshold is None else max(threshold, relative_threshold)
+            )
+        if threshold is None:
+            return docs
+        return [doc for doc in docs if doc.score >= threshold]
+
+    @staticmethod
+    def _truncate(prefix: str, contents: str, budget_tokens: int) -> str | None:
+        """`prefix + contents` cut to the whole sentences fitting `budget_tokens` (None if none)."""
+        if estimate_tokens(prefix + contents) <= budget_tokens:
+            return prefix + contents
+        entry = prefix
+        for sentence in _SENTENCE_END.split(contents):
+            candidate = f"{entry} {sentence}" if entry != prefix else entry + sentence
+            if estimate_tokens(candidate) > budget_tokens:
+                break
+            entry = candidate
+        return entry if entry != prefix else None
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
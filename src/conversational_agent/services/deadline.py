@@ -0,0 +1,87 @@
+import asyncio
+import math
+import time
+from collections.abc import Awaitable
+from typing import TypeVar
+
+from conversational_agent.config.dependencies.api import get_api_config
+from conversational_agent.services.metrics import get_metrics
+
+T = TypeVar("T")
+
+# Header through which clients can shorten (down to their own timeout) a chat request's budget
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str) -> None:
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Time budget of a request, shared by its successive stages.
+
+    Each stage is given whatever is left of the budget (minus what it must leave to later stages),
+    so that a slow stage eats into the next ones' budget instead of holding the request forever.
+    Stage durations and timeouts are recorded as metrics.
+    """
+
+    def __init__(self, budget_s: float) -> None:
+        self.budget_s = budget_s
+        self._expires_at = time.monotonic() + budget_s
+
+    @classmethod
+    def for_chat(cls, requested_ms: int | None = None) -> "Deadline":
+        """Deadline of a chat turn: the configured one, or shorter if requested by the client."""
+        config = get_api_config()
+        budget_ms = config.chat_deadline_ms
+        if requested_ms is not None:
+            budget_ms = min(budget_ms, requested_ms)
+        return cls(budget_ms / 1000 if budget_ms else math.inf)
+
+    def remaining_s(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    async def run(self, stage: str, awaitable: Awaitable[T], reserve_s: float = 0.0) -> T:
+        """Await `awaitable` within the remaining budget, minus `reserve_s` left to later stages.
+
+        Raises `DeadlineExceeded` (cancelling `awaitable`) if it doesn't complete in time.
+        """
+        metrics = get_metrics()
+        timeout_s = self.remaining_s() - reserve_s
+        started = time.perf_counter()
+        try:
+            if math.isinf(timeout_s):
+                return await awaitable
+            if timeout_s <= 0:
+                # Not even started: don't leave a coroutine never awaited (or a task running)
+                task = asyncio.ensure_future(awaitable)
+                task.cancel()
+                raise TimeoutError
+            return await asyncio.wait_for(awaitable, timeout_s)
+        except TimeoutError:
+            metrics.inc(
+                "chat_stage_timeouts_total", "Chat stages cut short by the deadline", stage=stage
+            )
+            raise DeadlineExceeded(stage) from None
+        finally:
+            _observe(stage, time.perf_counter() - started)
+
+    async def run_to_completion(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """Await `awaitable` however long it takes, only recording its duration as a stage.
+
+        For stages that must not be cut short, e.g committing: a cancelled COMMIT may still be
+        applied by the server, so failing the request would have the client retry a saved turn.
+        """
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            _observe(stage, time.perf_counter() - started)
+
+
+def _observe(stage: str, duration_s: float) -> None:
+    get_metrics().observe(
+        "chat_stage_seconds", "Time spent in each chat stage", duration_s, stage=stage
+    )
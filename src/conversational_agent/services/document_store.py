@@ -0,0 +1,65 @@
+import json
+import mmap
+from logging import getLogger
+from pathlib import Path
+
+from conversational_agent.config.dependencies.rag import get_rag_config
+from conversational_agent.services.index_releases import current_release
+from conversational_agent.utils import fork_shared
+
+logger = getLogger(__name__)
+
+
+class DocumentStore:
+    """Read-only, memory-mapped view over the JSONL knowledge base.
+
+    The file is mmapped rather than parsed into Python objects so that API workers forked from the
+    pre-loading parent share the same physical pages. Only a compact `id -> (offset, length)`
+    lookup lives on the heap; documents are decoded on demand.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._offsets: dict[str, tuple[int, int]] = {}
+        self._mmap: mmap.mmap | None = None
+
+        with open(path, "rb") as f:
+            if path.stat().st_size == 0:
+                logger.warning(f"Knowledge base {path} is empty")
+                return
+            # The mapping stays valid after the file object is closed
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offset = 0
+        for line in iter(self._mmap.readline, b""):
+            if line.strip():
+                doc_id = json.loads(line).get("id")
+                if doc_id is not None:
+                    self._offsets[doc_id] = (offset, len(line))
+            offset += len(line)
+        logger.info(f"Memory-mapped {len(self._offsets)} documents from {path}")
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def get(self, doc_id: str) -> dict[str, str] | None:
+        """Get the raw JSON document stored under `doc_id`, if any."""
+        if self._mmap is None or (location := self._offsets.get(doc_id)) is None:
+            return None
+        offset, length = location
+        return json.loads(self._mmap[offset : offset + length])
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+@fork_shared
+def get_document_store() -> DocumentStore | None:
+    """Get the shared store of the served release's knowledge base (`None` if it doesn't exist)."""
+    kb_path = current_release(get_rag_config()).kb_path
+    if not kb_path.exists():
+        logger.warning(f"Knowledge base file not found: {kb_path}")
+        return None
+    return DocumentStore(kb_path)
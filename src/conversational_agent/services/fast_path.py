@@ -0,0 +1,151 @@
+"""Rule-based stage answering trivial chat turns (e.g "quit", "thanks, that's all", an empty
+message or a bare order number) without a round-trip to the LLM.
+
+Messages are classified by the configured patterns, then a tiny keyword classifier for the short
+ones they miss. Anything else (or that needs context, e.g an order number before any issue was
+triaged) falls through to the LLM. Hits and misses are counted on `/metrics`.
+
+Only explicit cases are matched: a number is only taken as an order number when labelled as one
+or repeating one of the conversation, and acknowledgements ("ok thanks") never end it.
+"""
+
+import re
+from collections.abc import Sequence
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.fast_path import (
+    FastPathConfig,
+    get_fast_path_config,
+)
+from conversational_agent.data_models.db_models import IssueStatus
+from conversational_agent.data_models.ml_models import OpenAIAPIIssueFormat
+from conversational_agent.services.metrics import get_metrics
+
+
+class Intent(StrEnum):
+    EMPTY = "empty"
+    CLOSE = "close"
+    RESOLVE = "resolve"
+    ORDER_NUMBER = "order_number"
+
+
+class Classification(BaseModel):
+    intent: Intent
+    # "pattern" or "classifier"
+    matched_by: str
+    order_number: int | None = None
+
+
+class FastPath:
+    """Classifies chat messages, and replies to those it can without the LLM."""
+
+    def __init__(self, config: FastPathConfig) -> None:
+        self._config = config
+        self._patterns = [
+            (Intent.CLOSE, re.compile(pattern)) for pattern in config.close_patterns
+        ] + [(Intent.RESOLVE, re.compile(pattern)) for pattern in config.resolve_patterns]
+        self._order_number = re.compile(config.order_number_pattern)
+        self._bare_order_number = re.compile(config.bare_order_number_pattern)
+        self._keywords = {
+            Intent.CLOSE: frozenset(config.close_keywords),
+            Intent.RESOLVE: frozenset(config.resolve_keywords),
+        }
+        self._filler_words = frozenset(config.filler_words)
+
+    def classify(self, message: str, history: Sequence[str] = ()) -> Classification | None:
+        """The intent of a trivial message, None for those left to the LLM.
+
+        `history` is the text of the conversation's previous turns, in which a bare number must
+        appear to be taken as an order number.
+        """
+        text = _normalize(message)
+        if not text:
+            return Classification(intent=Intent.EMPTY, matched_by="pattern")
+        match = self._order_number.fullmatch(text)
+        if match is None and (bare := self._bare_order_number.fullmatch(text)):
+            mentioned = {number for turn in history for number in re.findall(r"\d+", turn)}
+            match = bare if bare[1] in mentioned else None
+        if match is not None:
+            return Classification(
+                intent=Intent.ORDER_NUMBER, matched_by="pattern", order_number=int(match[1])
+            )
+        for intent, pattern in self._patterns:
+            if pattern.fullmatch(text):
+                return Classification(intent=intent, matched_by="pattern")
+        if (intent := self._classify_words(text.split())) is not None:
+            return Classification(intent=intent, matched_by="classifier")
+        return None
+
+    def reply(
+        self, message: str, has_issue: bool, history: Sequence[str] = ()
+    ) -> OpenAIAPIIssueFormat | None:
+        """The decision (as the LLM would have made it) on a message of a conversation with the
+        `history` of previous turns, None to fall through to the LLM.
+
+        Closing/resolving sets the status of the conversation's issue, if it has one. A restated
+        order number is merged into the issue, so is left to the LLM if there is none yet.
+        """
+        classification = self.classify(message, history)
+        if classification is not None and (
+            classification.intent != Intent.ORDER_NUMBER or has_issue
+        ):
+            decision = self._decide(classification, has_issue)
+            get_metrics().inc(
+                "chat_fast_path_hits_total",
+                "Chat turns replied to without the LLM",
+                intent=classification.intent.value,
+                matched_by=classification.matched_by,
+            )
+            return decision
+        get_metrics().inc("chat_fast_path_misses_total", "Chat turns left to the LLM")
+        return None
+
+    def _decide(self, classification: Classification, has_issue: bool) -> OpenAIAPIIssueFormat:
+        config = self._config
+        match classification.intent:
+            case Intent.EMPTY:
+                return OpenAIAPIIssueFormat(assistant_reply=config.empty_reply)
+            case Intent.CLOSE:
+                return OpenAIAPIIssueFormat(
+                    status=IssueStatus.CLOSED,
+                    create_issue=has_issue,
+                    assistant_reply=config.close_reply,
+                )
+            case Intent.RESOLVE:
+                return OpenAIAPIIssueFormat(
+                    status=IssueStatus.RESOLVED,
+                    create_issue=has_issue,
+                    assistant_reply=config.resolve_reply,
+                )
+            case Intent.ORDER_NUMBER:
+                return OpenAIAPIIssueFormat(
+                    order_number=classification.order_number,
+                    create_issue=True,
+                    assistant_reply=config.order_number_reply.format(
+                        order_number=classification.order_number
+                    ),
+                )
+
+    def _classify_words(self, words: list[str]) -> Intent | None:
+        """Intent whose keywords (alone, among filler words) make up a short message."""
+        if len(words) > self._config.classifier_max_words:
+            return None
+        content = set(words) - self._filler_words
+        intents = [intent for intent, keywords in self._keywords.items() if content & keywords]
+        # Mixed or unknown words (e.g "thanks, but it still doesn't work") need the LLM
+        if len(intents) != 1 or not content <= self._keywords[intents[0]]:
+            return None
+        return intents[0]
+
+
+def _normalize(message: str) -> str:
+    text = message.lower().replace("’", "'")
+    return " ".join(re.sub(r"[^\w'#]+", " ", text).split())
+
+
+@resource()
+def get_fast_path() -> FastPath:
+    return FastPath(get_fast_path_config())
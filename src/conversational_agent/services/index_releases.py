@@ -0,0 +1,161 @@
+"""Versioned releases of the retrieval indexes, published by atomically swapping a pointer file.
+
+    <releases_path>/
+        CURRENT                    # version of the release to serve
+        20261019T120000123456Z/
+            sparse/                # global index
+            shards/<category>/     # per-category sub-indexes
+            knowledge_base.jsonl   # the knowledge base the indexes were built from
+            PUBLISHED | FAILED     # marker, once published (resp. failed verification)
+
+A release is never modified once published, so a new build never pulls files out from under the
+searchers still serving the previous one (see `RAGService.reload`). Publishing prunes the oldest
+published releases, and failed ones older than the published release: other releases may still be
+being built.
+
+With `RAG__MULTI_TENANT`, each tenant (brand) has its own knowledge base and releases, registered
+by tenant under `RAGConfig.tenants_path`:
+
+    <tenants_path>/<tenant>/
+        knowledge_base.jsonl       # the tenant's knowledge base, indexed by build_rag_index.py
+        releases/                  # laid out as above
+"""
+
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from conversational_agent.config.dependencies.rag import TENANT_PATTERN, RAGConfig
+
+logger = getLogger(__name__)
+
+CURRENT_POINTER = "CURRENT"
+PUBLISHED_MARKER = "PUBLISHED"
+FAILED_MARKER = "FAILED"
+# Version of the unversioned indexes at `RAGConfig.index_path`/`shards_path`, served until a
+# release is published
+LEGACY_VERSION = "legacy"
+# Header through which clients select the tenant whose knowledge base is searched (defaults to
+# the customer's)
+TENANT_HEADER = "X-Tenant-Id"
+
+
+class UnknownTenant(LookupError):
+    def __init__(self, tenant: str) -> None:
+        super().__init__(f"No published knowledge base for tenant {tenant!r}")
+        self.tenant = tenant
+
+
+class IndexRelease(BaseModel):
+    version: str
+    index_path: Path
+    shards_path: Path
+    kb_path: Path
+
+
+def release_at(path: Path) -> IndexRelease:
+    return IndexRelease(
+        version=path.name,
+        index_path=path / "sparse",
+        shards_path=path / "shards",
+        kb_path=path / "knowledge_base.jsonl",
+    )
+
+
+def tenant_path(config: RAGConfig, tenant: str) -> Path:
+    """Registry directory of `tenant` (raises `UnknownTenant` for names that can't be one)."""
+    if not re.fullmatch(TENANT_PATTERN, tenant):
+        raise UnknownTenant(tenant)
+    return config.tenants_path / tenant
+
+
+def releases_path(config: RAGConfig, tenant: str | None = None) -> Path:
+    """Directory of the releases of `tenant` (of the default knowledge base if `None`)."""
+    if tenant is None:
+        return config.releases_path
+    return tenant_path(config, tenant) / "releases"
+
+
+def source_kb_path(config: RAGConfig, tenant: str | None = None) -> Path:
+    """Knowledge base the releases of `tenant` are built from."""
+    if tenant is None:
+        return config.kb_path
+    return tenant_path(config, tenant) / "knowledge_base.jsonl"
+
+
+def current_release(config: RAGConfig, tenant: str | None = None) -> IndexRelease:
+    """The published release to serve.
+
+    Falls back to the unversioned legacy indexes if none of the default knowledge base was
+    published, raises `UnknownTenant` if none of `tenant`'s was.
+    """
+    path = releases_path(config, tenant)
+    try:
+        version = (path / CURRENT_POINTER).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        version = ""
+    if not version and tenant is not None:
+        raise UnknownTenant(tenant)
+    if not version:
+        return IndexRelease(
+            version=LEGACY_VERSION,
+            index_path=config.index_path,
+            shards_path=config.shards_path,
+            kb_path=config.kb_path,
+        )
+    return release_at(path / version)
+
+
+def new_release(config: RAGConfig, tenant: str | None = None) -> IndexRelease:
+    """Create the (empty) directory of a new, not yet published, release."""
+    path = releases_path(config, tenant) / datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path.mkdir(parents=True)
+    return release_at(path)
+
+
+def publish_release(config: RAGConfig, release: IndexRelease, tenant: str | None = None) -> None:
+    """Make `release` the current one, then prune old releases (see `prune_releases`)."""
+    path = releases_path(config, tenant)
+    (release.index_path.parent / PUBLISHED_MARKER).touch()
+    pointer = path / CURRENT_POINTER
+    if (
+        pointer.exists()
+        and (previous := path / pointer.read_text(encoding="utf-8").strip()).is_dir()
+    ):
+        # Published before releases were marked as such
+        (previous / PUBLISHED_MARKER).touch()
+    staged_pointer = pointer.with_name(f".{CURRENT_POINTER}.tmp")
+    staged_pointer.write_text(release.version, encoding="utf-8")
+    # Atomic: readers see either the previous or the new version, never a partial write
+    os.replace(staged_pointer, pointer)
+    logger.info(f"Published index release {release.version} of {path}")
+    prune_releases(config, release, tenant)
+
+
+def mark_failed(release: IndexRelease) -> None:
+    """Mark `release` as failed, to be left for inspection until a newer one is published."""
+    (release.index_path.parent / FAILED_MARKER).touch()
+
+
+def prune_releases(config: RAGConfig, current: IndexRelease, tenant: str | None = None) -> None:
+    """Delete all but the `keep_releases` newest published releases, and failed ones older than
+    `current`. `current` and releases neither published nor failed (e.g still being built by
+    another process) are never deleted."""
+    releases = sorted(
+        release_path
+        for release_path in releases_path(config, tenant).iterdir()
+        if release_path.is_dir() and not release_path.name.startswith(".")
+    )
+    published = [path for path in releases if (path / PUBLISHED_MARKER).exists()]
+    failed = [
+        path for path in releases if (path / FAILED_MARKER).exists() and path.name < current.version
+    ]
+    for release_path in published[: -config.keep_releases] + failed:
+        if release_path.name != current.version:
+            shutil.rmtree(release_path, ignore_errors=True)
+            logger.info(f"Deleted old index release {release_path.name}")
@@ -1,9 +1,14 @@
+import asyncio
+import math
+import time
 from logging import getLogger
+from typing import TYPE_CHECKING, Annotated
 from uuid import UUID
 
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
 from openai import AsyncOpenAI
 from openai.types.chat import (
+    ChatCompletion,
     ChatCompletionAssistantMessageParam,
     ChatCompletionMessageParam,
     ChatCompletionSystemMessageParam,
@@ -11,84 +16,320 @@ from openai.types.chat import (
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from conversational_agent.config.dependencies.openai import get_openai_api_config
+from conversational_agent.config.dependencies.api import get_api_config
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.fast_path import get_fast_path_config
+from conversational_agent.config.dependencies.openai import get_openai_client
+from conversational_agent.config.dependencies.rag import get_rag_config
 from conversational_agent.data_models.api_models import ChatRequest, ChatResponse
 from conversational_agent.data_models.db_models import (
+    CallType,
     Conversation,
+    Customer,
     Issue,
     IssueStatus,
+    IssueType,
+    LLMUsage,
     Role,
     Turn,
     UrgencyLevel,
 )
-from conversational_agent.data_models.ml_models import OpenAIAPIIssueFormat
-from conversational_agent.services.rag_service import RAGService
-from conversational_agent.utils import singleton
+from conversational_agent.data_models.ml_models import (
+    RETRIAGE_MESSAGE,
+    SYSTEM_MESSAGE,
+    OpenAIAPIIssueFormat,
+)
+from conversational_agent.services.archive_service import load_turns
+from conversational_agent.services.deadline import Deadline, DeadlineExceeded
+from conversational_agent.services.fast_path import FastPath, get_fast_path
+from conversational_agent.services.metrics import get_metrics
+from conversational_agent.services.model_router import RoutingDecision, get_model_router
+from conversational_agent.utils import TTLCache
+
+if TYPE_CHECKING:
+    from conversational_agent.services.rag_service import RAGService
+    from conversational_agent.services.rerank_service import RerankService
 
 logger = getLogger(__name__)
 
+# Sent instead of the model's reply when it can't be obtained within the request's deadline
+DEADLINE_REPLY = (
+    "Sorry, I'm taking longer than usual to look into this. "
+    "Could you send your last message again in a moment?"
+)
+# Remembered tenant of conversations whose customer has none (searched in the default knowledge
+# base)
+_DEFAULT_TENANT = ""
+
 
 class LLMService:
-    _model_name: str = "gpt-5-nano"  # Cheap, fast
+    _issue_type_ttl_s: float = 24 * 3600
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        rag_service: "RAGService | None" = None,
+        rerank_service: "RerankService | None" = None,
+        fast_path: FastPath | None = None,
+    ):
+        self._client = client
+        # Only set when RAG (resp. reranking of the retrieved documents) is enabled
+        self._rag_service = rag_service
+        self._rerank_service = rerank_service
+        # Only set when trivial turns are replied to without the LLM
+        self._fast_path = fast_path
+        # Picks the model of each call, e.g a stronger one to retry an unusable response
+        self._router = get_model_router()
+        # Issue type last triaged per conversation, lets retrieval start before any DB work
+        self._issue_types: TTLCache[UUID, IssueType] = TTLCache(
+            self._issue_type_ttl_s, max_size=100_000
+        )
+        # Tenant of each conversation's customer, whose knowledge base context is retrieved from
+        self._multi_tenant = get_rag_config().multi_tenant
+        self._tenants: TTLCache[UUID, str] = TTLCache(self._issue_type_ttl_s, max_size=100_000)
+        api_config = get_api_config()
+        self._commit_reserve_s = api_config.chat_commit_reserve_ms / 1000
+        # What retrieval must leave to the LLM (and saving the turn)
+        self._retrieval_reserve_s = (
+            api_config.chat_min_llm_budget_ms / 1000 + self._commit_reserve_s
+        )
+        self._min_retrieval_budget_s = api_config.chat_min_retrieval_budget_ms / 1000
 
-    def __init__(self):
-        openai_config = get_openai_api_config()
-        self._client = AsyncOpenAI(api_key=openai_config.key)
-        self._rag_service = RAGService()
+    async def warm_up(self) -> None:
+        """Open the provider connection ahead of the first chat request."""
+        await self._client.models.retrieve(self._router.default_model)
 
     async def chat(
-        self, conversation_id: UUID, request: ChatRequest, session: AsyncSession
+        self,
+        conversation_id: UUID,
+        request: ChatRequest,
+        session: AsyncSession,
+        deadline: Deadline | None = None,
+        tenant: str | None = None,
     ) -> ChatResponse:
-        # Get the conversation requested and associated turns
+        deadline = deadline or Deadline(math.inf)
+        retrieval = None
+        tenant = self._known_tenant(conversation_id, tenant)
+        if tenant is not None and not self._is_trivial(request.message):
+            # Retrieval only depends on the message (and the remembered issue type and tenant):
+            # start it right away, overlapping with loading the conversation and its history
+            retrieval = self._start_retrieval(conversation_id, request.message, deadline, tenant)
+        try:
+            try:
+                conversation = await deadline.run(
+                    "load_conversation",
+                    self.load_conversation(conversation_id, session),
+                    reserve_s=self._commit_reserve_s,
+                )
+            except DeadlineExceeded as e:
+                raise HTTPException(503, "Timed out loading the conversation, please retry") from e
+            return await self.reply(
+                conversation, request.message, session, retrieval, deadline, tenant
+            )
+        finally:
+            _discard(retrieval)
+
+    async def load_conversation(self, conversation_id: UUID, session: AsyncSession) -> Conversation:
+        """Get the conversation requested with its turns loaded (404 if it doesn't exist)."""
         conversation = await session.get(Conversation, conversation_id)
         if not conversation:
             raise HTTPException(404, "Conversation not found")
+        if conversation.archived_at is not None:
+            raise HTTPException(409, "Conversation is archived")
+        await session.refresh(conversation, ["turns"])
+        return conversation
+
+    async def reply(
+        self,
+        conversation: Conversation,
+        message: str,
+        session: AsyncSession,
+        retrieval: "asyncio.Task[str | None] | None" = None,
+        deadline: Deadline | None = None,
+        tenant: str | None = None,
+    ) -> ChatResponse:
+        """Reply to a user message in a conversation loaded by `load_conversation`.
 
-        # Save the user turn and refresh the conversation so it contains it
-        user_turn = Turn(role=Role.USER, text=request.message, conversation_id=conversation_id)
+        The new turns are appended to the loaded history, which is never reloaded, so the same
+        conversation can be replied to over many turns (e.g over a WebSocket). `retrieval` is the
+        context retrieval already started for the message, if any. Context is retrieved from the
+        knowledge base of `tenant`, the customer's by default (with `RAG__MULTI_TENANT`).
+
+        Within a `deadline`, retrieval is skipped or cut short to leave the LLM enough time, and a
+        holding reply is returned (leaving the issue untouched) if the LLM runs out of time.
+
+        With `FAST_PATH__ENABLED`, trivial messages (e.g "thanks, that's all") are replied to
+        without retrieval nor the LLM.
+        """
+        conversation_id = conversation.id
+        deadline = deadline or Deadline(math.inf)
+        fast_reply = None
+        if self._fast_path is not None:
+            history = [turn.text for turn in conversation.turns if turn.role != Role.SYSTEM]
+            fast_reply = self._fast_path.reply(message, conversation.issue_id is not None, history)
+        if fast_reply is None and retrieval is None and self._rag_service is not None:
+            if tenant is None:
+                tenant = await self._tenant_of(conversation, session)
+            retrieval = self._start_retrieval(conversation_id, message, deadline, tenant)
+        user_turn = Turn(role=Role.USER, text=message, conversation_id=conversation_id)
         session.add(user_turn)
-        await session.flush()
-        await session.refresh(conversation, ["turns"])
+        conversation.turns.append(user_turn)
+
+        usages: list[LLMUsage] = []
+        if fast_reply is not None:
+            model = fast_reply
+        else:
+            # Join the relevant context retrieval before assembling the prompt
+            context = await self._await_context(retrieval, deadline)
+            model, usages = await self._triage(
+                conversation_id, conversation.turns, context, deadline
+            )
 
-        # Attempt to get relevant context
-        context = (
-            await self._get_ongoing_context(request.message) if self._rag_service.enabled else None
+        if model is None:
+            # Out of time: a valid holding reply beats none, the issue is triaged on the next turn
+            logger.warning(f"LLM cut short by the deadline in conversation {conversation_id}")
+            get_metrics().inc(
+                "chat_degraded_replies_total", "Chat replies degraded to meet the deadline"
+            )
+            model = OpenAIAPIIssueFormat(assistant_reply=DEADLINE_REPLY)
+        else:
+            await self._handle_model_decision(conversation, model, session)
+            await self._remember_issue_type(conversation, session)
+
+        # Save assistant turn
+        reply = model.assistant_reply
+        assistant_turn = Turn(role=Role.ASSISTANT, text=reply, conversation_id=conversation_id)
+        session.add(assistant_turn)
+        conversation.turns.append(assistant_turn)
+        for usage in usages:
+            usage.turn_id = assistant_turn.id
+            session.add(usage)
+        return ChatResponse(
+            reply=reply,
+            status=model.status or IssueStatus.IN_PROGRESS,
         )
-        turns = conversation.turns
-        openai_messages = self._convert_turns_to_openai(turns, context)
 
-        # Call the OpenAI API
+    async def _triage(
+        self, conversation_id: UUID, turns: list[Turn], context: str | None, deadline: Deadline
+    ) -> tuple[OpenAIAPIIssueFormat | None, list[LLMUsage]]:
+        """Call the LLM for the reply and triage decision on the conversation's last message.
+
+        Returns the decision (`None` if the LLM ran out of time) and the usage of the call.
+        """
+        openai_messages = self._convert_turns_to_openai(turns, context)
+        usages: list[LLMUsage] = []
         model = None
         while True:
-            response = await self._client.chat.completions.parse(
-                model=self._model_name,
-                messages=openai_messages,
-                response_format=OpenAIAPIIssueFormat,
+            route = self._router.route(
+                CallType.TRIAGE, len(turns), len(context or ""), retry=bool(usages)
             )
+            usage = self._usage_for(usages, route, conversation_id, CallType.TRIAGE, context)
+            started = time.perf_counter()
+            try:
+                response = await deadline.run(
+                    "llm",
+                    self._client.chat.completions.parse(
+                        model=route.model,
+                        messages=openai_messages,
+                        response_format=OpenAIAPIIssueFormat,
+                    ),
+                    reserve_s=self._commit_reserve_s,
+                )
+            except DeadlineExceeded:
+                model = None
+                break
+            finally:
+                usage.latency_ms += (time.perf_counter() - started) * 1000
+            self._add_response_usage(usage, response)
             reply = response.choices[0].message
             model = reply.parsed
             if model is not None and model.assistant_reply:
                 break
+            usage.retries += 1
             logger.warning(f"Had to re-do the API call... got back response_model: {model}")
+        return model, usages
 
-        await self._handle_model_decision(conversation, model, session)
+    def _is_trivial(self, message: str) -> bool:
+        """Whether the fast path may reply to `message` (i.e retrieval could be wasted on it)."""
+        return self._fast_path is not None and self._fast_path.classify(message) is not None
 
-        # Save assistant turn
-        reply = model.assistant_reply
-        assistant_turn = Turn(role=Role.ASSISTANT, text=reply, conversation_id=conversation_id)
-        session.add(assistant_turn)
-        return ChatResponse(
-            reply=reply,
-            status=model.status or IssueStatus.IN_PROGRESS,
-        )
+    async def _remember_issue_type(self, conversation: Conversation, session: AsyncSession) -> None:
+        """Look up the issue type of a conversation not triaged by this process (e.g after a
+        restart), for the next turns' retrieval to start early."""
+        if conversation.issue_id is None or conversation.id in self._issue_types:
+            return
+        if (issue := await session.get(Issue, conversation.issue_id)) is not None:
+            self._issue_types.set(conversation.id, issue.issue_type)
+
+    def _known_tenant(self, conversation_id: UUID, requested: str | None) -> str | None:
+        """Tenant to retrieve from, if known without loading the conversation's customer."""
+        if not self._multi_tenant:
+            return _DEFAULT_TENANT
+        return requested or self._tenants.get(conversation_id)
+
+    async def _tenant_of(self, conversation: Conversation, session: AsyncSession) -> str:
+        """Look up the tenant of the conversation's customer (remembered for the next turns)."""
+        if (tenant := self._known_tenant(conversation.id, None)) is not None:
+            return tenant
+        customer = await session.get(Customer, conversation.customer_id)
+        tenant = (customer.tenant if customer else None) or _DEFAULT_TENANT
+        self._tenants.set(conversation.id, tenant)
+        return tenant
 
-    async def _get_ongoing_context(self, query: str) -> str | None:
-        docs = self._rag_service.search(query)
+    def _start_retrieval(
+        self, conversation_id: UUID, message: str, deadline: Deadline, tenant: str
+    ) -> "asyncio.Task[str | None] | None":
+        """Start retrieving context for `message` (from its issue type's shards once known).
+
+        Skipped when the deadline couldn't leave retrieval a useful budget.
+        """
+        if self._rag_service is None:
+            return None
+        if deadline.remaining_s() - self._retrieval_reserve_s < self._min_retrieval_budget_s:
+            get_metrics().inc(
+                "chat_retrieval_skipped_total", "Retrievals skipped for lack of time budget"
+            )
+            return None
+        issue_type = self._issue_types.get(conversation_id)
+        return asyncio.create_task(self._get_ongoing_context(message, issue_type, tenant or None))
+
+    async def _await_context(
+        self, retrieval: "asyncio.Task[str | None] | None", deadline: Deadline
+    ) -> str | None:
+        """Join a started retrieval, giving up on it (no context) if it eats the LLM's budget."""
+        if retrieval is None:
+            return None
+        try:
+            return await deadline.run("retrieval", retrieval, reserve_s=self._retrieval_reserve_s)
+        except DeadlineExceeded:
+            logger.warning("Retrieval cut short by the deadline, replying without context")
+            return None
+
+    async def _get_ongoing_context(
+        self, query: str, issue_type: IssueType | None = None, tenant: str | None = None
+    ) -> str | None:
+        if self._rag_service is None:
+            return None
+        # Lucene searches block: run them off the event loop so other stages proceed meanwhile
+        if self._rerank_service is None:
+            docs = await asyncio.to_thread(
+                self._rag_service.search, query, issue_type=issue_type, tenant=tenant
+            )
+        else:
+            # Over-retrieve, then keep the best few to keep the prompt short
+            candidates = await asyncio.to_thread(
+                self._rag_service.search,
+                query,
+                k=self._rerank_service.n_candidates,
+                issue_type=issue_type,
+                tenant=tenant,
+            )
+            docs = await self._rerank_service.rerank(query, candidates, tenant)
         if not docs:
             logger.debug("No RAG documents found for context.")
             return None
         logger.info(f"Found {len(docs)} RAG documents for context.")
-        return self._rag_service.format_context(docs)
+        return self._rag_service.format_context(docs) or None
 
     async def _handle_model_decision(
         self, conversation: Conversation, model: OpenAIAPIIssueFormat, session: AsyncSession
@@ -116,17 +357,20 @@ class LLMService:
         if not conversation:
             raise HTTPException(404, "Conversation not found")
 
-        await session.refresh(conversation, ["turns"])
-        turns = conversation.turns
+        turns = await load_turns(conversation, session)
         # Remove previous system to avoid model confusing its objective
         openai_messages = self._convert_turns_to_openai(
             [turn for turn in turns if turn.role != Role.SYSTEM]
         )
 
+        usages: list[LLMUsage] = []
         while True:
+            route = self._router.route(CallType.SUMMARY, len(turns), retry=bool(usages))
+            usage = self._usage_for(usages, route, converation_id, CallType.SUMMARY)
+            started = time.perf_counter()
             # Call the OpenAI API for summary
             response = await self._client.chat.completions.create(
-                model=self._model_name,
+                model=route.model,
                 messages=openai_messages
                 + [
                     ChatCompletionSystemMessageParam(
@@ -135,15 +379,89 @@ class LLMService:
                     )
                 ],
             )
+            usage.latency_ms += (time.perf_counter() - started) * 1000
+            self._add_response_usage(usage, response)
             reply = response.choices[0].message.content
 
             if reply:
                 break
+            usage.retries += 1
             logger.warning(
                 f"Had to re-do the API call for summary... got back nully reply: {reply}"
             )
+        session.add_all(usages)
         return reply
 
+    async def retriage(
+        self, conversation_id: UUID, turns: list[Turn], max_attempts: int = 3
+    ) -> tuple[OpenAIAPIIssueFormat | None, list[LLMUsage]]:
+        """Extract the issue of a past conversation from its transcript, with the current prompt.
+
+        Returns the extraction (`None` if none parsed within `max_attempts`) and the usage of the
+        call (one record per model it was routed to), for the caller to save.
+        """
+        # The prompt the conversation was held with is replaced by the current one
+        openai_messages = [
+            ChatCompletionSystemMessageParam(role="system", content=SYSTEM_MESSAGE),
+            *self._convert_turns_to_openai([turn for turn in turns if turn.role != Role.SYSTEM]),
+            ChatCompletionSystemMessageParam(role="system", content=RETRIAGE_MESSAGE),
+        ]
+        usages: list[LLMUsage] = []
+        model = None
+        for attempt in range(max_attempts):
+            if attempt:
+                usages[-1].retries += 1
+            route = self._router.route(CallType.RETRIAGE, len(turns), retry=attempt > 0)
+            usage = self._usage_for(usages, route, conversation_id, CallType.RETRIAGE)
+            started = time.perf_counter()
+            response = await self._client.chat.completions.parse(
+                model=route.model,
+                messages=openai_messages,
+                response_format=OpenAIAPIIssueFormat,
+            )
+            usage.latency_ms += (time.perf_counter() - started) * 1000
+            self._add_response_usage(usage, response)
+            if (model := response.choices[0].message.parsed) is not None:
+                break
+            logger.warning(f"Re-triage of conversation {conversation_id} returned no extraction")
+        return model, usages
+
+    def _usage_for(
+        self,
+        usages: list[LLMUsage],
+        route: RoutingDecision,
+        conversation_id: UUID,
+        call_type: CallType,
+        context: str | None = None,
+    ) -> LLMUsage:
+        """Usage record of the attempt about to be made with the routed model.
+
+        The call's attempts with the same model share one record (appended to `usages`), so that
+        each model's tokens are priced at its own rates.
+        """
+        if usages and usages[-1].model == route.model:
+            return usages[-1]
+        usage = LLMUsage(
+            conversation_id=conversation_id,
+            call_type=call_type,
+            model=route.model,
+            routing_rule=route.rule,
+            rag_enabled=self._rag_service is not None,
+            rag_context_chars=len(context or ""),
+        )
+        usages.append(usage)
+        return usage
+
+    @staticmethod
+    def _add_response_usage(usage: LLMUsage, response: ChatCompletion) -> None:
+        """Accumulate the token counts reported for one API attempt into `usage`."""
+        if response.usage is None:
+            return
+        usage.prompt_tokens += response.usage.prompt_tokens
+        usage.completion_tokens += response.usage.completion_tokens
+        if (details := response.usage.prompt_tokens_details) and details.cached_tokens:
+            usage.cached_tokens += details.cached_tokens
+
     def _convert_turns_to_openai(
         self, turns: list[Turn], context: str | None = None
     ) -> list[ChatCompletionMessageParam]:
@@ -185,6 +503,7 @@ class LLMService:
             order_number=model.order_number,
         )
         session.add(new_issue)
+        self._issue_types.set(conversation.id, new_issue.issue_type)
 
         # Link issue to conversation
         conversation.issue_id = new_issue.id
@@ -209,6 +528,7 @@ class LLMService:
             existing_issue.description = model.description
         if model.issue_type:
             existing_issue.issue_type = model.issue_type
+        self._issue_types.set(conversation.id, existing_issue.issue_type)
         if model.urgency:
             existing_issue.urgency = model.urgency
         if model.status:
@@ -220,6 +540,35 @@ class LLMService:
         logger.info(f"Updated existing issue {existing_issue.id} with new information")
 
 
-@singleton
+def _discard(task: "asyncio.Task | None") -> None:
+    """Cancel a stage no longer needed (e.g the request failed), without leaking its error."""
+    if task is None:
+        return
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+@resource()
 def get_llm_service() -> LLMService:
-    return LLMService()
+    rag_service = rerank_service = None
+    rag_config = get_rag_config()
+    if rag_config.enabled:
+        # Imported lazily so pyserini (and the JVM) are only loaded when RAG is enabled
+        from conversational_agent.services.rag_service import get_rag_service
+
+        rag_service = get_rag_service()
+        if rag_config.rerank_enabled:
+            # Same for sentence-transformers (and torch) when reranking is enabled
+            from conversational_agent.services.rerank_service import get_rerank_service
+
+            rerank_service = get_rerank_service()
+            # Scores of the previous releases would only take room
+            rag_service.on_reload(rerank_service.clear_cache)
+    fast_path = get_fast_path() if get_fast_path_config().enabled else None
+    return LLMService(get_openai_client(), rag_service, rerank_service, fast_path)
+
+
+# Annotated fastapi dependency for getting the LLM service
+LLMServiceDep = Annotated[LLMService, Depends(get_llm_service)]
@@ -0,0 +1,69 @@
+import threading
+from collections import defaultdict
+
+from conversational_agent.config.dependencies.container import resource
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Metrics:
+    """In-process counters and summaries, exposed in the Prometheus text format on `/metrics`.
+
+    Every worker process has its own registry (the container is reset when forking): scrape each
+    worker, or aggregate across them in the monitoring system.
+    """
+
+    def __init__(self) -> None:
+        self._counters: dict[str, dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        # Per summary and labels: [sum, count]
+        self._summaries: dict[str, dict[Labels, list[float]]] = defaultdict(
+            lambda: defaultdict(lambda: [0.0, 0])
+        )
+        self._help: dict[str, str] = {}
+        # Also updated from worker threads (e.g retrieval)
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, description: str, value: float = 1.0, **labels: str) -> None:
+        with self._lock:
+            self._help.setdefault(name, description)
+            self._counters[name][_labels(labels)] += value
+
+    def observe(self, name: str, description: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._help.setdefault(name, description)
+            summary = self._summaries[name][_labels(labels)]
+            summary[0] += value
+            summary[1] += 1
+
+    def value(self, name: str, **labels: str) -> float:
+        """Current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0.0)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines += [f"# HELP {name} {self._help[name]}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_format(labels)} {value}" for labels, value in series.items()]
+            for name, series in sorted(self._summaries.items()):
+                lines += [f"# HELP {name} {self._help[name]}", f"# TYPE {name} summary"]
+                for labels, (total, count) in series.items():
+                    lines.append(f"{name}_sum{_format(labels)} {total}")
+                    lines.append(f"{name}_count{_format(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+@resource()
+def get_metrics() -> Metrics:
+    return Metrics()
@@ -0,0 +1,70 @@
+from pydantic import BaseModel
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.routing import (
+    ModelRoutingConfig,
+    RoutingRule,
+    get_model_routing_config,
+)
+from conversational_agent.data_models.db_models import CallType
+from conversational_agent.services.metrics import get_metrics
+
+# Rule name recorded for calls no rule matched
+DEFAULT_RULE = "default"
+
+
+class RoutingDecision(BaseModel):
+    model: str
+    # Name of the rule that picked the model
+    rule: str
+
+
+class ModelRouter:
+    """Picks the model of each LLM call (attempt) from the configured routing rules.
+
+    Lets the cheapest model handle most calls, and a stronger one only those that need it (e.g
+    retries of a response that failed to parse). Decisions are counted on `/metrics`.
+    """
+
+    def __init__(self, config: ModelRoutingConfig) -> None:
+        self._default_model = config.default_model
+        self._rules = config.rules
+
+    @property
+    def default_model(self) -> str:
+        return self._default_model
+
+    def route(
+        self, call_type: CallType, n_turns: int, context_chars: int = 0, retry: bool = False
+    ) -> RoutingDecision:
+        """Model of a call over `n_turns` turns with `context_chars` of RAG context, `retry`
+        telling whether the previous attempt's response was unusable."""
+        decision = RoutingDecision(model=self._default_model, rule=DEFAULT_RULE)
+        for rule in self._rules:
+            if _matches(rule, call_type, n_turns, context_chars, retry):
+                decision = RoutingDecision(model=rule.model, rule=rule.name)
+                break
+        get_metrics().inc(
+            "llm_routed_calls_total",
+            "LLM calls (attempts) per routed model and routing rule",
+            model=decision.model,
+            rule=decision.rule,
+            call_type=call_type.value,
+        )
+        return decision
+
+
+def _matches(
+    rule: RoutingRule, call_type: CallType, n_turns: int, context_chars: int, retry: bool
+) -> bool:
+    return (
+        (rule.call_types is None or call_type in rule.call_types)
+        and (rule.min_turns is None or n_turns >= rule.min_turns)
+        and (rule.min_context_chars is None or context_chars >= rule.min_context_chars)
+        and (rule.retry is None or rule.retry == retry)
+    )
+
+
+@resource()
+def get_model_router() -> ModelRouter:
+    return ModelRouter(get_model_routing_config())
@@ -1,56 +1,400 @@
 import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
 from logging import getLogger
-from typing import List
+from pathlib import Path
+from typing import TYPE_CHECKING, List
 
 from pydantic import BaseModel
-from pyserini.search.lucene import LuceneSearcher
 
-from conversational_agent.config.dependencies.rag import get_rag_config
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.rag import RAGConfig, get_rag_config
+from conversational_agent.services.context_packer import ContextPacker
+from conversational_agent.services.document_store import DocumentStore, get_document_store
+from conversational_agent.services.index_releases import (
+    IndexRelease,
+    UnknownTenant,
+    current_release,
+)
+from conversational_agent.services.metrics import get_metrics
+
+if TYPE_CHECKING:
+    from pyserini.search.lucene import LuceneSearcher
 
 logger = getLogger(__name__)
 
 
 class Document(BaseModel):
     id: str = ""
+    # Id of the source document this passage was split from (same as `id` for unsplit documents)
+    parent_id: str = ""
     title: str = ""
     contents: str
     score: float
+    # Version of the index release the document was retrieved from (ids are only unique within one)
+    release: str = ""
+
+
+class IndexSnapshot:
+    """Searchers (and document store) over one index release, shared by the queries using it."""
+
+    def __init__(self, release: IndexRelease) -> None:
+        # Imported lazily: pyserini boots the JVM, which we only want to pay for when RAG is used
+        from pyserini.search.lucene import LuceneSearcher
+
+        self.release = release
+        self.sparse_searcher: "LuceneSearcher" = LuceneSearcher(str(release.index_path))
+        # Per-category sub-indexes (see build_rag_index.py), searched instead of the global index
+        # when the conversation's issue type is known
+        self.shard_searchers: dict[str, "LuceneSearcher"] = {}
+        if release.shards_path.is_dir():
+            for shard_path in sorted(release.shards_path.iterdir()):
+                if shard_path.is_dir():
+                    self.shard_searchers[shard_path.name] = LuceneSearcher(str(shard_path))
+        # Shared (memory-mapped) store of raw documents, avoids a JVM round-trip per hit. The
+        # fork-shared one when it is this release's, else one of our own
+        shared_store = get_document_store()
+        if shared_store is None or shared_store.path == release.kb_path:
+            self.document_store = shared_store
+        else:
+            self.document_store = (
+                DocumentStore(release.kb_path) if release.kb_path.exists() else None
+            )
+        self._owns_document_store = self.document_store is not shared_store
+        # Estimate of the memory it takes once warm: Lucene mmaps the index files, and the store
+        # the knowledge base
+        self.footprint_bytes = sum(
+            _disk_usage(path) for path in (release.index_path, release.shards_path, release.kb_path)
+        )
+        # Queries in flight, and whether a newer snapshot has replaced this one
+        self.in_flight = 0
+        self.retired = False
+        logger.info(
+            f"Opened index release {release.version} ({len(self.shard_searchers)} category shards)"
+        )
+
+    def close(self) -> None:
+        """Release the Lucene searchers (and their open index files)."""
+        self.sparse_searcher.close()
+        for searcher in self.shard_searchers.values():
+            searcher.close()
+        if self._owns_document_store and self.document_store is not None:
+            self.document_store.close()
+
+
+def _disk_usage(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
 
 
 class RAGService:
+    """Searches the current index release, swapping in newly published ones without downtime.
+
+    A newly published release (see `index_releases.py`) is picked up every `reload_interval_s` by
+    a background thread, or on demand with `reload`. It is opened off the request path and
+    atomically swapped in: queries started before the swap finish on the previous snapshot, which
+    is closed once the last of them completes.
+
+    Tenants' knowledge bases are opened on their first search, and kept in a pool bounded by
+    `tenant_pool_size` and `tenant_pool_memory_mb`: the least recently searched tenants are
+    evicted (closed once their in-flight queries complete) to make room, so that hundreds of
+    tenants can share a process while only the active ones hold searchers.
+    """
+
     def __init__(self, include_dense: bool = False) -> None:
         rag_config = get_rag_config()
-        idx_path = rag_config.index_path
         self.enabled = rag_config.enabled
-        self.sparse_searcher: LuceneSearcher = LuceneSearcher(str(idx_path))
+        self._shard_routing = rag_config.shard_routing
+        self._context_packer = ContextPacker(
+            token_budget=rag_config.context_token_budget,
+            min_score=rag_config.context_min_score,
+            min_relative_score=rag_config.context_min_relative_score,
+            duplicate_similarity=rag_config.context_duplicate_similarity,
+        )
         if include_dense:
             raise NotImplementedError("Dense search not implemented yet")
 
-    def search(self, query: str, k: int = 3) -> list[Document]:
+        self._snapshot = IndexSnapshot(current_release(rag_config))
+        # Open tenant snapshots, least recently searched first
+        self._tenants: OrderedDict[str, IndexSnapshot] = OrderedDict()
+        self._tenant_pool_size = rag_config.tenant_pool_size
+        self._tenant_pool_bytes = rag_config.tenant_pool_memory_mb * 1024 * 1024
+        # Tenants whose snapshot is being opened, set once it is (concurrent searches wait for it)
+        self._opening: dict[str, threading.Event] = {}
+        # Guards the current snapshots and the in-flight counts (searches run in worker threads)
+        self._lock = threading.Lock()
+        # Only one release is opened at a time
+        self._reload_lock = threading.Lock()
+        self._reload_listeners: list[Callable[[], None]] = []
+        self._stop_watching = threading.Event()
+        self._watcher: threading.Thread | None = None
+        if rag_config.reload_interval_s > 0:
+            self._watcher = threading.Thread(
+                target=self._watch,
+                args=(rag_config.reload_interval_s,),
+                name="index-release-watcher",
+                daemon=True,
+            )
+            self._watcher.start()
+
+    @property
+    def version(self) -> str:
+        """Version of the index release currently served."""
+        return self._snapshot.release.version
+
+    @property
+    def sparse_searcher(self) -> "LuceneSearcher":
+        return self._snapshot.sparse_searcher
+
+    @property
+    def shard_searchers(self) -> dict[str, "LuceneSearcher"]:
+        return self._snapshot.shard_searchers
+
+    @property
+    def open_tenants(self) -> list[str]:
+        """Tenants whose knowledge base is open, least recently searched first."""
+        with self._lock:
+            return list(self._tenants)
+
+    def close(self) -> None:
+        """Stop watching for new releases and close the current snapshots."""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+        with self._lock:
+            snapshots = [self._snapshot, *self._tenants.values()]
+            self._tenants.clear()
+            for snapshot in snapshots:
+                snapshot.retired = True
+            idle = [snapshot for snapshot in snapshots if snapshot.in_flight == 0]
+        for snapshot in idle:
+            snapshot.close()
+
+    def on_reload(self, listener: Callable[[], None]) -> None:
+        """Call `listener` whenever a reload changes a served release (e.g to drop its caches)."""
+        self._reload_listeners.append(listener)
+
+    def reload(self) -> bool:
+        """Swap in the currently published releases if they aren't the ones served. Blocking.
+
+        Open tenants whose release changed are evicted, to be reopened on their next search.
+        """
+        with self._reload_lock:
+            rag_config = get_rag_config()
+            swapped = self._swap_release(rag_config)
+            evicted = self._evict_stale_tenants(rag_config)
+            if swapped or evicted:
+                for listener in self._reload_listeners:
+                    listener()
+            return swapped or evicted
+
+    def _swap_release(self, rag_config: RAGConfig) -> bool:
+        release = current_release(rag_config)
+        if release.version == self._snapshot.release.version:
+            return False
+        # Opened while the previous snapshot keeps serving queries
+        snapshot = IndexSnapshot(release)
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+            previous.retired = True
+            idle = previous.in_flight == 0
+        if idle:
+            previous.close()
+        get_metrics().inc("rag_index_reloads_total", "Index releases swapped in")
+        logger.info(f"Swapped index release {previous.release.version} -> {release.version}")
+        return True
+
+    def _evict_stale_tenants(self, rag_config: RAGConfig) -> bool:
+        with self._lock:
+            open_tenants = list(self._tenants.items())
+        stale = []
+        for tenant, snapshot in open_tenants:
+            try:
+                version = current_release(rag_config, tenant).version
+            except UnknownTenant:
+                version = None
+            if version != snapshot.release.version:
+                stale.append((tenant, snapshot))
+        idle = []
+        with self._lock:
+            for tenant, snapshot in stale:
+                # Unless already evicted (and maybe reopened) meanwhile
+                if self._tenants.get(tenant) is snapshot:
+                    del self._tenants[tenant]
+                    snapshot.retired = True
+                    if snapshot.in_flight == 0:
+                        idle.append(snapshot)
+        for snapshot in idle:
+            snapshot.close()
+        if stale:
+            logger.info(f"Evicted tenants with a new index release: {[t for t, _ in stale]}")
+        return bool(stale)
+
+    def _watch(self, interval_s: float) -> None:
+        while not self._stop_watching.wait(interval_s):
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the current release (e.g the new one is corrupt), retry next time
+                logger.error(f"Failed to load the published index release: {e}", exc_info=True)
+
+    def _acquire(self, tenant: str | None = None) -> IndexSnapshot:
+        if tenant is not None:
+            return self._acquire_tenant(tenant)
+        with self._lock:
+            snapshot = self._snapshot
+            snapshot.in_flight += 1
+            return snapshot
+
+    def _acquire_tenant(self, tenant: str) -> IndexSnapshot:
+        """Get the snapshot of `tenant`'s knowledge base, opening it if it isn't in the pool."""
+        metrics = get_metrics()
+        while True:
+            with self._lock:
+                if (snapshot := self._tenants.get(tenant)) is not None:
+                    self._tenants.move_to_end(tenant)
+                    snapshot.in_flight += 1
+                    metrics.inc("rag_tenant_pool_hits_total", "Searches of an open tenant index")
+                    return snapshot
+                opening = self._opening.get(tenant)
+                if opening is None:
+                    opening = self._opening[tenant] = threading.Event()
+                    break
+            opening.wait()
+
+        metrics.inc("rag_tenant_pool_misses_total", "Searches that had to open a tenant index")
+        evicted: list[IndexSnapshot] = []
+        try:
+            # Outside the lock: searches of other tenants proceed while the searchers open
+            snapshot = IndexSnapshot(current_release(get_rag_config(), tenant))
+            with self._lock:
+                snapshot.in_flight += 1
+                self._tenants[tenant] = snapshot
+                evicted = self._evict_least_recent()
+        finally:
+            with self._lock:
+                del self._opening[tenant]
+            opening.set()
+        for idle in evicted:
+            idle.close()
+        return snapshot
+
+    def _evict_least_recent(self) -> list[IndexSnapshot]:
+        """Evict tenants beyond the pool's bounds (lock held), returning those ready to close.
+
+        The most recently searched tenant is always kept, however big.
+        """
+        idle = []
+        while len(self._tenants) > 1 and (
+            len(self._tenants) > self._tenant_pool_size
+            or sum(s.footprint_bytes for s in self._tenants.values()) > self._tenant_pool_bytes
+        ):
+            tenant, snapshot = self._tenants.popitem(last=False)
+            snapshot.retired = True
+            if snapshot.in_flight == 0:
+                idle.append(snapshot)
+            get_metrics().inc("rag_tenant_pool_evictions_total", "Tenant indexes closed for room")
+            logger.info(f"Evicted the index of tenant {tenant} from the pool")
+        return idle
+
+    def _release(self, snapshot: IndexSnapshot) -> None:
+        with self._lock:
+            snapshot.in_flight -= 1
+            drained = snapshot.retired and snapshot.in_flight == 0
+        if drained:
+            snapshot.close()
+            logger.info(f"Closed drained index release {snapshot.release.version}")
+
+    def search(
+        self, query: str, k: int = 3, issue_type: str | None = None, tenant: str | None = None
+    ) -> list[Document]:
+        """Search the shards routed to from `issue_type` (the global index if there are none).
+
+        Searches `tenant`'s knowledge base if given (the default one otherwise), or nothing if it
+        has none: another tenant's policies would be worse than no context.
+        """
         try:
-            hits = self.sparse_searcher.search(query, k)
-            return self.convert_lucene_hits_to_documents(hits)
+            snapshot = self._acquire(tenant)
+        except UnknownTenant as e:
+            logger.warning(f"{e}, searching nothing")
+            get_metrics().inc("rag_unknown_tenant_total", "Searches for tenants without an index")
+            return []
+        except Exception as e:
+            logger.error(f"Failed to open the index of tenant {tenant}: {e}", exc_info=True)
+            return []
+        try:
+            searchers = self._searchers_for(snapshot, issue_type)
+            if len(searchers) == 1:
+                hits = searchers[0].search(query, k)
+            else:
+                # Top-k of each shard, merged. Shard BM25 scores use per-shard statistics but
+                # remain comparable enough across a handful of related categories
+                hits = [hit for searcher in searchers for hit in searcher.search(query, k)]
+                hits = sorted(hits, key=lambda hit: hit.score, reverse=True)[:k]
+            return hits_to_documents(hits, snapshot.document_store, snapshot.release.version)
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
+        finally:
+            self._release(snapshot)
+
+    def _searchers_for(
+        self, snapshot: IndexSnapshot, issue_type: str | None
+    ) -> list["LuceneSearcher"]:
+        categories = self._shard_routing.get(issue_type, []) if issue_type else []
+        searchers = [
+            snapshot.shard_searchers[c] for c in categories if c in snapshot.shard_searchers
+        ]
+        if not searchers:
+            logger.debug(f"No shards for issue type {issue_type}, searching the global index")
+            return [snapshot.sparse_searcher]
+        return searchers
 
     def format_context(self, docs: List[Document]) -> str:
-        return "\n\n".join([f"- {d.contents}" for d in docs])
+        """Pack `docs` into a prompt context bounded by the configured token budget."""
+        return self._context_packer.pack(docs)
 
-    # SAD: lack of typing for LuceneSearcher means we have to do this conversion ourselves
     def convert_lucene_hits_to_documents(self, hits: list) -> list[Document]:
-        documents: list[Document] = []
-        for hit in hits:
-            doc_id = hit.docid
-            score = hit.score
-            if (raw := hit.lucene_document.get("raw")) is None:
-                logger.warning(f"Document {doc_id} has no 'raw' field. Skipping...")
-                continue
-            parsed_raw: dict[str, str] = json.loads(raw)
-            title = parsed_raw.get("title", "")
-            if (contents := parsed_raw.get("contents")) is None:
-                logger.warning(f"Document {doc_id} has no 'contents' field in 'raw'. Skipping...")
-                continue
-            documents.append(Document(id=doc_id, title=title, contents=contents, score=score))
-
-        return documents
+        return hits_to_documents(hits, self._snapshot.document_store)
+
+
+# SAD: lack of typing for LuceneSearcher means we have to do this conversion ourselves
+def hits_to_documents(
+    hits: list, document_store: DocumentStore | None, release: str = ""
+) -> list[Document]:
+    documents: list[Document] = []
+    for hit in hits:
+        doc_id = hit.docid
+        score = hit.score
+        stored = document_store.get(doc_id) if document_store else None
+        if stored is not None:
+            parsed_raw: dict[str, str] = stored
+        elif (raw := hit.lucene_document.get("raw")) is not None:
+            parsed_raw = json.loads(raw)
+        else:
+            logger.warning(f"Document {doc_id} has no 'raw' field. Skipping...")
+            continue
+        title = parsed_raw.get("title", "")
+        if (contents := parsed_raw.get("contents")) is None:
+            logger.warning(f"Document {doc_id} has no 'contents' field in 'raw'. Skipping...")
+            continue
+        parent_id = parsed_raw.get("parent_id", doc_id)
+        documents.append(
+            Document(
+                id=doc_id,
+                parent_id=parent_id,
+                title=title,
+                contents=contents,
+                score=score,
+                release=release,
+            )
+        )
+
+    return documents
+
+
+@resource(teardown=lambda rag_service: rag_service.close())
+def get_rag_service() -> RAGService:
+    return RAGService()
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.rag import get_rag_config
+from conversational_agent.services.metrics import get_metrics
+from conversational_agent.services.rag_service import Document
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+logger = getLogger(__name__)
+
+
+class RerankService:
+    """Second retrieval stage rescoring first-stage (BM25) candidates with a CPU cross-encoder.
+
+    All uncached candidates of a query are scored in a single batched forward pass, and scores are
+    cached per (tenant, index release, query, document id): ids are only unique within a release
+    of a tenant's knowledge base. Reranking runs on its own `rerank_workers` threads (not the
+    default executor the Lucene searches run on) under a hard time budget: when it is exceeded,
+    the first-stage order is kept (the scoring still completes in the background, holding its
+    thread, and fills the cache for the next identical query). While every rerank thread is busy,
+    reranking is skipped altogether rather than queued behind work that would blow the budget.
+    """
+
+    def __init__(self) -> None:
+        rag_config = get_rag_config()
+        self.n_candidates = rag_config.rerank_candidates
+        self._top_k = rag_config.rerank_top_k
+        self._budget_s = rag_config.rerank_budget_ms / 1000
+        self._cache_size = rag_config.rerank_cache_size
+        self._cache: OrderedDict[tuple[str | None, str, str, str], float] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=rag_config.rerank_workers, thread_name_prefix="rerank"
+        )
+        # Held from submission until the scoring thread is done, even when no longer awaited
+        self._slots = threading.BoundedSemaphore(rag_config.rerank_workers)
+        # Imported lazily: sentence-transformers pulls in torch, only paid for when reranking
+        from sentence_transformers import CrossEncoder
+
+        self._model: "CrossEncoder" = CrossEncoder(rag_config.rerank_model, device="cpu")
+        logger.info(f"Loaded cross-encoder {rag_config.rerank_model}")
+
+    async def rerank(
+        self,
+        query: str,
+        docs: list[Document],
+        tenant: str | None = None,
+        top_k: int | None = None,
+    ) -> list[Document]:
+        """Get the `top_k` (`rerank_top_k` if None) best of `docs` (retrieved from `tenant`'s
+        knowledge base, the default one if None) for `query` (first-stage order if over budget)."""
+        top_k = self._top_k if top_k is None else top_k
+        if len(docs) <= 1:
+            return docs[:top_k]
+        if not self._slots.acquire(blocking=False):
+            logger.warning("All rerank threads are busy, falling back to first-stage order")
+            return self._fall_back(docs, top_k)
+        future = self._executor.submit(self._rerank, query, docs, tenant, top_k)
+        # Also released if the scoring is cancelled before it started
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self._budget_s)
+        except TimeoutError:
+            logger.warning(
+                f"Reranking {len(docs)} documents exceeded {self._budget_s * 1000:.0f}ms, "
+                "falling back to first-stage order"
+            )
+        except Exception as e:
+            logger.error(f"Reranking failed, falling back to first-stage order: {e}")
+        return self._fall_back(docs, top_k)
+
+    def rerank_exact(
+        self,
+        query: str,
+        docs: list[Document],
+        tenant: str | None = None,
+        top_k: int | None = None,
+    ) -> list[Document]:
+        """`rerank` without its time budget nor fallback, on the caller's thread (e.g to evaluate
+        the reranker's quality offline, whatever the machine's speed)."""
+        return self._rerank(query, docs, tenant, self._top_k if top_k is None else top_k)
+
+    @staticmethod
+    def _fall_back(docs: list[Document], top_k: int) -> list[Document]:
+        get_metrics().inc("rerank_fallbacks_total", "Reranks that kept the first-stage order")
+        return docs[:top_k]
+
+    def _rerank(
+        self, query: str, docs: list[Document], tenant: str | None, top_k: int
+    ) -> list[Document]:
+        started = time.perf_counter()
+        scores = self._cached_scores(query, docs, tenant)
+        uncached = [doc for doc in docs if doc.id not in scores]
+        if uncached:
+            predicted = self._model.predict(
+                [(query, doc.contents) for doc in uncached], batch_size=len(uncached)
+            )
+            new_scores = {
+                doc.id: float(score) for doc, score in zip(uncached, predicted, strict=True)
+            }
+            self._cache_scores(query, uncached, new_scores, tenant)
+            scores.update(new_scores)
+
+        reranked = sorted(docs, key=lambda doc: scores[doc.id], reverse=True)[:top_k]
+        logger.debug(
+            f"Reranked {len(docs)} documents ({len(uncached)} scored) in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return [doc.model_copy(update={"score": scores[doc.id]}) for doc in reranked]
+
+    def _cached_scores(
+        self, query: str, docs: list[Document], tenant: str | None
+    ) -> dict[str, float]:
+        scores: dict[str, float] = {}
+        with self._cache_lock:
+            for doc in docs:
+                key = (tenant, doc.release, query, doc.id)
+                if (score := self._cache.get(key)) is not None:
+                    self._cache.move_to_end(key)
+                    scores[doc.id] = score
+        return scores
+
+    def _cache_scores(
+        self, query: str, docs: list[Document], scores: dict[str, float], tenant: str | None
+    ) -> None:
+        with self._cache_lock:
+            for doc in docs:
+                self._cache[(tenant, doc.release, query, doc.id)] = scores[doc.id]
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        """Forget every cached score, e.g once a new index release is served."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@resource(teardown=lambda rerank_service: rerank_service.close())
+def get_rerank_service() -> RerankService:
+    return RerankService()
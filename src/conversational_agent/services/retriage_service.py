@@ -0,0 +1,367 @@
+"""Offline re-triage of historical conversations, to backfill their issues after a change of the
+triage prompt (`SYSTEM_MESSAGE`) or extraction schema (`OpenAIAPIIssueFormat`).
+
+Transcripts are streamed (from the database, or a JSONL export) to a bounded number of concurrent
+LLM extractions, whose results are written back in batched upserts of `Issue`. After each batch a
+checkpoint records how far the source has been processed, so a crashed run resumes from there.
+Transcripts whose extraction failed are saved to a JSONL export next to the checkpoint (see
+`failed_transcripts_path`), to be re-triaged from there once the cause is fixed.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.database import (
+    get_dialect_insert,
+    get_session_maker,
+)
+from conversational_agent.config.dependencies.openai import get_openai_client
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    Issue,
+    IssueStatus,
+    LLMUsage,
+    Role,
+    Turn,
+    UrgencyLevel,
+)
+from conversational_agent.data_models.ml_models import OpenAIAPIIssueFormat
+from conversational_agent.services.archive_service import load_turns
+from conversational_agent.services.llm_service import LLMService
+from conversational_agent.services.usage_service import estimate_cost_usd
+
+logger = getLogger(__name__)
+
+# Source name of transcripts streamed from the database (others are JSONL file paths)
+DB_SOURCE = "db"
+# Issue fields the extraction backfills (the status of existing issues is left to the support team)
+RETRIAGED_FIELDS = ("description", "issue_type", "urgency", "order_number")
+
+
+class Transcript(BaseModel):
+    conversation_id: UUID
+    turns: list[Turn]
+    # Position in the source right after this transcript, to resume from
+    cursor: str
+
+
+class RetriageStats(BaseModel):
+    processed: int = 0
+    created: int = 0
+    updated: int = 0
+    # Conversations without an issue to write back (or nothing said by the customer)
+    skipped: int = 0
+    failed: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    # None once a model without configured pricing was used
+    estimated_cost_usd: float | None = 0.0
+    elapsed_s: float = 0.0
+
+    def add_usage(self, usage: LLMUsage) -> None:
+        self.prompt_tokens += usage.prompt_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.completion_tokens += usage.completion_tokens
+        cost = estimate_cost_usd(
+            usage.model, usage.prompt_tokens, usage.cached_tokens, usage.completion_tokens
+        )
+        if self.estimated_cost_usd is not None and cost is not None:
+            self.estimated_cost_usd += cost
+        else:
+            self.estimated_cost_usd = None
+
+    def summary(self) -> str:
+        rate = self.processed / self.elapsed_s if self.elapsed_s else 0.0
+        cost = "unknown" if self.estimated_cost_usd is None else f"${self.estimated_cost_usd:.4f}"
+        return (
+            f"{self.processed} conversations re-triaged ({rate:.1f}/s): {self.created} issues "
+            f"created, {self.updated} updated, {self.skipped} skipped, {self.failed} failed; "
+            f"{self.prompt_tokens} prompt ({self.cached_tokens} cached) and "
+            f"{self.completion_tokens} completion tokens, estimated cost {cost}"
+        )
+
+
+class Checkpoint(BaseModel):
+    source: str
+    # Every transcript before this source position has been written back (None: from the start)
+    cursor: str | None = None
+    stats: RetriageStats = RetriageStats()
+
+    @classmethod
+    def load(cls, path: Path, source: str) -> "Checkpoint":
+        """The checkpoint saved at `path` for `source`, or a new one if there is none."""
+        if not path.exists():
+            return cls(source=source)
+        checkpoint = cls.model_validate_json(path.read_text(encoding="utf-8"))
+        if checkpoint.source != source:
+            raise ValueError(
+                f"Checkpoint {path} belongs to a run over {checkpoint.source!r}, not {source!r}"
+            )
+        return checkpoint
+
+    def save(self, path: Path) -> None:
+        # Atomic: a crash mid-write leaves the previous checkpoint in place
+        staged = path.with_name(f".{path.name}.tmp")
+        staged.write_text(self.model_dump_json(), encoding="utf-8")
+        os.replace(staged, path)
+
+
+def failed_transcripts_path(checkpoint_path: Path) -> Path:
+    """JSONL export of the transcripts whose extraction failed in the run checkpointed at
+    `checkpoint_path` (a valid source to re-triage them)."""
+    return checkpoint_path.with_name(f"{checkpoint_path.stem}.failed.jsonl")
+
+
+def append_transcripts(path: Path, transcripts: list[Transcript]) -> None:
+    """Append `transcripts` to a JSONL export, as read by `jsonl_transcripts`."""
+    with open(path, "a", encoding="utf-8") as f:
+        for transcript in transcripts:
+            record = {
+                "conversation_id": str(transcript.conversation_id),
+                "turns": [{"role": turn.role, "text": turn.text} for turn in transcript.turns],
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+async def db_transcripts(after: str | None, page_size: int) -> AsyncIterator[Transcript]:
+    """Stream every conversation's transcript (archived ones included), in id order."""
+    cursor = UUID(after) if after else None
+    while True:
+        # Read a page at a time, not holding a connection while its transcripts are processed
+        async with get_session_maker()() as session:
+            stmt = select(Conversation).order_by(Conversation.id).limit(page_size)
+            if cursor is not None:
+                stmt = stmt.where(Conversation.id > cursor)
+            conversations = (await session.execute(stmt)).scalars().all()
+            page = [
+                Transcript(
+                    conversation_id=conversation.id,
+                    turns=await load_turns(conversation, session),
+                    cursor=str(conversation.id),
+                )
+                for conversation in conversations
+            ]
+        for transcript in page:
+            yield transcript
+        if len(conversations) < page_size:
+            return
+        cursor = conversations[-1].id
+
+
+async def jsonl_transcripts(path: Path, after: str | None) -> AsyncIterator[Transcript]:
+    """Stream transcripts from a JSONL file of `{"conversation_id": ..., "turns": [{"role": ...,
+    "text": ...}, ...]}` lines (e.g exported from another environment)."""
+    # Read off the event loop, which keeps the LLM calls going meanwhile
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        # Resumes from the byte offset of the first line not processed
+        await asyncio.to_thread(f.seek, int(after) if after else 0)
+        while line := await asyncio.to_thread(f.readline):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            conversation_id = UUID(record["conversation_id"])
+            turns = [
+                Turn(role=Role(turn["role"]), text=turn["text"], conversation_id=conversation_id)
+                for turn in record["turns"]
+            ]
+            yield Transcript(conversation_id=conversation_id, turns=turns, cursor=str(f.tell()))
+    finally:
+        f.close()
+
+
+class RetriageService:
+    """Re-runs triage over historical transcripts and writes the extracted issues back."""
+
+    def __init__(self, llm_service: LLMService) -> None:
+        self._llm_service = llm_service
+
+    async def run(
+        self,
+        transcripts: AsyncIterator[Transcript],
+        checkpoint: Checkpoint,
+        checkpoint_path: Path,
+        concurrency: int,
+        batch_size: int,
+        max_attempts: int = 3,
+        report_interval_s: float = 10.0,
+        limit: int | None = None,
+    ) -> RetriageStats:
+        """Re-triage `transcripts` (resumed from `checkpoint`), saving the checkpoint per batch.
+
+        Transcripts whose extraction failed are appended to `failed_transcripts_path` before the
+        checkpoint moves past them.
+        """
+        stats = checkpoint.stats
+        started = time.monotonic() - stats.elapsed_s
+        last_report = time.monotonic()
+        # Bounded: the source is only read as fast as the LLM calls complete
+        queue: asyncio.Queue[tuple[int, Transcript] | None] = asyncio.Queue(2 * concurrency)
+        pending: list[tuple[int, Transcript, OpenAIAPIIssueFormat | None, list[LLMUsage]]] = []
+        # Results complete out of order: the checkpoint only advances past the transcripts
+        # written back without a gap, so that none is skipped on resume (some may be redone)
+        written: dict[int, str] = {}
+        next_position = 0
+        write_lock = asyncio.Lock()
+        failed_path = failed_transcripts_path(checkpoint_path)
+
+        async def produce() -> None:
+            position = 0
+            async for transcript in transcripts:
+                if limit is not None and position >= limit:
+                    break
+                if not any(turn.role == Role.USER for turn in transcript.turns):
+                    # Nothing to triage (e.g the customer never replied to the greeting)
+                    stats.skipped += 1
+                    continue
+                await queue.put((position, transcript))
+                position += 1
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def work() -> None:
+            while (item := await queue.get()) is not None:
+                position, transcript = item
+                model, usages = await self._extract(transcript, max_attempts)
+                pending.append((position, transcript, model, usages))
+                if len(pending) >= batch_size:
+                    await flush()
+
+        async def flush() -> None:
+            nonlocal next_position, last_report
+            async with write_lock:
+                batch = pending[:]
+                pending.clear()
+                if not batch:
+                    return
+                async with get_session_maker()() as session:
+                    await self.write_batch(session, [item[1:] for item in batch], stats)
+                if failed := [transcript for _, transcript, model, _ in batch if model is None]:
+                    append_transcripts(failed_path, failed)
+                for position, transcript, _, _ in batch:
+                    written[position] = transcript.cursor
+                while next_position in written:
+                    checkpoint.cursor = written.pop(next_position)
+                    next_position += 1
+                stats.elapsed_s = time.monotonic() - started
+                checkpoint.save(checkpoint_path)
+                if time.monotonic() - last_report >= report_interval_s:
+                    last_report = time.monotonic()
+                    logger.info(stats.summary())
+
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(produce())
+            for _ in range(concurrency):
+                tasks.create_task(work())
+        await flush()
+        stats.elapsed_s = time.monotonic() - started
+        checkpoint.save(checkpoint_path)
+        return stats
+
+    async def _extract(
+        self, transcript: Transcript, max_attempts: int
+    ) -> tuple[OpenAIAPIIssueFormat | None, list[LLMUsage]]:
+        try:
+            return await self._llm_service.retriage(
+                transcript.conversation_id, transcript.turns, max_attempts
+            )
+        except Exception as e:
+            # e.g the provider kept failing past the client's own retries: move on, reported
+            logger.error(f"Failed to re-triage conversation {transcript.conversation_id}: {e}")
+            return None, []
+
+    async def write_batch(
+        self,
+        session: AsyncSession,
+        results: list[tuple[Transcript, OpenAIAPIIssueFormat | None, list[LLMUsage]]],
+        stats: RetriageStats,
+    ) -> None:
+        """Upsert (and commit) the issues extracted from a batch of transcripts."""
+        conversation_ids = [transcript.conversation_id for transcript, _, _ in results]
+        conversations = {
+            row.id: row
+            for row in await session.execute(
+                select(Conversation.id, Conversation.customer_id, Conversation.issue_id).where(
+                    Conversation.id.in_(conversation_ids)
+                )
+            )
+        }
+        issue_ids = [row.issue_id for row in conversations.values() if row.issue_id is not None]
+        issues = {
+            issue.id: issue
+            for issue in (
+                await session.execute(select(Issue).where(Issue.id.in_(issue_ids)))
+            ).scalars()
+        }
+
+        # Keyed by issue id: an issue shared by several conversations is upserted once
+        upserts: dict[UUID, dict] = {}
+        links = []
+        for transcript, model, usages in results:
+            stats.processed += 1
+            for usage in usages:
+                stats.add_usage(usage)
+            if (conversation := conversations.get(transcript.conversation_id)) is None:
+                logger.warning(f"Conversation {transcript.conversation_id} not found, skipping")
+                stats.skipped += 1
+                continue
+            session.add_all(usages)
+            if model is None:
+                stats.failed += 1
+            elif (issue := issues.get(conversation.issue_id)) is not None:
+                upserts[issue.id] = issue.model_dump() | {
+                    field: value
+                    for field in RETRIAGED_FIELDS
+                    if (value := getattr(model, field)) is not None
+                }
+                stats.updated += 1
+            elif model.create_issue and model.description and model.issue_type:
+                issue_id = uuid4()
+                upserts[issue_id] = {
+                    "id": issue_id,
+                    "customer_id": conversation.customer_id,
+                    "description": model.description,
+                    "issue_type": model.issue_type,
+                    "urgency": model.urgency or UrgencyLevel.MEDIUM,
+                    "status": model.status or IssueStatus.IN_PROGRESS,
+                    "order_number": model.order_number,
+                    "created_at": datetime.now(timezone.utc),
+                    "claimed_by": None,
+                    "claimed_at": None,
+                }
+                links.append({"id": conversation.id, "issue_id": issue_id})
+                stats.created += 1
+            else:
+                stats.skipped += 1
+
+        if upserts:
+            insert = get_dialect_insert(session)(Issue).values(list(upserts.values()))
+            await session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={field: insert.excluded[field] for field in RETRIAGED_FIELDS},
+                )
+            )
+        if links:
+            await session.execute(update(Conversation), links)
+        await session.commit()
+
+
+@resource()
+def get_retriage_service() -> RetriageService:
+    # Extraction needs neither retrieval nor reranking
+    return RetriageService(LLMService(get_openai_client()))
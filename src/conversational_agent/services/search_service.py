@@ -0,0 +1,246 @@
+import re
+from logging import getLogger
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import (
+    Float,
+    Select,
+    and_,
+    cast,
+    column,
+    func,
+    literal,
+    literal_column,
+    or_,
+    table,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.data_models.api_models import IssueSearchHit, Page
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    ConversationArchive,
+    Issue,
+    IssueStatus,
+    IssueType,
+    Role,
+    Turn,
+    UrgencyLevel,
+)
+from conversational_agent.data_models.search_index import TS_CONFIG
+from conversational_agent.services.pagination import decode_cursor, encode_cursor
+
+logger = getLogger(__name__)
+
+# Type of search ranks: the (JSON-encoded) cursor stores them as Python floats, i.e doubles
+RANK_TYPE = Float(precision=53)
+
+
+class SearchService:
+    """Ranked full-text search over issue descriptions and the transcripts of their conversations.
+
+    Transcripts are searched both in the hot turn table and in the archives of archived
+    conversations (whose text is indexed as one document, a turn per line).
+    """
+
+    _snippet_chars: int = 300
+
+    async def search_issues(
+        self,
+        session: AsyncSession,
+        query: str,
+        issue_type: IssueType | None = None,
+        urgency: UrgencyLevel | None = None,
+        status: IssueStatus | None = None,
+        customer_id: UUID | None = None,
+        limit: int = 20,
+        cursor: str | None = None,
+    ) -> Page[IssueSearchHit]:
+        match session.get_bind().dialect.name:
+            case "postgresql":
+                matches = self._postgres_matches(query)
+            case "sqlite":
+                matches = self._sqlite_matches(query)
+            case name:
+                raise HTTPException(501, f"Full-text search is not supported on '{name}'")
+        if matches is None:
+            return Page(items=[])
+
+        # An issue can match through its description and several turns: keep its best match only
+        matches_subquery = matches.subquery("matches")
+        best = select(
+            matches_subquery.c.issue_id,
+            matches_subquery.c.rank,
+            matches_subquery.c.snippet,
+            func.row_number()
+            .over(
+                partition_by=matches_subquery.c.issue_id,
+                order_by=matches_subquery.c.rank.desc(),
+            )
+            .label("position"),
+        ).subquery("best")
+
+        stmt = (
+            select(Issue, best.c.rank, best.c.snippet)
+            .join(best, best.c.issue_id == Issue.id)
+            .where(best.c.position == 1)
+        )
+        if issue_type is not None:
+            stmt = stmt.where(Issue.issue_type == issue_type)
+        if urgency is not None:
+            stmt = stmt.where(Issue.urgency == urgency)
+        if status is not None:
+            stmt = stmt.where(Issue.status == status)
+        if customer_id is not None:
+            stmt = stmt.where(Issue.customer_id == customer_id)
+        if cursor is not None:
+            # Keyset pagination on (rank DESC, id ASC)
+            last_rank, last_id = decode_cursor(cursor, float, UUID)
+            # Compared as the same (double precision) type the ranks are computed in, so that the
+            # last row's rank equals itself
+            last_rank = literal(last_rank, RANK_TYPE)
+            stmt = stmt.where(
+                or_(
+                    best.c.rank < last_rank,
+                    and_(best.c.rank == last_rank, Issue.id > last_id),
+                )
+            )
+        # Fetch one extra row to know whether there is a next page
+        stmt = stmt.order_by(best.c.rank.desc(), Issue.id).limit(limit + 1)
+
+        rows = (await session.execute(stmt)).all()
+        hits = [
+            IssueSearchHit(
+                issue_id=issue.id,
+                customer_id=issue.customer_id,
+                description=issue.description,
+                issue_type=issue.issue_type,
+                urgency=issue.urgency,
+                status=issue.status,
+                created_at=issue.created_at,
+                rank=rank,
+                snippet=self._snippet(snippet, query),
+            )
+            for issue, rank, snippet in rows[:limit]
+        ]
+        next_cursor = encode_cursor(hits[-1].rank, hits[-1].issue_id) if len(rows) > limit else None
+        return Page(items=hits, next_cursor=next_cursor)
+
+    def _snippet(self, text: str, query: str) -> str:
+        """The first line (i.e archived turn) of `text` containing a query term, else its start."""
+        terms = [term.lower() for term in re.findall(r"\w+", query)]
+        lines = text.splitlines() or [text]
+        matching = (line for line in lines if any(term in line.lower() for term in terms))
+        return next(matching, text)[: self._snippet_chars]
+
+    def _postgres_matches(self, query: str) -> Select:
+        # NOTE: the tsvector expressions must match the GIN expression indexes exactly
+        ts_config = literal_column(f"'{TS_CONFIG}'::regconfig")
+        ts_query = func.websearch_to_tsquery(ts_config, query)
+        issue_vector = func.to_tsvector(ts_config, Issue.description)
+        turn_vector = func.to_tsvector(ts_config, Turn.text)
+        archive_vector = func.to_tsvector(ts_config, ConversationArchive.search_text)
+
+        issue_matches = select(
+            Issue.id.label("issue_id"),
+            cast(func.ts_rank(issue_vector, ts_query), RANK_TYPE).label("rank"),
+            Issue.description.label("snippet"),
+        ).where(issue_vector.op("@@")(ts_query))
+        turn_matches = (
+            select(
+                Conversation.issue_id.label("issue_id"),
+                cast(func.ts_rank(turn_vector, ts_query), RANK_TYPE).label("rank"),
+                Turn.text.label("snippet"),
+            )
+            .join(Conversation, Conversation.id == Turn.conversation_id)
+            .where(
+                Conversation.issue_id.is_not(None),
+                Turn.role != Role.SYSTEM,
+                turn_vector.op("@@")(ts_query),
+            )
+        )
+        archive_matches = (
+            select(
+                Conversation.issue_id.label("issue_id"),
+                cast(func.ts_rank(archive_vector, ts_query), RANK_TYPE).label("rank"),
+                ConversationArchive.search_text.label("snippet"),
+            )
+            .join(Conversation, Conversation.id == ConversationArchive.conversation_id)
+            .where(Conversation.issue_id.is_not(None), archive_vector.op("@@")(ts_query))
+        )
+        return union_all(issue_matches, turn_matches, archive_matches)
+
+    def _sqlite_matches(self, query: str) -> Select | None:
+        # Quote every term so user input can't inject FTS5 query syntax (terms are AND-ed)
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return None
+        fts_query = " ".join(f'"{term}"' for term in terms)
+        issue_fts = table("issue_fts", column("rowid"))
+        turn_fts = table("turn_fts", column("rowid"))
+        issue_key = table("issue_fts_key", column("fts_rowid"), column("row_id"))
+        turn_key = table("turn_fts_key", column("fts_rowid"), column("row_id"))
+        archive_fts = table("conversationarchive_fts", column("rowid"))
+        archive_key = table("conversationarchive_fts_key", column("fts_rowid"), column("row_id"))
+
+        # FTS5's bm25() is lower-is-better, negate it so both dialects rank higher-is-better
+        issue_matches = (
+            select(
+                Issue.id.label("issue_id"),
+                (-func.bm25(literal_column("issue_fts"))).label("rank"),
+                Issue.description.label("snippet"),
+            )
+            .select_from(issue_fts)
+            .join(issue_key, issue_key.c.fts_rowid == issue_fts.c.rowid)
+            .join(Issue, Issue.id == issue_key.c.row_id)
+            .where(literal_column("issue_fts").op("MATCH")(fts_query))
+        )
+        turn_matches = (
+            select(
+                Conversation.issue_id.label("issue_id"),
+                (-func.bm25(literal_column("turn_fts"))).label("rank"),
+                Turn.text.label("snippet"),
+            )
+            .select_from(turn_fts)
+            .join(turn_key, turn_key.c.fts_rowid == turn_fts.c.rowid)
+            .join(Turn, Turn.id == turn_key.c.row_id)
+            .join(Conversation, Conversation.id == Turn.conversation_id)
+            .where(
+                Conversation.issue_id.is_not(None),
+                Turn.role != Role.SYSTEM,
+                literal_column("turn_fts").op("MATCH")(fts_query),
+            )
+        )
+        archive_matches = (
+            select(
+                Conversation.issue_id.label("issue_id"),
+                (-func.bm25(literal_column("conversationarchive_fts"))).label("rank"),
+                ConversationArchive.search_text.label("snippet"),
+            )
+            .select_from(archive_fts)
+            .join(archive_key, archive_key.c.fts_rowid == archive_fts.c.rowid)
+            .join(
+                ConversationArchive,
+                ConversationArchive.conversation_id == archive_key.c.row_id,
+            )
+            .join(Conversation, Conversation.id == ConversationArchive.conversation_id)
+            .where(
+                Conversation.issue_id.is_not(None),
+                literal_column("conversationarchive_fts").op("MATCH")(fts_query),
+            )
+        )
+        return union_all(issue_matches, turn_matches, archive_matches)
+
+
+@resource()
+def get_search_service() -> SearchService:
+    return SearchService()
+
+
+# Annotated fastapi dependency for getting the search service
+SearchServiceDep = Annotated[SearchService, Depends(get_search_service)]
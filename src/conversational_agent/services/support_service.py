@@ -0,0 +1,196 @@
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import and_, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.data_models.api_models import (
+    ConversationInfo,
+    IssueInfo,
+    Page,
+    TranscriptTurn,
+)
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    Issue,
+    IssueStatus,
+    Role,
+    UrgencyLevel,
+)
+from conversational_agent.services.archive_service import load_turns
+from conversational_agent.services.pagination import (
+    aware_datetime,
+    decode_cursor,
+    encode_cursor,
+)
+
+logger = getLogger(__name__)
+
+
+class SupportService:
+    """Listings and the manual review work queue used by human support agents."""
+
+    # Claims older than this are considered abandoned and the issue goes back into the queue
+    _claim_lease: timedelta = timedelta(minutes=30)
+    # Order in which the work queue is drained
+    _urgency_priority: tuple[UrgencyLevel, ...] = (
+        UrgencyLevel.HIGH,
+        UrgencyLevel.MEDIUM,
+        UrgencyLevel.LOW,
+    )
+
+    async def list_conversations(
+        self, session: AsyncSession, customer_id: UUID, limit: int = 20, cursor: str | None = None
+    ) -> Page[ConversationInfo]:
+        """List a customer's conversations, newest first."""
+        stmt = select(Conversation).where(Conversation.customer_id == customer_id)
+        if cursor is not None:
+            # Keyset pagination on (created_at DESC, id DESC)
+            last_created_at, last_id = decode_cursor(cursor, aware_datetime, UUID)
+            stmt = stmt.where(
+                or_(
+                    Conversation.created_at < last_created_at,
+                    and_(
+                        Conversation.created_at == last_created_at,
+                        Conversation.id < last_id,
+                    ),
+                )
+            )
+        # Fetch one extra row to know whether there is a next page
+        stmt = stmt.order_by(Conversation.created_at.desc(), Conversation.id.desc()).limit(
+            limit + 1
+        )
+        conversations = (await session.execute(stmt)).scalars().all()
+
+        items = [
+            ConversationInfo(
+                conversation_id=conversation.id,
+                created_at=conversation.created_at,
+                issue_id=conversation.issue_id,
+                archived_at=conversation.archived_at,
+            )
+            for conversation in conversations[:limit]
+        ]
+        next_cursor = (
+            encode_cursor(conversations[limit - 1].created_at, conversations[limit - 1].id)
+            if len(conversations) > limit
+            else None
+        )
+        return Page(items=items, next_cursor=next_cursor)
+
+    async def get_transcript(
+        self, session: AsyncSession, conversation_id: UUID
+    ) -> list[TranscriptTurn]:
+        """Export a conversation's transcript (rehydrated from cold storage if archived)."""
+        conversation = await session.get(Conversation, conversation_id)
+        if not conversation:
+            raise HTTPException(404, "Conversation not found")
+        return [
+            TranscriptTurn(role=turn.role, text=turn.text, created_at=turn.created_at)
+            for turn in await load_turns(conversation, session)
+            if turn.role != Role.SYSTEM
+        ]
+
+    async def list_issues(
+        self,
+        session: AsyncSession,
+        status: IssueStatus,
+        urgency: UrgencyLevel | None = None,
+        limit: int = 20,
+        cursor: str | None = None,
+    ) -> Page[IssueInfo]:
+        """List issues with the given status (and urgency), oldest first."""
+        stmt = select(Issue).where(Issue.status == status)
+        if urgency is not None:
+            stmt = stmt.where(Issue.urgency == urgency)
+        if cursor is not None:
+            # Keyset pagination on (created_at ASC, id ASC)
+            last_created_at, last_id = decode_cursor(cursor, aware_datetime, UUID)
+            stmt = stmt.where(
+                or_(
+                    Issue.created_at > last_created_at,
+                    and_(Issue.created_at == last_created_at, Issue.id > last_id),
+                )
+            )
+        stmt = stmt.order_by(Issue.created_at, Issue.id).limit(limit + 1)
+        issues = (await session.execute(stmt)).scalars().all()
+
+        items = [self._to_issue_info(issue) for issue in issues[:limit]]
+        next_cursor = (
+            encode_cursor(issues[limit - 1].created_at, issues[limit - 1].id)
+            if len(issues) > limit
+            else None
+        )
+        return Page(items=items, next_cursor=next_cursor)
+
+    async def claim_next_issue(self, session: AsyncSession, agent: str) -> IssueInfo | None:
+        """Claim the most urgent (then oldest) unclaimed issue awaiting manual review.
+
+        On PostgreSQL candidate rows are locked with `FOR UPDATE SKIP LOCKED`, so concurrent agents
+        each get a different issue without waiting on one another. The claim itself is a
+        conditional update, so it also stays race-free on databases without row locks (SQLite).
+        """
+        now = datetime.now(timezone.utc)
+        claimable = or_(Issue.claimed_by.is_(None), Issue.claimed_at < now - self._claim_lease)
+
+        # One index-backed (status, urgency, created_at, id) lookup per urgency level
+        for urgency in self._urgency_priority:
+            while True:
+                candidate_id = (
+                    await session.execute(
+                        select(Issue.id)
+                        .where(
+                            Issue.status == IssueStatus.REQUIRES_MANUAL_REVIEW,
+                            Issue.urgency == urgency,
+                            claimable,
+                        )
+                        .order_by(Issue.created_at, Issue.id)
+                        .limit(1)
+                        .with_for_update(skip_locked=True)
+                    )
+                ).scalar_one_or_none()
+                if candidate_id is None:
+                    break
+
+                claimed = await session.execute(
+                    update(Issue)
+                    .where(Issue.id == candidate_id, claimable)
+                    .values(claimed_by=agent, claimed_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                if claimed.rowcount == 1:
+                    issue = await session.get(Issue, candidate_id, populate_existing=True)
+                    logger.info(f"Issue {candidate_id} claimed by {agent}")
+                    return self._to_issue_info(issue)
+                # Lost the race for this issue to another agent, try the next one
+
+        return None
+
+    @staticmethod
+    def _to_issue_info(issue: Issue) -> IssueInfo:
+        return IssueInfo(
+            issue_id=issue.id,
+            customer_id=issue.customer_id,
+            description=issue.description,
+            issue_type=issue.issue_type,
+            urgency=issue.urgency,
+            status=issue.status,
+            order_number=issue.order_number,
+            created_at=issue.created_at,
+            claimed_by=issue.claimed_by,
+            claimed_at=issue.claimed_at,
+        )
+
+
+@resource()
+def get_support_service() -> SupportService:
+    return SupportService()
+
+
+# Annotated fastapi dependency for getting the support service
+SupportServiceDep = Annotated[SupportService, Depends(get_support_service)]
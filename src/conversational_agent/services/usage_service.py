@@ -0,0 +1,131 @@
+from datetime import datetime
+from logging import getLogger
+from typing import Annotated
+
+from fastapi import Depends
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.openai import ModelPricing, get_openai_api_config
+from conversational_agent.data_models.api_models import UsageGroupBy, UsageReportRow
+from conversational_agent.data_models.db_models import CallType, Conversation, Issue, LLMUsage
+
+logger = getLogger(__name__)
+
+
+class UsageService:
+    async def report(
+        self,
+        session: AsyncSession,
+        group_by: UsageGroupBy,
+        call_type: CallType | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[UsageReportRow]:
+        """Aggregate recorded LLM usage (tokens, latency, retries and estimated cost) by `group_by`."""
+        match group_by:
+            case UsageGroupBy.DAY:
+                group_column = func.date(LLMUsage.created_at)
+            case UsageGroupBy.ISSUE_TYPE:
+                group_column = Issue.issue_type
+            case UsageGroupBy.RAG:
+                group_column = LLMUsage.rag_enabled
+            case UsageGroupBy.MODEL:
+                group_column = LLMUsage.model
+
+        # Also group by model so each row's cost can be priced with the right model's rates
+        stmt = select(
+            group_column,
+            LLMUsage.model,
+            func.count(LLMUsage.id),
+            func.sum(LLMUsage.prompt_tokens),
+            func.sum(LLMUsage.completion_tokens),
+            func.sum(LLMUsage.cached_tokens),
+            func.sum(LLMUsage.retries),
+            func.sum(LLMUsage.latency_ms),
+        )
+        if group_by == UsageGroupBy.ISSUE_TYPE:
+            stmt = stmt.join(Conversation, Conversation.id == LLMUsage.conversation_id).outerjoin(
+                Issue, Issue.id == Conversation.issue_id
+            )
+        if call_type is not None:
+            stmt = stmt.where(LLMUsage.call_type == call_type)
+        if since is not None:
+            stmt = stmt.where(LLMUsage.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(LLMUsage.created_at < until)
+        stmt = stmt.group_by(group_column, LLMUsage.model)
+
+        result = await session.execute(stmt)
+        pricing = get_openai_api_config().pricing
+        rows: dict[str, UsageReportRow] = {}
+        latencies: dict[str, float] = {}
+        for group, model, calls, prompt, completion, cached, retries, latency in result.all():
+            key = self._group_label(group_by, group)
+            row = rows.setdefault(
+                key,
+                UsageReportRow(
+                    group=key,
+                    calls=0,
+                    prompt_tokens=0,
+                    completion_tokens=0,
+                    cached_tokens=0,
+                    retries=0,
+                    avg_latency_ms=0.0,
+                    estimated_cost_usd=0.0,
+                ),
+            )
+            row.calls += calls
+            row.prompt_tokens += prompt or 0
+            row.completion_tokens += completion or 0
+            row.cached_tokens += cached or 0
+            row.retries += retries or 0
+            latencies[key] = latencies.get(key, 0.0) + (latency or 0.0)
+
+            cost = estimate_cost_usd(model, prompt or 0, cached or 0, completion or 0, pricing)
+            if row.estimated_cost_usd is not None and cost is not None:
+                row.estimated_cost_usd += cost
+            else:
+                row.estimated_cost_usd = None
+
+        for key, row in rows.items():
+            row.avg_latency_ms = latencies[key] / row.calls if row.calls else 0.0
+        return sorted(rows.values(), key=lambda row: row.group)
+
+    @staticmethod
+    def _group_label(group_by: UsageGroupBy, group: object) -> str:
+        match group_by:
+            case UsageGroupBy.RAG:
+                return "rag_enabled" if group else "rag_disabled"
+            case _:
+                return str(group) if group is not None else "unknown"
+
+
+def estimate_cost_usd(
+    model: str,
+    prompt_tokens: int,
+    cached_tokens: int,
+    completion_tokens: int,
+    pricing: dict[str, ModelPricing] | None = None,
+) -> float | None:
+    """Estimated cost of LLM usage, `None` if the model has no configured pricing."""
+    pricing = get_openai_api_config().pricing if pricing is None else pricing
+    if (model_pricing := pricing.get(model)) is None:
+        logger.debug(f"No pricing configured for model {model}")
+        return None
+    return (
+        (prompt_tokens - cached_tokens) * model_pricing.prompt
+        + cached_tokens * model_pricing.cached_prompt
+        + completion_tokens * model_pricing.completion
+    ) / 1_000_000
+
+
+@resource()
+def get_usage_service() -> UsageService:
+    return UsageService()
+
+
+# Annotated fastapi dependency for getting the usage service
+UsageServiceDep = Annotated[UsageService, Depends(get_usage_service)]
@@ -0,0 +1,86 @@
+import asyncio
+import itertools
+from logging import getLogger
+
+from sqlalchemy import text
+
+from conversational_agent.config.dependencies.api import get_api_config
+from conversational_agent.config.dependencies.container import resource
+from conversational_agent.config.dependencies.database import create_engine
+from conversational_agent.services.llm_service import get_llm_service
+
+logger = getLogger(__name__)
+
+# Backoff of retrying failed warm-up steps (doubling on each attempt, up to the max)
+_RETRY_BACKOFF_S = 1.0
+_MAX_RETRY_BACKOFF_S = 60.0
+
+
+class WarmupService:
+    """Tracks whether this process is warm enough to take traffic.
+
+    When warm-up is enabled, the expensive resources (RAG index + JVM, DB pool, LLM provider
+    connection) are primed in the background after startup and the process only reports itself
+    ready once they have all been opened (failed steps are retried until they are). Otherwise the
+    process is ready as soon as it has started.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.failed_steps: list[str] = []
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Startup hook: kick off the background warm-up (if enabled) without blocking startup."""
+        if not get_api_config().warm_up:
+            self.ready = True
+            return
+        self._task = asyncio.create_task(self.warm_up())
+
+    async def stop(self) -> None:
+        """Shutdown hook: cancel a warm-up that is still in flight."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self.ready = False
+
+    async def warm_up(self) -> None:
+        """Run the warm-up steps, retrying the failed ones (e.g the DB not accepting connections
+        yet) with an exponential backoff until they all succeed."""
+        pending = {
+            "llm_service": self._warm_llm_service,
+            "database": self._warm_database,
+        }
+        for attempt in itertools.count():
+            if attempt:
+                delay = min(_RETRY_BACKOFF_S * 2 ** (attempt - 1), _MAX_RETRY_BACKOFF_S)
+                logger.info(f"Retrying warm-up steps {list(pending)} in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+            results = await asyncio.gather(
+                *(step() for step in pending.values()), return_exceptions=True
+            )
+            for name, result in zip(list(pending), results, strict=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Warm-up step '{name}' failed: {result}", exc_info=result)
+                else:
+                    del pending[name]
+            self.failed_steps = list(pending)
+            if not pending:
+                break
+
+        self.ready = True
+        logger.info("Warm-up finished, ready")
+
+    async def _warm_llm_service(self) -> None:
+        # Building the service opens the RAG index (and starts the JVM) when RAG is enabled,
+        # which is blocking, so we keep it off the event loop
+        service = await asyncio.to_thread(get_llm_service)
+        await service.warm_up()
+
+    async def _warm_database(self) -> None:
+        async with create_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+
+@resource(teardown=lambda warmup_service: warmup_service.stop())
+def get_warmup_service() -> WarmupService:
+    return WarmupService()
@@ -1,9 +1,36 @@
 import os
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
 
 
 def singleton(callable_obj):
-    """A simple singleton decorator for classes/functions and other callable objects."""
+    """A simple per-process singleton decorator for classes/functions and other callable objects.
+
+    Instances are keyed by process id so that API workers forked from a pre-loaded parent build
+    their own (DB engines, HTTP clients, JVM searchers, ...) rather than reusing the parent's.
+    """
+    instances = {}
+
+    def wrapper(*args, **kwargs):
+        key = (callable_obj, os.getpid())
+        if key not in instances:
+            instances[key] = callable_obj(*args, **kwargs)
+        return instances[key]
+
+    return wrapper
+
+
+def fork_shared(callable_obj):
+    """A singleton decorator whose instance is inherited (not rebuilt) by forked worker processes.
+
+    Only use for read-only assets that are safe to share across a fork (e.g memory-mapped files),
+    never for anything holding sockets, threads or a JVM.
+    """
     instances = {}
 
     def wrapper(*args, **kwargs):
@@ -14,6 +41,42 @@ def singleton(callable_obj):
     return wrapper
 
 
+class TTLCache(Generic[K, V]):
+    """A small in-process cache whose entries expire `ttl_s` seconds after being set.
+
+    Bounded to `max_size` entries, evicting the oldest-set entries first.
+    """
+
+    def __init__(self, ttl_s: float, max_size: int = 10_000) -> None:
+        self.ttl_s = ttl_s
+        self.max_size = max_size
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        if (entry := self._entries.get(key)) is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 # Handles both local development and containerized paths
 if os.path.exists("/app/storage"):
     STORAGE_PATH = Path("/app/storage")  # Only present in container path
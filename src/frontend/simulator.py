@@ -0,0 +1,298 @@
+"""Non-interactive traffic simulator for capacity tests against a running deployment.
+
+Drives many concurrent synthetic customers through log_in -> start_conversation -> multi-turn
+chat (-> summary), over a single pooled keep-alive aiohttp session, then reports throughput and
+latency percentiles per endpoint.
+
+Conversation scripts are the customer turns of the SAMPLE_CONVOS.md examples, or come from a YAML
+file (requires the `simulator` extra, i.e `pyyaml`):
+
+    think_time:
+      distribution: exponential  # constant | uniform | exponential | lognormal
+      mean_s: 3.0
+    scripts:
+      - name: faulty_keyboard
+        weight: 2
+        summary: true
+        turns:
+          - Hi! I received a faulty keyboard recently, i'd like a refund
+          - My order number is 12345 and it's quite urgent
+
+Usage:
+    python src/frontend/simulator.py --customers 1000 --concurrency 200 [--scripts convos.yml]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Literal
+from uuid import uuid4
+
+import aiohttp
+from pydantic import BaseModel, Field
+
+from conversational_agent.data_models.db_models import IssueStatus
+
+BASE_URL = "http://localhost:5020/agent"
+SAMPLE_CONVOS_PATH = Path(__file__).parents[2] / "SAMPLE_CONVOS.md"
+
+# The agent hands the conversation over (or ends it) once an issue reaches one of these
+TERMINAL_STATUSES = {IssueStatus.RESOLVED, IssueStatus.CLOSED, IssueStatus.REQUIRES_MANUAL_REVIEW}
+
+
+class ThinkTime(BaseModel):
+    """Distribution of the pause (in seconds) a customer takes before each chat turn"""
+
+    distribution: Literal["constant", "uniform", "exponential", "lognormal"] = "exponential"
+    mean_s: float = Field(default=2.0, ge=0)
+    # Only used by `uniform` (spread around the mean) and `lognormal` (sigma of the log)
+    spread: float = Field(default=1.0, ge=0)
+
+    def sample(self, rng: random.Random) -> float:
+        match self.distribution:
+            case "constant":
+                return self.mean_s
+            case "uniform":
+                return max(0.0, rng.uniform(self.mean_s - self.spread, self.mean_s + self.spread))
+            case "exponential":
+                return rng.expovariate(1 / self.mean_s) if self.mean_s else 0.0
+            case "lognormal":
+                # Parametrized so the distribution's mean is `mean_s`
+                mu = math.log(self.mean_s or 1e-9) - self.spread**2 / 2
+                return rng.lognormvariate(mu, self.spread)
+
+
+class ConversationScript(BaseModel):
+    name: str
+    turns: list[str]
+    weight: float = Field(default=1.0, gt=0)
+    summary: bool = False
+
+
+class SimulationPlan(BaseModel):
+    scripts: list[ConversationScript]
+    think_time: ThinkTime = ThinkTime()
+
+
+def load_sample_convos(path: Path = SAMPLE_CONVOS_PATH) -> list[ConversationScript]:
+    """One script per `### EXAMPLE` section of SAMPLE_CONVOS.md, made of its customer turns"""
+    scripts = []
+    for section in re.split(r"^### ", path.read_text(encoding="utf-8"), flags=re.MULTILINE)[1:]:
+        name = section.splitlines()[0].strip()
+        turns = re.findall(r"^😁 You: (.+)$", section, flags=re.MULTILINE)
+        if turns:
+            scripts.append(ConversationScript(name=name, turns=turns))
+    return scripts
+
+
+def load_plan(path: Path) -> SimulationPlan:
+    try:
+        import yaml
+    except ImportError as e:
+        raise SystemExit(
+            "Loading YAML scripts requires pyyaml: pip install 'conversational_agent[simulator]'"
+        ) from e
+    return SimulationPlan.model_validate(yaml.safe_load(path.read_text(encoding="utf-8")))
+
+
+class EndpointStats:
+    """Latencies and failures recorded per endpoint"""
+
+    def __init__(self) -> None:
+        self.latencies_ms: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # Kept apart so fast failures (or slow timeouts) don't skew the percentiles of successes
+        self.error_latencies_ms: dict[str, list[float]] = defaultdict(list)
+
+    def record(self, endpoint: str, latency_ms: float, error: str | None = None) -> None:
+        if error is None:
+            self.latencies_ms[endpoint].append(latency_ms)
+        else:
+            self.errors[endpoint][error] += 1
+            self.error_latencies_ms[endpoint].append(latency_ms)
+
+    def report(self, elapsed_s: float) -> list[dict[str, Any]]:
+        rows = []
+        for endpoint in sorted(set(self.latencies_ms) | set(self.errors)):
+            latencies = sorted(self.latencies_ms[endpoint])
+            error_latencies = sorted(self.error_latencies_ms[endpoint])
+            rows.append(
+                {
+                    "endpoint": endpoint,
+                    "ok": len(latencies),
+                    "errors": dict(self.errors[endpoint]),
+                    "throughput_rps": len(latencies) / elapsed_s,
+                    **{
+                        f"p{pct}_ms": _percentile(latencies, pct) if latencies else None
+                        for pct in (50, 90, 95, 99)
+                    },
+                    "max_ms": latencies[-1] if latencies else None,
+                    "error_p50_ms": (_percentile(error_latencies, 50) if error_latencies else None),
+                }
+            )
+        return rows
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Simulator:
+    def __init__(
+        self,
+        base_url: str,
+        plan: SimulationPlan,
+        concurrency: int,
+        ramp_up_s: float,
+        seed: int | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.plan = plan
+        self.concurrency = concurrency
+        self.ramp_up_s = ramp_up_s
+        self.stats = EndpointStats()
+        self.completed_sessions = 0
+        self._rng = random.Random(seed)
+        self._run_id = uuid4().hex[:8]
+
+    async def run(self, n_customers: int) -> float:
+        """Simulate `n_customers` (at most `concurrency` at once). Returns the elapsed seconds."""
+        # One pooled session: connections are kept alive and reused across customers
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=120)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+
+            async def customer(number: int) -> None:
+                # Spread arrivals evenly over the ramp-up period
+                await asyncio.sleep(self.ramp_up_s * number / max(n_customers, 1))
+                async with semaphore:
+                    await self._simulate_customer(http, number)
+
+            await asyncio.gather(*(customer(number) for number in range(n_customers)))
+        return time.perf_counter() - started
+
+    async def _simulate_customer(self, http: aiohttp.ClientSession, number: int) -> None:
+        script = self._rng.choices(
+            self.plan.scripts, weights=[script.weight for script in self.plan.scripts]
+        )[0]
+        email = f"sim-{self._run_id}-{number}@example.com"
+        login = await self._call(
+            http, "log_in", "/log_in", {"name": f"sim {number}", "email": email}
+        )
+        if login is None:
+            return
+        conversation = await self._call(
+            http, "start_conversation", "/start_conversation", {"customer_id": login["id"]}
+        )
+        if conversation is None:
+            return
+
+        conversation_id = conversation["conversation_id"]
+        for message in script.turns:
+            await asyncio.sleep(self.plan.think_time.sample(self._rng))
+            reply = await self._call(http, "chat", f"/chat/{conversation_id}", {"message": message})
+            if reply is None:
+                return
+            if reply.get("status") in TERMINAL_STATUSES:
+                break
+        if script.summary:
+            await self._call(http, "summary", f"/{conversation_id}/summary")
+        self.completed_sessions += 1
+
+    async def _call(
+        self, http: aiohttp.ClientSession, endpoint: str, path: str, payload: dict | None = None
+    ) -> Any | None:
+        """Call the API, recording the latency (or failure) of `endpoint`. None on failure."""
+        started = time.perf_counter()
+        try:
+            if payload is None:
+                response_cm = http.get(self.base_url + path)
+            else:
+                response_cm = http.post(self.base_url + path, json=payload)
+            async with response_cm as response:
+                # Error bodies (e.g a proxy's HTML 502 page) needn't be JSON
+                if response.status >= 400:
+                    await response.read()
+                    self.stats.record(endpoint, _elapsed_ms(started), error=str(response.status))
+                    return None
+                body = await response.json(content_type=None)
+                self.stats.record(endpoint, _elapsed_ms(started))
+                return body
+        except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError) as e:
+            self.stats.record(endpoint, _elapsed_ms(started), error=type(e).__name__)
+            return None
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def print_report(rows: list[dict[str, Any]], elapsed_s: float, completed_sessions: int) -> None:
+    print(f"\nCompleted {completed_sessions} sessions in {elapsed_s:.1f}s")
+    print(
+        "| endpoint | ok | errors | req/s | p50 ms | p90 ms | p95 ms | p99 ms | max ms "
+        "| error p50 ms |"
+    )
+    print("|---|---|---|---|---|---|---|---|---|---|")
+    for row in rows:
+        latencies = " | ".join(
+            f"{row[key]:.1f}" if row[key] is not None else "-"
+            for key in ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms", "error_p50_ms")
+        )
+        errors = ", ".join(f"{error}: {count}" for error, count in row["errors"].items()) or "0"
+        print(
+            f"| {row['endpoint']} | {row['ok']} | {errors} | {row['throughput_rps']:.1f} | "
+            f"{latencies} |"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--customers", type=int, default=100, help="Total synthetic customers")
+    parser.add_argument("--concurrency", type=int, default=50, help="Max concurrent customers")
+    parser.add_argument("--ramp-up-s", type=float, default=10.0)
+    parser.add_argument("--scripts", type=Path, help="YAML scripts (defaults to SAMPLE_CONVOS.md)")
+    parser.add_argument(
+        "--think-time",
+        choices=["constant", "uniform", "exponential", "lognormal"],
+        help="Think time distribution (overrides the YAML one)",
+    )
+    parser.add_argument(
+        "--think-mean-s", type=float, help="Mean think time (overrides the YAML one)"
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", type=Path, help="Also save the per-endpoint report as JSON")
+    args = parser.parse_args()
+
+    plan = load_plan(args.scripts) if args.scripts else SimulationPlan(scripts=load_sample_convos())
+    if args.think_time is not None:
+        plan.think_time.distribution = args.think_time
+    if args.think_mean_s is not None:
+        plan.think_time.mean_s = args.think_mean_s
+
+    simulator = Simulator(args.base_url, plan, args.concurrency, args.ramp_up_s, args.seed)
+    print(
+        f"Simulating {args.customers} customers ({args.concurrency} concurrent) over "
+        f"{len(plan.scripts)} scripts against {args.base_url}..."
+    )
+    elapsed_s = asyncio.run(simulator.run(args.customers))
+
+    rows = simulator.stats.report(elapsed_s)
+    print_report(rows, elapsed_s, simulator.completed_sessions)
+    if args.output:
+        args.output.write_text(json.dumps(rows, indent=2))
+        print(f"Saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+from starlette import status
+
+from conversational_agent.api.admission import AdmissionMiddleware
+from conversational_agent.config.dependencies.admission import AdmissionConfig
+from conversational_agent.services.admission_service import (
+    AdmissionController,
+    RequestPriority,
+    TokenBucketLimiter,
+)
+
+
+class TestTokenBucketLimiter:
+    """Test the per-key token buckets"""
+
+    def test_burst_then_sustained_rate(self):
+        """Test that a key gets `burst` requests at once, then one per refill period"""
+        limiter = TokenBucketLimiter(rate_per_s=2.0, burst=3)
+
+        assert [limiter.acquire("a", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.acquire("a", now=0.0) == pytest.approx(0.5)
+        assert limiter.acquire("a", now=0.5) == 0.0
+        # Other keys have their own bucket
+        assert limiter.acquire("b", now=0.5) == 0.0
+
+
+class TestAdmissionController:
+    """Test admitting or shedding agent requests"""
+
+    @pytest.fixture
+    def controller(self):
+        """Controller allowing 4 requests in flight, 1 of them reserved for ongoing conversations"""
+        config = AdmissionConfig(
+            enabled=True, max_in_flight=4, reserved_for_ongoing=0.25, customer_burst=2
+        )
+        with patch(
+            "conversational_agent.services.admission_service.get_admission_config",
+            return_value=config,
+        ):
+            yield AdmissionController()
+
+    def test_ongoing_conversations_keep_reserved_capacity(self, controller):
+        """Test that new conversations are shed first, leaving headroom for ongoing ones"""
+        for _ in range(3):
+            assert controller.admit(RequestPriority.NEW, None, None) is None
+
+        rejection = controller.admit(RequestPriority.NEW, None, None)
+        assert rejection is not None and rejection.status_code == 503
+        assert controller.admit(RequestPriority.ONGOING, None, None) is None
+        assert controller.admit(RequestPriority.ONGOING, None, None) is not None
+
+        controller.release()
+        assert controller.admit(RequestPriority.ONGOING, None, None) is None
+
+    def test_customer_rate_limit_spans_their_conversations(self, controller):
+        """Test that a customer's conversations share the customer's rate limit"""
+        customer_id = uuid4()
+        conversation_ids = [uuid4(), uuid4()]
+        for conversation_id in conversation_ids:
+            controller.register_conversation(conversation_id, customer_id)
+
+        for conversation_id in conversation_ids:
+            key = controller.customer_key(None, conversation_id)
+            assert controller.admit(RequestPriority.ONGOING, None, key) is None
+            controller.release()
+
+        rejection = controller.admit(
+            RequestPriority.ONGOING, None, controller.customer_key(None, conversation_ids[0])
+        )
+        assert rejection is not None
+        assert rejection.status_code == 429 and rejection.retry_after_s == 1
+
+
+class TestAdmissionMiddleware:
+    """Test admitting chat WebSockets (plain ASGI calls, the app faked)"""
+
+    @pytest.fixture
+    def controller(self):
+        """Controller allowing a single request in flight"""
+        config = AdmissionConfig(enabled=True, max_in_flight=1)
+        with patch(
+            "conversational_agent.services.admission_service.get_admission_config",
+            return_value=config,
+        ):
+            controller = AdmissionController()
+        with patch(
+            "conversational_agent.api.admission.get_admission_controller", return_value=controller
+        ):
+            yield controller
+
+    @staticmethod
+    def connect(path: str) -> tuple[AsyncMock, AsyncMock]:
+        """Open a WebSocket on `path`, returning the app and the messages sent by the middleware"""
+        app, send = AsyncMock(), AsyncMock()
+        scope = {"type": "websocket", "path": path, "client": ("10.0.0.1", 1234), "headers": []}
+        asyncio.run(AdmissionMiddleware(app)(scope, AsyncMock(), send))
+        return app, send
+
+    def test_sockets_are_admitted_without_holding_a_slot(self, controller):
+        """Test that an admitted socket is served, then leaves its slot to other requests"""
+        app, send = self.connect(f"/agent/ws/{uuid4()}")
+
+        app.assert_awaited_once()
+        send.assert_not_awaited()
+        assert controller.in_flight == 0
+
+    def test_overloaded_sockets_are_refused(self, controller):
+        """Test that sockets are refused (1013, try again later) when overloaded"""
+        controller.admit(RequestPriority.ONGOING, None, None)
+
+        app, send = self.connect(f"/agent/ws/{uuid4()}")
+
+        app.assert_not_awaited()
+        send.assert_awaited_once_with(
+            {
+                "type": "websocket.close",
+                "code": status.WS_1013_TRY_AGAIN_LATER,
+                "reason": "Server busy, please retry shortly",
+            }
+        )
+        assert controller.shed["overloaded_ongoing"] == 1
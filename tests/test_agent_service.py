@@ -2,6 +2,7 @@ from unittest.mock import AsyncMock, Mock, patch
 from uuid import uuid4
 
 import pytest
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from conversational_agent.data_models.api_models import (
@@ -33,6 +34,8 @@ class TestAgentService:
         # session.add should be synchronous, not async
         session.add = Mock(return_value=None)
         session.add_all = Mock(return_value=None)
+        session.get_bind = Mock(return_value=Mock())
+        session.get_bind.return_value.dialect.name = "sqlite"
         return session
 
     @pytest.fixture
@@ -45,7 +48,8 @@ class TestAgentService:
         """Test logging in an existing user"""
 
         mock_result = Mock()  # Use Mock instead of AsyncMock
-        mock_result.scalar_one_or_none.return_value = sample_customer
+        # Upsert hit a conflict: RETURNING hands back the existing customer's row
+        mock_result.one.return_value = sample_customer
         mock_session.execute.return_value = mock_result
 
         request = LogInRequest(name=sample_customer.name, email=sample_customer.email)
@@ -60,34 +64,75 @@ class TestAgentService:
         assert response.email == sample_customer.email
         assert response.new_user is False
 
-        # Verify database interaction
+        # Verify database interaction: a single upsert statement
         mock_session.execute.assert_called_once()
         mock_session.add.assert_not_called()  # Existing user shouldn't be added
 
     @pytest.mark.asyncio
     async def test_log_in_new_user(self, service, mock_session):
         """Test creating a new user on login"""
+        new_id = uuid4()
         mock_result = Mock()  # Use Mock instead of AsyncMock
-        mock_result.scalar_one_or_none.return_value = None  # User doesn't exist
+        # Upsert inserted our row: RETURNING hands back the freshly generated id
+        mock_result.one.return_value = Customer(
+            id=new_id, name="Jane Smith", email="jane@example.com"
+        )
         mock_session.execute.return_value = mock_result
 
         request = LogInRequest(name="Jane Smith", email="jane@example.com")
 
         # Act
-        response = await service.log_in_user(request, mock_session)
+        with patch("conversational_agent.services.agent_service.uuid4", return_value=new_id):
+            response = await service.log_in_user(request, mock_session)
 
         # Assert
         assert isinstance(response, LogInResponse)
+        assert response.id == new_id
         assert response.name == "Jane Smith"
         assert response.email == "jane@example.com"
         assert response.new_user is True
 
-        # Verify new user was added to session
-        mock_session.add.assert_called_once()
-        added_customer = mock_session.add.call_args[0][0]
-        assert isinstance(added_customer, Customer)
-        assert added_customer.name == "Jane Smith"
-        assert added_customer.email == "jane@example.com"
+        # Verify new user was upserted in a single statement rather than added to the session
+        mock_session.execute.assert_called_once()
+        mock_session.add.assert_not_called()
+        upsert = str(mock_session.execute.call_args[0][0].compile(dialect=sqlite.dialect()))
+        assert "ON CONFLICT (email) DO UPDATE" in upsert
+        assert "RETURNING" in upsert
+
+    @pytest.mark.asyncio
+    async def test_customer_exists_is_cached(self, service, mock_session, sample_customer):
+        """Test that a known customer is only looked up in the DB once"""
+        mock_session.get.return_value = sample_customer
+
+        assert await service.customer_exists(sample_customer.id, mock_session) is True
+        assert await service.customer_exists(sample_customer.id, mock_session) is True
+
+        mock_session.get.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_customer_exists_after_log_in(self, service, mock_session, sample_customer):
+        """Test that logging in caches the customer's existence"""
+        mock_result = Mock()
+        mock_result.one.return_value = sample_customer
+        mock_session.execute.return_value = mock_result
+
+        await service.log_in_user(
+            LogInRequest(name=sample_customer.name, email=sample_customer.email), mock_session
+        )
+
+        assert await service.customer_exists(sample_customer.id, mock_session) is True
+        mock_session.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unknown_customer_does_not_exist(self, service, mock_session):
+        """Test that unknown customers are reported (and not cached) as missing"""
+        mock_session.get.return_value = None
+        customer_id = uuid4()
+
+        assert await service.customer_exists(customer_id, mock_session) is False
+        assert await service.customer_exists(customer_id, mock_session) is False
+
+        assert mock_session.get.await_count == 2
 
     @pytest.mark.asyncio
     @patch("conversational_agent.services.agent_service.get_rag_config")
@@ -226,12 +271,14 @@ class TestAgentServiceIntegrationScenarios:
         # session.add should be synchronous, not async
         session.add = Mock(return_value=None)
         session.add_all = Mock(return_value=None)
+        session.get_bind = Mock(return_value=Mock())
+        session.get_bind.return_value.dialect.name = "sqlite"
         return session
 
     def _setup_mock_result(self, return_value):
         """Helper to create consistent mock results"""
         mock_result = Mock()
-        mock_result.scalar_one_or_none.return_value = return_value
+        mock_result.one.return_value = return_value
         return mock_result
 
     @pytest.mark.asyncio
@@ -244,25 +291,27 @@ class TestAgentServiceIntegrationScenarios:
     )
     async def test_complete_user_flow(self, service, mock_session, is_new_user, rag_enabled):
         """Test complete flow: login -> start conversation for new and existing users"""
-        # Step 1: Setup user login
+        # Step 1: Setup user login (customers are upserted rather than added to the session)
+        new_id = uuid4()
         if is_new_user:
-            existing_customer = None
             name, email = "Alice Johnson", "alice@example.com"
-            expected_add_calls = 2  # Customer + Conversation
+            returned_customer = Customer(id=new_id, name=name, email=email)
         else:
-            existing_customer = Customer(id=uuid4(), name="Bob Smith", email="bob@example.com")
-            name, email = existing_customer.name, existing_customer.email
-            expected_add_calls = 1  # Only conversation
+            returned_customer = Customer(id=uuid4(), name="Bob Smith", email="bob@example.com")
+            name, email = returned_customer.name, returned_customer.email
+        expected_add_calls = 1  # Only conversation
 
-        mock_result = self._setup_mock_result(existing_customer)
+        mock_result = self._setup_mock_result(returned_customer)
         mock_session.execute.return_value = mock_result
 
         # Step 2: User logs in
         login_request = LogInRequest(name=name, email=email)
-        login_response = await service.log_in_user(login_request, mock_session)
+        with patch("conversational_agent.services.agent_service.uuid4", return_value=new_id):
+            login_response = await service.log_in_user(login_request, mock_session)
 
         assert login_response.new_user == is_new_user
-        customer_id = existing_customer.id if existing_customer else login_response.id
+        customer_id = login_response.id
+        assert customer_id == returned_customer.id
 
         # Step 3: Start conversation
         with patch("conversational_agent.services.agent_service.get_rag_config") as mock_rag:
@@ -0,0 +1,89 @@
+import signal
+from itertools import count
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from conversational_agent.config import api
+
+
+class TestRunAPIWorkers:
+    """Test supervising the pre-forked API workers (forking, waiting and sleeping faked)"""
+
+    @pytest.fixture
+    def supervisor(self, monkeypatch):
+        """Workers die as soon as waited for, each living `lifetime` seconds"""
+        state = SimpleNamespace(now=0.0, lifetime=0.0, sleeps=[], spawned=[], handlers={})
+        pids = count(100)
+
+        def spawn(sock, host, port) -> int:
+            state.spawned.append(pid := next(pids))
+            return pid
+
+        def wait() -> tuple[int, int]:
+            state.now += state.lifetime
+            # Each worker dies in turn, the supervisor sleeping once per death
+            return state.spawned[len(state.sleeps)], 256
+
+        def monotonic() -> float:
+            return state.now
+
+        monkeypatch.setattr(
+            api, "get_db_config", Mock(return_value=Mock(url="sqlite+aiosqlite:///app.db"))
+        )
+        monkeypatch.setattr(api, "preload_shared_assets", Mock())
+        monkeypatch.setattr(api.uvicorn, "Config", Mock())
+        monkeypatch.setattr(api, "_spawn_worker", spawn)
+        monkeypatch.setattr(api, "os", SimpleNamespace(wait=wait, kill=Mock()))
+        monkeypatch.setattr(
+            api, "time", SimpleNamespace(monotonic=monotonic, sleep=state.sleeps.append)
+        )
+        monkeypatch.setattr(
+            api,
+            "signal",
+            SimpleNamespace(
+                SIGTERM=signal.SIGTERM,
+                SIGINT=signal.SIGINT,
+                signal=lambda signum, handler: state.handlers.__setitem__(signum, handler),
+            ),
+        )
+        return state
+
+    def test_failing_workers_back_off_then_give_up(self, supervisor):
+        """Test that workers dying on start are respawned ever slower, up to `max_respawns`"""
+        with pytest.raises(RuntimeError):
+            api.run_api_workers(workers=1, max_respawns=6)
+
+        assert supervisor.sleeps == [1.0, 2.0, 4.0, 8.0, 16.0, 30.0]
+        assert len(supervisor.spawned) == 7
+
+    def test_stable_workers_are_respawned_at_once(self, supervisor, monkeypatch):
+        """Test that workers dying after serving a while are respawned without backoff"""
+        supervisor.lifetime = api._WORKER_STABLE_S
+        sleep = supervisor.sleeps.append
+
+        def sleep_then_stop(delay: float) -> None:
+            sleep(delay)
+            if len(supervisor.sleeps) == 10:
+                supervisor.handlers[signal.SIGTERM](signal.SIGTERM, None)
+
+        monkeypatch.setattr(api.time, "sleep", sleep_then_stop)
+
+        api.run_api_workers(workers=1, max_respawns=1)
+
+        assert supervisor.sleeps == [0.0] * 10
+        # Not respawned once told to stop
+        assert len(supervisor.spawned) == 10
+
+    @pytest.mark.parametrize(
+        "url", ["sqlite+aiosqlite:///:memory:", "sqlite+aiosqlite://", "sqlite:///:memory:"]
+    )
+    def test_in_memory_db_is_refused(self, supervisor, monkeypatch, url):
+        """Test that workers aren't started on an in-memory SQLite DB (private to each worker)"""
+        monkeypatch.setattr(api, "get_db_config", Mock(return_value=Mock(url=url)))
+
+        with pytest.raises(RuntimeError, match="DB_CONFIG__URL"):
+            api.run_api_workers(workers=2)
+
+        assert supervisor.spawned == []
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    ConversationArchive,
+    Customer,
+    Issue,
+    IssueStatus,
+    LLMUsage,
+    Role,
+    Turn,
+)
+from conversational_agent.services.archive_service import ArchiveService, load_turns
+
+
+class TestArchiveService:
+    """Test archiving finished conversations into cold storage (on an in-memory SQLite DB)"""
+
+    @pytest.fixture
+    def session_maker(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+        async def create_tables() -> None:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+
+        asyncio.run(create_tables())
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        asyncio.run(engine.dispose())
+
+    @staticmethod
+    async def add_conversation(
+        session, status: IssueStatus, last_turn_at: datetime
+    ) -> Conversation:
+        customer = Customer(name="Jane", email=f"{status}-{last_turn_at.timestamp()}@example.com")
+        issue = Issue(description="Broken keyboard", status=status, customer=customer)
+        conversation = Conversation(customer=customer, issue=issue)
+        turns = [
+            Turn(role=Role.SYSTEM, text="prompt", created_at=last_turn_at - timedelta(minutes=2)),
+            Turn(role=Role.USER, text="Hi!", created_at=last_turn_at - timedelta(minutes=1)),
+            Turn(role=Role.ASSISTANT, text="Hello, how can I help?", created_at=last_turn_at),
+        ]
+        conversation.turns = turns
+        session.add_all(
+            [conversation, LLMUsage(call_type="triage", model="m", conversation=conversation)]
+        )
+        await session.flush()
+        session.add(
+            LLMUsage(call_type="triage", model="m", conversation=conversation, turn_id=turns[-1].id)
+        )
+        await session.commit()
+        return conversation
+
+    def test_archives_only_finished_idle_conversations(self, session_maker):
+        """Test that only resolved/closed conversations idle past the cutoff lose their hot turns"""
+        now = datetime.now(timezone.utc)
+
+        async def scenario():
+            async with session_maker() as session:
+                old_resolved = await self.add_conversation(
+                    session, IssueStatus.RESOLVED, now - timedelta(days=40)
+                )
+                recent_closed = await self.add_conversation(
+                    session, IssueStatus.CLOSED, now - timedelta(days=1)
+                )
+                old_in_review = await self.add_conversation(
+                    session, IssueStatus.REQUIRES_MANUAL_REVIEW, now - timedelta(days=40)
+                )
+                archived = await ArchiveService().archive_batch(
+                    session, now - timedelta(days=30), batch_size=10
+                )
+                hot = (await session.execute(select(Turn.conversation_id))).scalars().all()
+                usages = (await session.execute(select(LLMUsage.turn_id))).scalars().all()
+                return archived, old_resolved.id, {recent_closed.id, old_in_review.id}, hot, usages
+
+        archived, archived_id, kept_ids, hot, usages = asyncio.run(scenario())
+
+        assert archived == 1
+        assert archived_id not in hot
+        assert set(hot) == kept_ids
+        # The archived assistant turn's usage row is kept, unlinked from the deleted turn
+        assert sum(turn_id is None for turn_id in usages) == 4
+
+    def test_archived_turns_are_rehydrated(self, session_maker):
+        """Test that reading an archived conversation's turns returns them from the archive"""
+        now = datetime.now(timezone.utc)
+
+        async def scenario():
+            async with session_maker() as session:
+                conversation = await self.add_conversation(
+                    session, IssueStatus.CLOSED, now - timedelta(days=40)
+                )
+                await ArchiveService().archive_batch(session, now, batch_size=10)
+            async with session_maker() as session:
+                conversation = await session.get(Conversation, conversation.id)
+                archive = await session.get(ConversationArchive, conversation.id)
+                return conversation, archive, await load_turns(conversation, session)
+
+        conversation, archive, turns = asyncio.run(scenario())
+
+        assert conversation.archived_at is not None
+        assert archive.turn_count == 3
+        assert [(turn.role, turn.text) for turn in turns] == [
+            (Role.SYSTEM, "prompt"),
+            (Role.USER, "Hi!"),
+            (Role.ASSISTANT, "Hello, how can I help?"),
+        ]
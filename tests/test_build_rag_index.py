@@ -0,0 +1,81 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+from conversational_agent.services.index_releases import release_at
+
+
+class FakeLuceneSearcher:
+    """Stands in for pyserini's LuceneSearcher, hitting the documents sharing the query's words"""
+
+    # Ids of the documents in the index
+    indexed: list[str] = []
+
+    def __init__(self, index_path: str) -> None:
+        kb_path = release_at(Path(index_path).parent).kb_path
+        self.documents = [json.loads(line) for line in kb_path.read_text().splitlines()]
+
+    def search(self, query: str, k: int) -> list:
+        words = set(query.split())
+        hits = [
+            SimpleNamespace(docid=doc["id"], score=float(len(words & set(doc["contents"].split()))))
+            for doc in self.documents
+            if doc["id"] in self.indexed and words & set(doc["contents"].split())
+        ]
+        return sorted(hits, key=lambda hit: hit.score, reverse=True)[:k]
+
+    def close(self) -> None:
+        pass
+
+
+class TestVerifyIndex:
+    """Test the verification a release's index must pass to be published"""
+
+    @pytest.fixture
+    def build_rag_index(self, monkeypatch):
+        lucene = ModuleType("pyserini.search.lucene")
+        lucene.LuceneSearcher = FakeLuceneSearcher  # type: ignore[attr-defined]
+        monkeypatch.setitem(sys.modules, "pyserini", ModuleType("pyserini"))
+        monkeypatch.setitem(sys.modules, "pyserini.search", ModuleType("pyserini.search"))
+        monkeypatch.setitem(sys.modules, "pyserini.search.lucene", lucene)
+        module = importlib.import_module("conversational_agent.scripts.build_rag_index")
+        monkeypatch.setattr(module, "LuceneSearcher", FakeLuceneSearcher)
+        return module
+
+    @pytest.fixture
+    def release(self, tmp_path):
+        release = release_at(tmp_path / "v1")
+        release.index_path.mkdir(parents=True)
+        topics = ["refund policy", "shipping times", "warranty claims", "account deletion"]
+        documents = [
+            {"id": f"doc{i}", "contents": f"{topic} {i} explained in detail"}
+            for i, topic in enumerate(topics * 3)
+        ]
+        release.kb_path.write_text("".join(json.dumps(doc) + "\n" for doc in documents))
+        FakeLuceneSearcher.indexed = [doc["id"] for doc in documents]
+        return release
+
+    def test_checks_documents_spread_over_the_knowledge_base(self, build_rag_index, release):
+        """Test that documents are each checked to be retrieved by their own opening words"""
+        queries = build_rag_index.derive_check_queries(release.kb_path, n=4)
+
+        assert [doc_id for _, doc_id in queries] == ["doc0", "doc3", "doc6", "doc9"]
+        assert queries[1][0] == "account deletion 3 explained in detail"
+        assert build_rag_index.verify_index(release)
+
+    def test_documents_missing_from_the_index_fail(self, build_rag_index, release):
+        """Test that a partial index fails, though other documents match the same queries"""
+        FakeLuceneSearcher.indexed = ["doc0", "doc1"]
+
+        assert not build_rag_index.verify_index(release)
+
+    def test_check_queries_must_get_hits(self, build_rag_index, release):
+        """Test that configured check queries replace the derived ones, each needing a hit"""
+        FakeLuceneSearcher.indexed = ["doc0"]
+
+        assert build_rag_index.verify_index(release, ["refund"])
+        assert not build_rag_index.verify_index(release, ["refund", "shipping times"])
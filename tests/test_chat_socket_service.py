@@ -0,0 +1,210 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi import WebSocketDisconnect
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from conversational_agent.config.dependencies.admission import AdmissionConfig
+from conversational_agent.data_models.db_models import Conversation, Customer, Role, Turn
+from conversational_agent.data_models.ml_models import OpenAIAPIIssueFormat
+from conversational_agent.services.admission_service import AdmissionController
+from conversational_agent.services.chat_socket_service import (
+    ChatChannel,
+    ChatSocketService,
+    ClientMessage,
+)
+from conversational_agent.services.llm_service import LLMService
+
+
+class TestChatChannel:
+    """Test the per-conversation event log WebSocket clients resume from"""
+
+    def test_resume_replays_missed_events(self):
+        """Test that events published after `last_seq` (e.g while disconnected) are replayed"""
+        channel = ChatChannel(max_events=10)
+
+        async def scenario() -> Mock:
+            await channel.publish({"type": "reply", "reply_to": "m1", "text": "a"})
+            await channel.publish({"type": "reply", "reply_to": "m2", "text": "b"})
+            websocket = Mock(send_json=AsyncMock())
+            await channel.attach(websocket, last_seq=1)
+            return websocket
+
+        websocket = asyncio.run(scenario())
+
+        websocket.send_json.assert_awaited_once_with(
+            {"seq": 2, "type": "reply", "reply_to": "m2", "text": "b"}
+        )
+
+    def test_new_connection_supersedes_previous(self):
+        """Test that attaching a socket closes the previously attached one"""
+        channel = ChatChannel(max_events=10)
+        previous, current = Mock(close=AsyncMock()), Mock(close=AsyncMock())
+
+        async def scenario() -> None:
+            await channel.attach(previous, last_seq=None)
+            await channel.attach(current, last_seq=None)
+
+        asyncio.run(scenario())
+
+        previous.close.assert_awaited_once()
+        assert channel.websocket is current
+
+    def test_resume_waits_for_the_turn_in_flight(self):
+        """Test that a resuming socket waits for the superseded socket's turn, whose events it
+        gets replayed once (not also sent live)"""
+        channel = ChatChannel(max_events=10)
+        previous = Mock(close=AsyncMock(), send_json=AsyncMock())
+        current = Mock(close=AsyncMock(), send_json=AsyncMock())
+
+        async def scenario() -> bool:
+            await channel.attach(previous, last_seq=None)
+            replied = asyncio.Event()
+
+            async def turn_in_flight() -> None:
+                async with channel.turn_lock:
+                    await replied.wait()
+                    await channel.publish({"type": "reply", "reply_to": "m1", "text": "a"})
+
+            turn = asyncio.create_task(turn_in_flight())
+            await asyncio.sleep(0)
+            attaching = asyncio.create_task(channel.attach(current, last_seq=0))
+            await asyncio.sleep(0)
+            assert channel.websocket is None
+            replied.set()
+            await turn
+            return await attaching
+
+        assert asyncio.run(scenario()) is True
+        previous.close.assert_awaited_once()
+        previous.send_json.assert_not_awaited()
+        current.send_json.assert_awaited_once_with(
+            {"seq": 1, "type": "reply", "reply_to": "m1", "text": "a"}
+        )
+        assert channel.websocket is current
+
+    def test_only_replies_are_kept_per_message(self):
+        """Test that re-sent messages find their reply, but failed ones can be retried"""
+        channel = ChatChannel(max_events=10)
+
+        async def scenario() -> None:
+            await channel.publish({"type": "reply", "reply_to": "m1", "text": "a"})
+            await channel.publish({"type": "error", "reply_to": "m2", "detail": "oops"})
+
+        asyncio.run(scenario())
+
+        assert channel.reply_to("m1") is not None
+        assert channel.reply_to("m2") is None
+
+
+class TestChatSocketService:
+    """Test processing a socket's messages over its long-lived session (on an in-memory SQLite DB)"""
+
+    @pytest.fixture
+    def session_maker(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+        async def create_tables() -> None:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+
+        asyncio.run(create_tables())
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        asyncio.run(engine.dispose())
+
+    def test_failed_turn_does_not_break_the_socket(self, session_maker):
+        """Test that the message after a failed turn is replied to, and no transaction is left
+        open between messages"""
+        parsed = OpenAIAPIIssueFormat(assistant_reply="Hello!")
+        client = Mock()
+        client.chat.completions.parse = AsyncMock(
+            side_effect=[
+                RuntimeError("provider down"),
+                Mock(usage=None, choices=[Mock(message=Mock(parsed=parsed))]),
+            ]
+        )
+        service = ChatSocketService(LLMService(client), Mock(enabled=False))
+        channel = ChatChannel(max_events=10)
+        in_transaction = []
+
+        async def scenario():
+            async with session_maker() as session:
+                conversation = Conversation(customer=Customer(name="Jane", email="j@example.com"))
+                conversation.turns = [Turn(role=Role.SYSTEM, text="Be helpful")]
+                session.add(conversation)
+                await session.commit()
+                conversation_id = conversation.id
+                session.expunge_all()
+
+                conversation = await service._load(conversation_id, session)
+                in_transaction.append(session.in_transaction())
+                inbox = asyncio.Queue()
+                for message_id in ("m1", "m2"):
+                    inbox.put_nowait(ClientMessage(type="message", id=message_id, text="Hi"))
+                inbox.put_nowait(None)
+                await service._process(inbox, channel, conversation_id, conversation, session)
+                in_transaction.append(session.in_transaction())
+
+                reloaded = await service._load(conversation_id, session)
+                return [turn.role for turn in reloaded.turns]
+
+        roles = asyncio.run(scenario())
+
+        assert channel.reply_to("m1") is None
+        assert channel.reply_to("m2")["text"] == "Hello!"
+        # The failed turn's user message was rolled back with it
+        assert roles == [Role.SYSTEM, Role.USER, Role.ASSISTANT]
+        assert in_transaction == [False, False]
+
+    def test_superseded_worker_starts_no_turn(self):
+        """Test that once another socket is attached, a socket's worker leaves its queued
+        messages to the new socket (whose client re-sends them)"""
+        llm_service = Mock(reply=AsyncMock())
+        service = ChatSocketService(llm_service, Mock(enabled=False))
+        channel = ChatChannel(max_events=10)
+        inbox = asyncio.Queue()
+
+        async def scenario() -> None:
+            worker = asyncio.create_task(service._process(inbox, channel, None, Mock(), Mock()))
+            await asyncio.sleep(0)
+            await channel.attach(Mock(send_json=AsyncMock()), last_seq=None)
+            inbox.put_nowait(ClientMessage(type="message", id="m1", text="Hi"))
+            await worker
+
+        asyncio.run(scenario())
+
+        llm_service.reply.assert_not_awaited()
+
+    def test_messages_are_charged_to_the_customer(self):
+        """Test that messages over the customer's rate are refused, not queued, while re-sent
+        messages already answered are replayed without being charged"""
+        config = AdmissionConfig(enabled=True, customer_rate_per_s=0.01, customer_burst=1)
+        with patch(
+            "conversational_agent.services.admission_service.get_admission_config",
+            return_value=config,
+        ):
+            admission = AdmissionController()
+        service = ChatSocketService(Mock(), admission)
+        channel = ChatChannel(max_events=10)
+        frames = [{"type": "message", "id": f"m{i}", "text": "Hi"} for i in range(3)]
+        websocket = Mock(
+            receive_json=AsyncMock(side_effect=[*frames, WebSocketDisconnect()]),
+            send_json=AsyncMock(),
+        )
+        inbox = asyncio.Queue()
+
+        async def scenario() -> None:
+            channel.websocket = websocket
+            await channel.publish({"type": "reply", "reply_to": "m0", "text": "a"})
+            websocket.send_json.reset_mock()
+            await service._receive(websocket, inbox, channel, [0.0], "customer:jane")
+
+        asyncio.run(scenario())
+
+        assert [inbox.get_nowait().id for _ in range(inbox.qsize())] == ["m0", "m1"]
+        websocket.send_json.assert_awaited_once_with(
+            {"type": "rate_limited", "id": "m2", "retry_after_s": 100}
+        )
+        assert admission.shed["customer_rate"] == 1
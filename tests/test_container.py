@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from conversational_agent.config.dependencies.container import ServiceContainer
+
+
+class TestServiceContainer:
+    """Test resource building, overriding and teardown of the service container"""
+
+    @pytest.fixture
+    def container(self):
+        return ServiceContainer()
+
+    def test_built_exactly_once_under_concurrent_access(self, container):
+        """Test that concurrent first callers all get the one instance built"""
+        calls = []
+        lock = threading.Lock()
+
+        def factory():
+            with lock:
+                calls.append(1)
+            time.sleep(0.05)  # Widen the race window
+            return object()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            instances = list(
+                pool.map(lambda _: container.resolve(factory, factory, None), range(32))
+            )
+
+        assert len(calls) == 1
+        assert all(instance is instances[0] for instance in instances)
+
+    def test_override(self, container):
+        """Test that overrides take precedence and are undone on exit"""
+        factory = Mock(return_value="real")
+        fake = "fake"
+
+        with container.override(factory, fake):
+            assert container.resolve(factory, factory, None) == fake
+        factory.assert_not_called()
+
+        assert container.resolve(factory, factory, None) == "real"
+
+    @pytest.mark.asyncio
+    async def test_aclose_tears_down_in_reverse_order(self, container):
+        """Test that teardowns (sync and async) run newest-first and instances are rebuilt after"""
+        order = []
+        first_teardown = Mock(side_effect=lambda _: order.append("first"))
+        second_teardown = AsyncMock(side_effect=lambda _: order.append("second"))
+        first = Mock(return_value="first")
+        second = Mock(return_value="second")
+
+        container.resolve(first, first, first_teardown)
+        container.resolve(second, second, second_teardown)
+        await container.aclose()
+
+        assert order == ["second", "first"]
+        first_teardown.assert_called_once_with("first")
+        second_teardown.assert_awaited_once_with("second")
+
+        container.resolve(first, first, first_teardown)
+        assert first.call_count == 2
@@ -0,0 +1,60 @@
+from conversational_agent.services.context_packer import ContextPacker, estimate_tokens
+from conversational_agent.services.rag_service import Document
+
+
+def make_doc(doc_id: str, contents: str, score: float, title: str = "") -> Document:
+    return Document(id=doc_id, title=title, contents=contents, score=score)
+
+
+class TestContextPacker:
+    """Test packing retrieved documents into a bounded prompt context"""
+
+    def test_documents_fitting_the_budget_are_packed_best_first(self):
+        """Test that documents are packed whole, best first, with their titles"""
+        packer = ContextPacker(token_budget=100)
+        docs = [
+            make_doc("a", "Refunds take 5-7 days.", score=1.0, title="Refunds"),
+            make_doc("b", "Standard shipping takes 3-5 days.", score=2.0, title="Shipping"),
+        ]
+
+        context = packer.pack(docs)
+
+        assert context == (
+            "- Shipping: Standard shipping takes 3-5 days.\n\n- Refunds: Refunds take 5-7 days."
+        )
+
+    def test_context_never_exceeds_the_budget(self):
+        """Test that the packed context stays within the token budget, cut between sentences"""
+        packer = ContextPacker(token_budget=20)
+        contents = " ".join(f"This is sentence number {i}." for i in range(50))
+
+        context = packer.pack([make_doc("a", contents, score=1.0)])
+
+        assert 0 < estimate_tokens(context) <= 20
+        assert context.endswith(".")
+
+    def test_low_scoring_documents_are_dropped(self):
+        """Test the absolute and relative (to the best document) score thresholds"""
+        docs = [
+            make_doc("best", "Best match.", score=10.0),
+            make_doc("ok", "Decent match.", score=5.0),
+            make_doc("poor", "Poor match.", score=1.0),
+        ]
+
+        assert "Poor" not in ContextPacker(token_budget=100, min_relative_score=0.3).pack(docs)
+        assert "Decent" not in ContextPacker(token_budget=100, min_score=6.0).pack(docs)
+
+    def test_near_duplicates_are_dropped(self):
+        """Test that a near-duplicate of an already packed document is skipped"""
+        packer = ContextPacker(token_budget=200)
+        contents = "Items can be returned within 30 days of purchase for a full refund."
+        docs = [
+            make_doc("a", contents, score=2.0),
+            make_doc("b", contents.replace("full refund", "full refund!"), score=1.5),
+            make_doc("c", "Gift cards cannot be returned.", score=1.0),
+        ]
+
+        context = packer.pack(docs)
+
+        assert context.count("30 days") == 1
+        assert "Gift cards" in context
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from conversational_agent.services.deadline import Deadline, DeadlineExceeded
+from conversational_agent.services.metrics import Metrics, get_metrics
+
+
+class TestDeadline:
+    """Test sharing a request's time budget between its stages"""
+
+    def test_stage_gets_remaining_budget_minus_reserve(self):
+        """Test that a stage is cut short to leave the reserved budget to later stages"""
+        deadline = Deadline(0.3)
+
+        async def scenario() -> float:
+            with pytest.raises(DeadlineExceeded) as exc_info:
+                await deadline.run("slow", asyncio.sleep(1), reserve_s=0.2)
+            assert exc_info.value.stage == "slow"
+            return deadline.remaining_s()
+
+        remaining_s = asyncio.run(scenario())
+
+        assert 0.1 < remaining_s <= 0.2
+
+    def test_exhausted_budget_does_not_start_stage(self):
+        """Test that no work is started once the budget is spent"""
+        deadline = Deadline(0.0)
+        started = []
+
+        async def stage() -> None:
+            started.append(True)
+
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(deadline.run("late", stage()))
+
+        assert started == []
+
+    def test_stage_run_to_completion_outlives_the_deadline(self):
+        """Test that a stage that must not be cut short (e.g a commit) completes past the deadline"""
+        deadline = Deadline(0.05)
+        timeouts = get_metrics().value("chat_stage_timeouts_total", stage="commit")
+
+        async def commit() -> str:
+            await asyncio.sleep(0.1)
+            return "committed"
+
+        assert asyncio.run(deadline.run_to_completion("commit", commit())) == "committed"
+        assert deadline.remaining_s() == 0
+        assert get_metrics().value("chat_stage_timeouts_total", stage="commit") == timeouts
+
+    def test_client_can_only_shorten_deadline(self):
+        """Test that the deadline requested by a client is capped by the configured one"""
+        assert Deadline.for_chat(1_000).budget_s == 1.0
+        assert Deadline.for_chat(10**9).budget_s == 30.0
+
+
+class TestMetrics:
+    """Test the Prometheus text exposition of in-process metrics"""
+
+    def test_render(self):
+        """Test that counters and summaries are rendered with their labels"""
+        metrics = Metrics()
+        metrics.inc("timeouts_total", "Timeouts", stage="llm")
+        metrics.observe("stage_seconds", "Stage time", 0.5, stage="llm")
+        metrics.observe("stage_seconds", "Stage time", 1.5, stage="llm")
+
+        assert metrics.render().splitlines() == [
+            "# HELP timeouts_total Timeouts",
+            "# TYPE timeouts_total counter",
+            'timeouts_total{stage="llm"} 1.0',
+            "# HELP stage_seconds Stage time",
+            "# TYPE stage_seconds summary",
+            'stage_seconds_sum{stage="llm"} 2.0',
+            'stage_seconds_count{stage="llm"} 2',
+        ]
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from conversational_agent.services.document_store import DocumentStore
+from conversational_agent.utils import fork_shared, singleton
+
+
+class TestDocumentStore:
+    """Test the memory-mapped view over the knowledge base"""
+
+    @pytest.fixture
+    def kb_path(self, tmp_path):
+        documents = [
+            {"id": "refund_001", "contents": "Refunds take 5 days."},
+            {"contents": "No id, not stored."},
+            {"id": "shipping_001", "contents": "Shipping is free ✓"},
+        ]
+        path = tmp_path / "knowledge_base.jsonl"
+        path.write_text(
+            "\n".join(json.dumps(doc, ensure_ascii=False) for doc in documents) + "\n\n",
+            encoding="utf-8",
+        )
+        return path
+
+    def test_documents_are_looked_up_by_id(self, kb_path):
+        """Test that documents (multi-byte ones included) are decoded from their offsets"""
+        store = DocumentStore(kb_path)
+
+        assert len(store) == 2
+        assert store.get("shipping_001") == {"id": "shipping_001", "contents": "Shipping is free ✓"}
+        assert store.get("refund_001")["contents"] == "Refunds take 5 days."
+        assert store.get("missing") is None
+
+        store.close()
+        assert store.get("refund_001") is None
+
+    def test_empty_knowledge_base(self, tmp_path):
+        """Test that an empty file (which can't be mmapped) makes an empty store"""
+        (path := tmp_path / "knowledge_base.jsonl").touch()
+
+        store = DocumentStore(path)
+
+        assert len(store) == 0
+        assert store.get("refund_001") is None
+
+
+class TestProcessSingletons:
+    """Test which singletons forked workers rebuild and which they inherit"""
+
+    @staticmethod
+    def in_child(check) -> bool:
+        """Run `check` in a forked process, returning whether it held"""
+        read, write = os.pipe()
+        if (pid := os.fork()) == 0:
+            os.close(read)
+            os.write(write, b"1" if check() else b"0")
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read, "rb") as f:
+            result = f.read()
+        os.waitpid(pid, 0)
+        return result == b"1"
+
+    def test_singleton_is_per_process(self):
+        """Test that a singleton is built once per process, forked workers building their own"""
+
+        @singleton
+        def get_client() -> object:
+            return object()
+
+        client = get_client()
+
+        assert get_client() is client
+        assert self.in_child(lambda: get_client() is not client and get_client() is get_client())
+
+    def test_fork_shared_is_inherited(self):
+        """Test that a fork-shared instance built by the parent is reused by forked workers"""
+
+        @fork_shared
+        def get_store() -> object:
+            return object()
+
+        store = get_store()
+
+        assert get_store() is store
+        assert self.in_child(lambda: get_store() is store)
@@ -0,0 +1,129 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from conversational_agent.scripts.create_knowledge_base import create_sample_knowledge_base
+from conversational_agent.scripts.evaluate_retrieval import (
+    LabelledQuery,
+    RetrievalConfig,
+    create_seed_query_set,
+    evaluate,
+    format_table,
+    load_query_set,
+    ndcg_at_k,
+    percentile,
+    ranked_source_ids,
+    recall_at_k,
+    reciprocal_rank,
+)
+from conversational_agent.services.metrics import get_metrics
+from conversational_agent.services.rag_service import Document
+
+
+class TestRetrievalMetrics:
+    """Test the retrieval evaluation metrics"""
+
+    def test_passages_count_once_per_source_document(self):
+        """Test that passages of the same document collapse onto its best rank"""
+        docs = [
+            Document(id="a#0", parent_id="a", contents="", score=3.0),
+            Document(id="a#1", parent_id="a", contents="", score=2.0),
+            Document(id="b", parent_id="b", contents="", score=1.0),
+        ]
+
+        assert ranked_source_ids(docs) == ["a", "b"]
+
+    def test_metrics(self):
+        """Test recall@k, MRR and nDCG@k on a ranking with 1 of 2 relevant docs at rank 2"""
+        ranked_ids = ["x", "a", "y"]
+        relevant_ids = {"a", "b"}
+
+        assert recall_at_k(ranked_ids, relevant_ids, k=3) == 0.5
+        assert reciprocal_rank(ranked_ids, relevant_ids) == 0.5
+        assert ndcg_at_k(ranked_ids, relevant_ids, k=3) == pytest.approx(0.6309 / 1.6309, 1e-3)
+        assert ndcg_at_k(["a", "b"], relevant_ids, k=2) == 1.0
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = [float(v) for v in range(1, 101)]
+
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([7.0], 95) == 7.0
+
+    def test_seed_queries_reference_knowledge_base_documents(self):
+        """Test that every seed query is labelled with existing knowledge base documents"""
+        kb_ids = {doc["id"] for doc in create_sample_knowledge_base()}
+
+        for query in create_seed_query_set():
+            assert query.relevant_ids and set(query.relevant_ids) <= kb_ids, query.query
+
+    def test_queries_without_relevant_documents_are_rejected(self, tmp_path):
+        """Test that unlabelled queries fail loading (their recall and nDCG are undefined)"""
+        path = tmp_path / "queries.jsonl"
+        path.write_text(
+            '{"query": "refunds", "relevant_ids": ["billing_003"]}\n\n'
+            '{"query": "shipping", "relevant_ids": []}\n'
+        )
+
+        with pytest.raises(ValueError, match="queries.jsonl:3"):
+            load_query_set(path)
+        with pytest.raises(ValueError):
+            recall_at_k(["a"], set(), k=1)
+        with pytest.raises(ValueError):
+            ndcg_at_k(["a"], set(), k=1)
+
+
+class TestEvaluate:
+    """Test running a retrieval configuration over the queries"""
+
+    def test_reranked_configs_keep_their_top_k(self):
+        """Test that reranking keeps the configuration's top-k, from at least as many candidates"""
+        docs = [Document(id=f"d{n}", contents="", score=1.0) for n in range(8)]
+        rag_service = Mock(sparse_searcher=Mock(), shard_searchers={})
+        rag_service.search.return_value = docs
+        rerank_service = Mock(n_candidates=4)
+        rerank_service.rerank_exact.side_effect = lambda q, d, top_k: d[:top_k]
+        rerank_service.rerank = AsyncMock(side_effect=lambda q, d, top_k: d[:top_k])
+        config = RetrievalConfig(profile="global", k1=0.9, b=0.4, top_k=5, rerank=True)
+        queries = [LabelledQuery(query="refunds", relevant_ids=["d4"])]
+
+        with patch(
+            "conversational_agent.services.rerank_service.get_rerank_service",
+            return_value=rerank_service,
+        ):
+            result = evaluate(rag_service, config, queries, repeats=1)
+
+        assert result.recall == 1.0
+        assert rag_service.search.call_args.kwargs["k"] == 5
+        assert rerank_service.rerank_exact.call_args.kwargs["top_k"] == 5
+        assert rerank_service.rerank.await_args.kwargs["top_k"] == 5
+
+    def test_rerank_quality_is_not_the_fallbacks(self):
+        """Test that quality is scored on exact reranking, over-budget fallbacks reported apart"""
+        docs = [Document(id=f"d{n}", contents="", score=1.0) for n in range(4)]
+        rag_service = Mock(sparse_searcher=Mock(), shard_searchers={})
+        rag_service.search.return_value = docs
+        rerank_service = Mock(n_candidates=4)
+        # The reranker puts the relevant document first, but always runs over budget
+        rerank_service.rerank_exact.side_effect = lambda q, d, top_k: d[::-1][:top_k]
+
+        async def over_budget(query, docs, top_k):
+            get_metrics().inc("rerank_fallbacks_total", "Reranks that kept the first-stage order")
+            return docs[:top_k]
+
+        rerank_service.rerank = over_budget
+        config = RetrievalConfig(profile="global", k1=0.9, b=0.4, top_k=1, rerank=True)
+        queries = [LabelledQuery(query="refunds", relevant_ids=["d3"])]
+
+        with patch(
+            "conversational_agent.services.rerank_service.get_rerank_service",
+            return_value=rerank_service,
+        ):
+            result = evaluate(rag_service, config, queries, repeats=3)
+
+        assert (result.recall, result.mrr) == (1.0, 1.0)
+        assert result.rerank_fallback_rate == 1.0
+        # Timed passes don't hit scores cached by the previous ones
+        assert rerank_service.clear_cache.call_count == 3
+        assert "| 100% |" in format_table([result])
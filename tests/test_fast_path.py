@@ -0,0 +1,91 @@
+import pytest
+
+from conversational_agent.config.dependencies.fast_path import FastPathConfig
+from conversational_agent.data_models.db_models import IssueStatus
+from conversational_agent.services.fast_path import FastPath, Intent
+from conversational_agent.services.metrics import get_metrics
+
+
+class TestFastPath:
+    """Test classifying trivial chat messages, and replying to them without the LLM"""
+
+    @pytest.fixture
+    def fast_path(self):
+        return FastPath(FastPathConfig(enabled=True))
+
+    @pytest.mark.parametrize(
+        ("message", "intent", "matched_by"),
+        [
+            ("  ", Intent.EMPTY, "pattern"),
+            ("Quit", Intent.CLOSE, "pattern"),
+            ("Thanks, that’s all!", Intent.RESOLVE, "pattern"),
+            ("I don't need any more help", Intent.CLOSE, "pattern"),
+            ("ok, all sorted now thank you", Intent.RESOLVE, "classifier"),
+            ("bye then!", Intent.CLOSE, "classifier"),
+            ("thanks, bye", Intent.CLOSE, "classifier"),
+            ("Order #123456.", Intent.ORDER_NUMBER, "pattern"),
+        ],
+    )
+    def test_trivial_messages_are_classified(self, fast_path, message, intent, matched_by):
+        """Test that patterns, then the keyword classifier, recognize trivial messages"""
+        classification = fast_path.classify(message)
+
+        assert classification is not None
+        assert (classification.intent, classification.matched_by) == (intent, matched_by)
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "Thanks, but my parcel still hasn't arrived",
+            "sorted, bye",
+            "stop charging my card",
+            "I was charged 123456 twice",
+            # Usually about the order, not the chat
+            "cancel",
+            "cancel please",
+            "stop",
+            # Usually replies to the assistant's question, the issue isn't solved
+            "ok thanks",
+            "perfect",
+            "great thanks, please",
+            # Not labelled as an order number (e.g a year or the last digits of a card)
+            "2024",
+            "#4242",
+        ],
+    )
+    def test_other_messages_fall_through(self, fast_path, message):
+        """Test that messages with more to them (or mixed intents) are left to the LLM"""
+        assert fast_path.classify(message) is None
+
+    def test_bare_number_must_repeat_the_conversations(self, fast_path):
+        """Test that an unlabelled number is an order number only if mentioned before"""
+        history = ["Hi, how can I help?", "My order 12345 never arrived", "What is its number?"]
+
+        classification = fast_path.classify("#12345", history)
+
+        assert classification.intent == Intent.ORDER_NUMBER
+        assert classification.order_number == 12345
+        assert fast_path.classify("1234", history) is None
+
+    def test_order_number_needs_an_issue(self, fast_path):
+        """Test that a restated order number is only merged into an existing issue"""
+        misses = get_metrics().value("chat_fast_path_misses_total")
+
+        assert fast_path.reply("order 12345", has_issue=False) is None
+        decision = fast_path.reply("my order number is 12345", has_issue=True)
+
+        assert decision.create_issue and decision.order_number == 12345
+        assert "#12345" in decision.assistant_reply
+        assert get_metrics().value("chat_fast_path_misses_total") == misses + 1
+
+    def test_thanks_resolves_the_issue(self, fast_path):
+        """Test that the status is set on the issue only if there is one, and the hit counted"""
+        labels = {"intent": "resolve", "matched_by": "pattern"}
+        hits = get_metrics().value("chat_fast_path_hits_total", **labels)
+
+        without_issue = fast_path.reply("thank you, that's all", has_issue=False)
+        with_issue = fast_path.reply("thank you, that's all", has_issue=True)
+
+        assert without_issue.status == with_issue.status == IssueStatus.RESOLVED
+        assert (without_issue.create_issue, with_issue.create_issue) == (False, True)
+        assert get_metrics().value("chat_fast_path_hits_total", **labels) == hits + 2
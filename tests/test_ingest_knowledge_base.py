@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+from conversational_agent.scripts.ingest_knowledge_base import (
+    deduplicate,
+    document_category,
+    ingest,
+    iter_documents,
+    iter_source_files,
+    split_into_passages,
+)
+
+
+class TestReaders:
+    """Test reading knowledge base sources into documents"""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        """Source tree with same-named files in different directories"""
+        for directory in ("faq", "policies"):
+            (tmp_path / directory).mkdir()
+            (tmp_path / directory / "refunds.md").write_text(
+                f"# {directory.upper()} refunds\n\nRefunds take 5 days.\n"
+            )
+        (tmp_path / "policies" / "billing_cards.html").write_text(
+            "<html><head><title>Cards</title><style>p {}</style></head>"
+            "<body><p>We accept <b>all</b> cards.</p><script>track()</script></body></html>"
+        )
+        (tmp_path / "extra.csv").write_text(
+            "id,title,contents,category\n,Returns,Return within 30 days,Shipping\n"
+        )
+        (tmp_path / "extra.jsonl").write_text(
+            json.dumps({"id": "billing_001", "title": "Fees", "text": "No fees."}) + "\n\n"
+        )
+        (tmp_path / "notes.txt").write_text("Not a source")
+        return tmp_path
+
+    def read(self, source):
+        return [doc for path in iter_source_files([source]) for doc in iter_documents(path, source)]
+
+    def test_files_are_read_in_a_stable_order(self, source):
+        """Test that supported files are found recursively, sorted, other files skipped"""
+        paths = [path.relative_to(source).as_posix() for path in iter_source_files([source])]
+
+        assert paths == [
+            "extra.csv",
+            "extra.jsonl",
+            "faq/refunds.md",
+            "policies/billing_cards.html",
+            "policies/refunds.md",
+        ]
+
+    def test_file_ids_are_unique_across_directories(self, source):
+        """Test that documents without ids are named by their path relative to the source"""
+        docs = {doc["id"]: doc for doc in self.read(source)}
+
+        assert list(docs) == [
+            "extra_0",
+            "billing_001",
+            "faq/refunds",
+            "policies/billing_cards",
+            "policies/refunds",
+        ]
+        assert len(list(deduplicate(self.read(source)))) == 4  # Same contents once
+
+    def test_documents_are_parsed(self, source):
+        """Test that titles, contents and categories are extracted from each format"""
+        docs = {doc["id"]: doc for doc in self.read(source)}
+
+        assert (docs["faq/refunds"]["title"], docs["faq/refunds"]["contents"].strip()) == (
+            "FAQ refunds",
+            "Refunds take 5 days.",
+        )
+        html = docs["policies/billing_cards"]
+        assert (html["title"], " ".join(html["contents"].split())) == (
+            "Cards",
+            "We accept all cards.",
+        )
+        assert docs["extra_0"]["category"] == "Shipping"
+        assert docs["billing_001"]["contents"] == "No fees."
+
+    @pytest.mark.parametrize(
+        ("doc", "category"),
+        [
+            ({"id": "x", "category": " Billing "}, "billing"),
+            ({"id": "billing_001"}, "billing"),
+            ({"id": "policies/billing_cards"}, "billing"),
+            ({"id": "faq/refunds"}, "general"),
+            ({"id": "_001"}, "general"),
+        ],
+    )
+    def test_category(self, doc, category):
+        """Test that the explicit category wins over the id's (last path segment's) prefix, ids
+        without a prefix falling back to the default category"""
+        assert document_category(doc) == category
+
+
+class TestPassages:
+    """Test deduplicating documents and splitting them into overlapping passages"""
+
+    def test_deduplicate(self):
+        """Test that empty, repeated-id and repeated-contents documents are dropped"""
+        docs = [
+            {"id": "a_1", "contents": "Refunds  take\n5 days."},
+            {"id": "a_2", "contents": "  "},
+            {"id": "a_1", "contents": "Other contents"},
+            {"id": "b_1", "contents": "refunds take 5 days."},
+            {"id": "b_2", "contents": "Shipping is free."},
+        ]
+
+        kept = list(deduplicate(docs))
+
+        assert [(doc["id"], doc["contents"], doc["category"]) for doc in kept] == [
+            ("a_1", "Refunds take 5 days.", "a"),
+            ("b_2", "Shipping is free.", "b"),
+        ]
+
+    def test_short_document_is_one_passage(self):
+        """Test that a document fitting in a passage keeps its id"""
+        doc = {"id": "a", "title": "T", "contents": "One sentence. Two sentences."}
+
+        assert list(split_into_passages(doc, passage_words=10, overlap_words=2)) == [
+            {"title": "T", "id": "a", "parent_id": "a", "contents": "One sentence. Two sentences."}
+        ]
+
+    def test_passages_keep_sentences_and_overlap(self):
+        """Test that passages pack whole sentences within the size, overlapping the previous"""
+        sentences = [f"Sentence {n} has five words." for n in range(6)]
+        doc = {"id": "a", "title": "T", "contents": " ".join(sentences)}
+
+        passages = list(split_into_passages(doc, passage_words=12, overlap_words=2))
+
+        assert [passage["id"] for passage in passages] == ["a#0", "a#1", "a#2"]
+        assert {passage["parent_id"] for passage in passages} == {"a"}
+        assert all(len(passage["contents"].split()) <= 12 for passage in passages)
+        assert passages[0]["contents"] == " ".join(sentences[:2])
+        assert passages[1]["contents"] == "five words. " + " ".join(sentences[2:4])
+
+    def test_long_sentence_is_split_by_words(self):
+        """Test that a sentence longer than a passage is broken up rather than overflowing it"""
+        doc = {"id": "a", "contents": " ".join(f"w{n}" for n in range(25))}
+
+        passages = list(split_into_passages(doc, passage_words=10, overlap_words=0))
+
+        assert [len(passage["contents"].split()) for passage in passages] == [10, 10, 5]
+
+    def test_ingest_writes_passages(self, tmp_path):
+        """Test that ingestion writes the passages of the deduplicated documents"""
+        docs = [{"id": "a", "contents": "Hello."}, {"id": "b", "contents": "hello."}]
+        output = tmp_path / "kb" / "knowledge_base.jsonl"
+
+        assert ingest(iter(docs), output, passage_words=10, overlap_words=2) == (1, 1)
+        assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == ["a"]
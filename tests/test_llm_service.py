@@ -0,0 +1,384 @@
+import asyncio
+import subprocess
+import sys
+import time
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from conversational_agent.config.dependencies.container import get_container
+from conversational_agent.config.dependencies.fast_path import FastPathConfig
+from conversational_agent.data_models.api_models import ChatRequest
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    Customer,
+    Issue,
+    IssueStatus,
+    IssueType,
+    LLMUsage,
+    Role,
+    Turn,
+    UrgencyLevel,
+)
+from conversational_agent.data_models.ml_models import SYSTEM_MESSAGE, OpenAIAPIIssueFormat
+from conversational_agent.services.deadline import Deadline
+from conversational_agent.services.fast_path import FastPath
+from conversational_agent.services.llm_service import (
+    DEADLINE_REPLY,
+    LLMService,
+    get_llm_service,
+)
+from conversational_agent.services.metrics import get_metrics
+
+
+class TestGetLLMService:
+    """Test building the LLM service and its (lazy) heavy dependencies"""
+
+    @pytest.fixture(autouse=True)
+    def reset_container(self):
+        """Forget any resources built by a test"""
+        yield
+        asyncio.run(get_container().aclose())
+
+    @patch("conversational_agent.services.llm_service.get_openai_client")
+    @patch("conversational_agent.services.llm_service.get_rag_config")
+    def test_rag_disabled_does_not_load_rag(self, mock_rag_config, mock_openai_client):
+        """Test that no RAG service is built when RAG is disabled"""
+        mock_rag_config.return_value.enabled = False
+
+        service = get_llm_service()
+
+        assert service._rag_service is None
+
+    def test_rag_disabled_does_not_import_pyserini(self):
+        """Test that pyserini (and its JVM) is not imported when RAG is disabled, in a fresh
+        interpreter since other tests may have imported it"""
+        script = """
+import sys
+from unittest.mock import patch
+
+with (
+    patch("conversational_agent.services.llm_service.get_openai_client"),
+    patch("conversational_agent.services.llm_service.get_rag_config") as mock_rag_config,
+):
+    from conversational_agent.services.llm_service import get_llm_service
+
+    mock_rag_config.return_value.enabled = False
+    get_llm_service()
+assert "pyserini" not in sys.modules
+"""
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+
+    @patch("conversational_agent.services.llm_service.get_openai_client")
+    @patch("conversational_agent.services.llm_service.get_rag_config")
+    def test_rag_enabled_loads_rag(self, mock_rag_config, mock_openai_client):
+        """Test that the RAG service is built when RAG is enabled"""
+        from conversational_agent.services.rag_service import get_rag_service
+
+        mock_rag_config.return_value.enabled = True
+        mock_rag_config.return_value.rerank_enabled = False
+        fake_rag_service = Mock()
+
+        with get_container().override(get_rag_service, fake_rag_service):
+            service = get_llm_service()
+
+        assert service._rag_service is fake_rag_service
+
+    @patch("conversational_agent.services.llm_service.get_openai_client")
+    @patch("conversational_agent.services.llm_service.get_rag_config")
+    def test_rerank_enabled_loads_reranker(self, mock_rag_config, mock_openai_client):
+        """Test that the reranking stage is built alongside RAG when enabled"""
+        from conversational_agent.services.rag_service import get_rag_service
+        from conversational_agent.services.rerank_service import get_rerank_service
+
+        mock_rag_config.return_value.enabled = True
+        mock_rag_config.return_value.rerank_enabled = True
+        fake_rerank_service = Mock()
+
+        with (
+            get_container().override(get_rag_service, Mock()),
+            get_container().override(get_rerank_service, fake_rerank_service),
+        ):
+            service = get_llm_service()
+
+        assert service._rerank_service is fake_rerank_service
+
+
+class TestChatPipeline:
+    """Test that context retrieval overlaps with loading the conversation from the DB"""
+
+    @pytest.fixture
+    def rag_service(self):
+        """RAG service whose (blocking) searches take 50ms"""
+        rag_service = Mock()
+        rag_service.search.side_effect = lambda *args, **kwargs: time.sleep(0.05) or []
+        return rag_service
+
+    @pytest.fixture
+    def client(self):
+        """OpenAI client replying without creating an issue"""
+        client = Mock()
+        choice = Mock()
+        choice.message.parsed = OpenAIAPIIssueFormat(assistant_reply="Hello!")
+        response = Mock(usage=None, choices=[choice])
+        client.chat.completions.parse = AsyncMock(return_value=response)
+        return client
+
+    def test_retrieval_runs_while_conversation_loads(self, client, rag_service):
+        """Test that retrieval has started by the time the (slow) DB load completes"""
+        conversation = Conversation(customer_id=uuid4())
+        conversation.turns = [Turn(role=Role.SYSTEM, text="Be helpful", conversation_id=uuid4())]
+        searched_during_load = []
+
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            searched_during_load.append(rag_service.search.called)
+            return conversation
+
+        session = Mock(get=AsyncMock(side_effect=slow_get), refresh=AsyncMock())
+        service = LLMService(client, rag_service)
+
+        response = asyncio.run(
+            service.chat(conversation.id, ChatRequest(message="Where is my order?"), session)
+        )
+
+        assert response.reply == "Hello!"
+        assert searched_during_load == [True]
+        assert [turn.role for turn in conversation.turns] == [
+            Role.SYSTEM,
+            Role.USER,
+            Role.ASSISTANT,
+        ]
+
+    def test_missing_conversation_cancels_retrieval(self, client, rag_service):
+        """Test that a failed DB stage surfaces its own error, not the retrieval's"""
+        rag_service.search.side_effect = RuntimeError("search failed")
+        session = Mock(get=AsyncMock(return_value=None))
+        service = LLMService(client, rag_service)
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(service.chat(uuid4(), ChatRequest(message="Hi"), session))
+
+        assert exc_info.value.status_code == 404
+        client.chat.completions.parse.assert_not_awaited()
+
+
+class TestChatDeadline:
+    """Test that a chat turn's stages fit within its deadline"""
+
+    @pytest.fixture
+    def conversation(self):
+        conversation = Conversation(customer_id=uuid4())
+        conversation.turns = [Turn(role=Role.SYSTEM, text="Be helpful", conversation_id=uuid4())]
+        return conversation
+
+    @pytest.fixture
+    def session(self, conversation):
+        return Mock(get=AsyncMock(return_value=conversation), refresh=AsyncMock())
+
+    def test_slow_llm_gets_holding_reply(self, conversation, session):
+        """Test that a hanging LLM call is cut short with a valid reply before the deadline"""
+
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        client = Mock()
+        client.chat.completions.parse = AsyncMock(side_effect=hang)
+        service = LLMService(client)
+        timeouts = get_metrics().value("chat_stage_timeouts_total", stage="llm")
+
+        started = time.perf_counter()
+        response = asyncio.run(
+            service.chat(conversation.id, ChatRequest(message="Hi"), session, Deadline(0.6))
+        )
+
+        assert time.perf_counter() - started < 0.6
+        assert response.reply == DEADLINE_REPLY
+        assert response.status == IssueStatus.IN_PROGRESS
+        assert conversation.turns[-1].text == DEADLINE_REPLY
+        assert get_metrics().value("chat_stage_timeouts_total", stage="llm") == timeouts + 1
+
+    def test_short_budget_skips_retrieval(self, conversation, session):
+        """Test that retrieval isn't even started when the budget only leaves room for the LLM"""
+        rag_service = Mock()
+        client = Mock()
+        choice = Mock()
+        choice.message.parsed = OpenAIAPIIssueFormat(assistant_reply="Hello!")
+        client.chat.completions.parse = AsyncMock(return_value=Mock(usage=None, choices=[choice]))
+        service = LLMService(client, rag_service)
+
+        response = asyncio.run(
+            service.chat(conversation.id, ChatRequest(message="Hi"), session, Deadline(1.0))
+        )
+
+        assert response.reply == "Hello!"
+        rag_service.search.assert_not_called()
+
+
+class TestTenantSelection:
+    """Test that context is retrieved from the knowledge base of the conversation's tenant"""
+
+    @pytest.fixture
+    def customer(self):
+        return Customer(name="Ada", email="ada@example.com", tenant="acme")
+
+    @pytest.fixture
+    def conversation(self, customer):
+        conversation = Conversation(customer_id=customer.id)
+        conversation.turns = [Turn(role=Role.SYSTEM, text="Be helpful", conversation_id=uuid4())]
+        return conversation
+
+    @pytest.fixture
+    def session(self, conversation, customer):
+        async def get(model, primary_key):
+            return customer if model is Customer else conversation
+
+        return Mock(get=AsyncMock(side_effect=get), refresh=AsyncMock())
+
+    @pytest.fixture
+    def service(self):
+        client = Mock()
+        choice = Mock()
+        choice.message.parsed = OpenAIAPIIssueFormat(assistant_reply="Hello!")
+        client.chat.completions.parse = AsyncMock(return_value=Mock(usage=None, choices=[choice]))
+        rag_service = Mock()
+        rag_service.search.return_value = []
+        with patch("conversational_agent.services.llm_service.get_rag_config") as mock_config:
+            mock_config.return_value.multi_tenant = True
+            return LLMService(client, rag_service)
+
+    def test_customer_tenant_is_looked_up_once(self, service, conversation, session):
+        """Test that the customer's tenant is searched, and remembered for the next turns"""
+        for message in ("Hi", "Where is my order?"):
+            asyncio.run(service.chat(conversation.id, ChatRequest(message=message), session))
+
+        tenants = [call.kwargs["tenant"] for call in service._rag_service.search.call_args_list]
+        assert tenants == ["acme", "acme"]
+        customer_lookups = [c for c in session.get.await_args_list if c.args[0] is Customer]
+        assert len(customer_lookups) == 1
+
+    def test_requested_tenant_overrides_the_customers(self, service, conversation, session):
+        """Test that a tenant passed with the request is searched without any lookup"""
+        asyncio.run(
+            service.chat(conversation.id, ChatRequest(message="Hi"), session, tenant="globex")
+        )
+
+        assert service._rag_service.search.call_args.kwargs["tenant"] == "globex"
+        assert all(c.args[0] is not Customer for c in session.get.await_args_list)
+
+
+class TestModelRouting:
+    """Test that each attempt of a call is made with the routed model, and recorded per model"""
+
+    def test_unparsed_reply_is_retried_with_stronger_model(self):
+        """Test that only the retry is escalated, each model's usage recorded with its rule"""
+        conversation = Conversation(customer_id=uuid4())
+        conversation.turns = [Turn(role=Role.SYSTEM, text="Be helpful", conversation_id=uuid4())]
+        session = Mock(get=AsyncMock(return_value=conversation), refresh=AsyncMock())
+        parsed = OpenAIAPIIssueFormat(assistant_reply="Hello!")
+        client = Mock()
+        client.chat.completions.parse = AsyncMock(
+            side_effect=[
+                Mock(usage=None, choices=[Mock(message=Mock(parsed=None))]),
+                Mock(usage=None, choices=[Mock(message=Mock(parsed=parsed))]),
+            ]
+        )
+
+        response = asyncio.run(
+            LLMService(client).chat(conversation.id, ChatRequest(message="Hi"), session)
+        )
+
+        assert response.reply == "Hello!"
+        models = [call.kwargs["model"] for call in client.chat.completions.parse.await_args_list]
+        assert models == ["gpt-5-nano", "gpt-5-mini"]
+        usages = [
+            call.args[0]
+            for call in session.add.call_args_list
+            if isinstance(call.args[0], LLMUsage)
+        ]
+        assert [(u.model, u.routing_rule, u.retries) for u in usages] == [
+            ("gpt-5-nano", "default", 1),
+            ("gpt-5-mini", "escalate_on_retry", 0),
+        ]
+        assert {usage.turn_id for usage in usages} == {conversation.turns[-1].id}
+
+
+class TestFastPath:
+    """Test that trivial turns are replied to without the LLM"""
+
+    @pytest.fixture
+    def issue(self):
+        return Issue(
+            customer_id=uuid4(),
+            description="Parcel never arrived",
+            issue_type=IssueType.DELIVERY,
+            urgency=UrgencyLevel.HIGH,
+        )
+
+    @pytest.fixture
+    def conversation(self, issue):
+        conversation = Conversation(customer_id=uuid4(), issue_id=issue.id)
+        conversation.turns = [Turn(role=Role.SYSTEM, text="Be helpful", conversation_id=uuid4())]
+        return conversation
+
+    @pytest.fixture
+    def session(self, conversation, issue):
+        async def get(model, primary_key):
+            return issue if model is Issue else conversation
+
+        return Mock(get=AsyncMock(side_effect=get), refresh=AsyncMock())
+
+    @pytest.fixture
+    def service(self):
+        client = Mock()
+        client.chat.completions.parse = AsyncMock()
+        rag_service = Mock()
+        rag_service.search.return_value = []
+        return LLMService(client, rag_service, fast_path=FastPath(FastPathConfig(enabled=True)))
+
+    def test_quit_closes_issue_without_llm(self, service, conversation, issue, session):
+        """Test that "quit" closes the issue, with neither retrieval nor an LLM call"""
+        response = asyncio.run(service.chat(conversation.id, ChatRequest(message="Quit"), session))
+
+        assert response.status == IssueStatus.CLOSED
+        assert issue.status == IssueStatus.CLOSED
+        assert conversation.turns[-1].text == response.reply
+        service._client.chat.completions.parse.assert_not_awaited()
+        service._rag_service.search.assert_not_called()
+
+    def test_order_number_is_merged_into_issue(self, service, conversation, issue, session):
+        """Test that a restated order number is saved on the issue, its other fields untouched"""
+        asyncio.run(service.chat(conversation.id, ChatRequest(message="Order #98765"), session))
+
+        assert issue.order_number == 98765
+        assert issue.description == "Parcel never arrived"
+        service._client.chat.completions.parse.assert_not_awaited()
+
+
+class TestRetriage:
+    """Test re-extracting the issue of a past conversation"""
+
+    def test_retriage_uses_current_prompt_and_retries(self):
+        """Test that the stored system prompt is replaced, and unparsed responses retried"""
+        parsed = OpenAIAPIIssueFormat(description="Charged twice", assistant_reply="")
+        choices = [Mock(message=Mock(parsed=None)), Mock(message=Mock(parsed=parsed))]
+        client = Mock()
+        client.chat.completions.parse = AsyncMock(
+            side_effect=[Mock(usage=None, choices=[choice]) for choice in choices]
+        )
+        turns = [
+            Turn(role=Role.SYSTEM, text="old prompt", conversation_id=uuid4()),
+            Turn(role=Role.USER, text="I was charged twice", conversation_id=uuid4()),
+        ]
+
+        model, usages = asyncio.run(LLMService(client).retriage(uuid4(), turns, max_attempts=3))
+
+        assert model is parsed
+        assert sum(usage.retries for usage in usages) == 1
+        messages = client.chat.completions.parse.await_args.kwargs["messages"]
+        assert messages[0]["content"] == SYSTEM_MESSAGE
+        assert "old prompt" not in [message["content"] for message in messages]
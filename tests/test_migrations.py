@@ -0,0 +1,197 @@
+import asyncio
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from conversational_agent.data_models.db_models import Role
+from conversational_agent.migrations import run_migrations
+from conversational_agent.services.archive_service import compress_turns
+
+# Schema of the first release, before any migration (as created by `create_all` back then)
+_BASELINE_DDL = [
+    """CREATE TABLE customer (
+        id CHAR(32) NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, email VARCHAR NOT NULL
+    )""",
+    """CREATE TABLE issue (
+        id CHAR(32) NOT NULL PRIMARY KEY,
+        description VARCHAR(1000) NOT NULL,
+        issue_type VARCHAR(8) NOT NULL,
+        urgency VARCHAR(6) NOT NULL,
+        status VARCHAR(11) NOT NULL,
+        order_number INTEGER,
+        created_at DATETIME NOT NULL,
+        customer_id CHAR(32) NOT NULL REFERENCES customer (id)
+    )""",
+    """CREATE TABLE conversation (
+        id CHAR(32) NOT NULL PRIMARY KEY,
+        created_at DATETIME NOT NULL,
+        customer_id CHAR(32) NOT NULL REFERENCES customer (id),
+        issue_id CHAR(32) REFERENCES issue (id)
+    )""",
+    """CREATE TABLE turn (
+        id CHAR(32) NOT NULL PRIMARY KEY,
+        role VARCHAR(9) NOT NULL,
+        text VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL,
+        conversation_id CHAR(32) NOT NULL REFERENCES conversation (id)
+    )""",
+    # Jane logged in twice concurrently (creating two customers), then had a conversation on each
+    "INSERT INTO customer VALUES ('a1', 'Jane', 'jane@example.com'), ('b2', 'Jane', "
+    "'jane@example.com'), ('c3', 'John', 'john@example.com')",
+    "INSERT INTO issue VALUES ('i1', 'Lost parcel', 'DELIVERY', 'HIGH', 'IN_PROGRESS', NULL, "
+    "'2025-01-02 00:00:00', 'a1')",
+    "INSERT INTO conversation VALUES ('v1', '2025-01-02 00:00:00', 'a1', 'i1'), "
+    "('v2', '2025-01-01 00:00:00', 'b2', NULL), ('v3', '2025-01-01 00:00:00', 'c3', NULL)",
+]
+
+# Usage records as first recorded, before the routing of calls across models
+_LLM_USAGE_DDL = [
+    """CREATE TABLE llmusage (
+        id CHAR(32) NOT NULL PRIMARY KEY,
+        call_type VARCHAR(8) NOT NULL,
+        model VARCHAR NOT NULL,
+        prompt_tokens INTEGER NOT NULL,
+        completion_tokens INTEGER NOT NULL,
+        cached_tokens INTEGER NOT NULL,
+        latency_ms FLOAT NOT NULL,
+        retries INTEGER NOT NULL,
+        rag_enabled BOOLEAN NOT NULL,
+        rag_context_chars INTEGER NOT NULL,
+        created_at DATETIME NOT NULL,
+        conversation_id CHAR(32) NOT NULL REFERENCES conversation (id),
+        turn_id CHAR(32) REFERENCES turn (id) ON DELETE SET NULL
+    )""",
+    "CREATE INDEX ix_llmusage_created_at ON llmusage (created_at)",
+    "CREATE INDEX ix_llmusage_conversation_id ON llmusage (conversation_id)",
+]
+
+
+# Archives as first written, without their searchable text
+_ARCHIVE_DDL = [
+    """CREATE TABLE conversationarchive (
+        conversation_id CHAR(32) NOT NULL PRIMARY KEY REFERENCES conversation (id),
+        turns_blob BLOB NOT NULL,
+        turn_count INTEGER NOT NULL,
+        archived_at DATETIME NOT NULL
+    )""",
+]
+
+
+class TestMigrations:
+    """Test upgrading databases created by earlier versions to the current schema (on SQLite)"""
+
+    @pytest.fixture
+    def engine(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        yield engine
+        asyncio.run(engine.dispose())
+
+    @staticmethod
+    async def init_db(engine) -> None:
+        # As `init_db` does
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.run_sync(run_migrations)
+
+    def test_baseline_database_is_upgraded(self, engine):
+        """Test that duplicate customers are merged into the one with the earliest conversation"""
+
+        async def scenario():
+            async with engine.begin() as conn:
+                for ddl in _BASELINE_DDL:
+                    await conn.execute(text(ddl))
+            await self.init_db(engine)
+            async with engine.begin() as conn:
+                customers = (await conn.execute(text("SELECT id FROM customer"))).scalars().all()
+                owners = (
+                    await conn.execute(text("SELECT customer_id FROM conversation ORDER BY id"))
+                ).scalars()
+                issue_owner = (await conn.execute(text("SELECT customer_id FROM issue"))).scalar()
+                # As logging in does
+                login = await conn.execute(
+                    text(
+                        "INSERT INTO customer (id, name, email) "
+                        "VALUES ('d4', 'Jane', 'jane@example.com') ON CONFLICT (email) DO UPDATE SET email = excluded.email RETURNING id"
+                    )
+                )
+                return sorted(customers), list(owners), issue_owner, login.scalar()
+
+        customers, owners, issue_owner, login = asyncio.run(scenario())
+
+        assert customers == ["b2", "c3"]
+        assert owners == ["b2", "b2", "c3"]
+        assert issue_owner == login == "b2"
+
+    def test_baseline_schema_is_upgraded(self, engine):
+        """Test that columns and indexes added to existing tables since are created"""
+
+        def missing(conn) -> set[tuple[str, str]]:
+            inspector = inspect(conn)
+            missing = set()
+            for table in SQLModel.metadata.sorted_tables:
+                columns = {c["name"] for c in inspector.get_columns(table.name)}
+                indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+                missing |= {(table.name, c.name) for c in table.columns if c.name not in columns}
+                missing |= {(table.name, i.name) for i in table.indexes if i.name not in indexes}
+            return missing
+
+        async def scenario():
+            async with engine.begin() as conn:
+                for ddl in _BASELINE_DDL + _LLM_USAGE_DDL:
+                    await conn.execute(text(ddl))
+            await self.init_db(engine)
+            async with engine.begin() as conn:
+                return await conn.run_sync(missing)
+
+        assert asyncio.run(scenario()) == set()
+
+    def test_archives_are_made_searchable(self, engine):
+        """Test that the searchable text of existing archives is backfilled from their blobs"""
+        created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        blob = compress_turns(
+            [
+                {"id": uuid4(), "role": Role.SYSTEM, "text": "prompt", "created_at": created_at},
+                {"id": uuid4(), "role": Role.USER, "text": "Lost parcel", "created_at": created_at},
+                {"id": uuid4(), "role": Role.ASSISTANT, "text": "Sorry!", "created_at": created_at},
+            ]
+        )
+
+        async def scenario():
+            async with engine.begin() as conn:
+                for ddl in _BASELINE_DDL + _ARCHIVE_DDL:
+                    await conn.execute(text(ddl))
+                await conn.execute(
+                    text(
+                        "INSERT INTO conversationarchive "
+                        "VALUES ('v2', :blob, 3, '2025-02-01 00:00:00')"
+                    ),
+                    {"blob": blob},
+                )
+            await self.init_db(engine)
+            async with engine.begin() as conn:
+                return (
+                    await conn.execute(text("SELECT search_text FROM conversationarchive"))
+                ).scalar()
+
+        assert asyncio.run(scenario()) == "Lost parcel\nSorry!"
+
+    def test_current_database_is_left_as_is(self, engine):
+        """Test that migrations are no-ops on (and can be rerun on) a database created up to date"""
+
+        async def scenario():
+            await self.init_db(engine)
+            await self.init_db(engine)
+            async with engine.begin() as conn:
+                version = (await conn.execute(text("SELECT * FROM alembic_version"))).scalar()
+                indexes = await conn.run_sync(lambda c: inspect(c).get_indexes("customer"))
+                return version, indexes
+
+        version, indexes = asyncio.run(scenario())
+
+        assert version == "0006"
+        # The unique constraint created with the table is enough
+        assert indexes == []
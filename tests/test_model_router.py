@@ -0,0 +1,43 @@
+from conversational_agent.config.dependencies.routing import ModelRoutingConfig, RoutingRule
+from conversational_agent.data_models.db_models import CallType
+from conversational_agent.services.model_router import DEFAULT_RULE, ModelRouter
+
+
+class TestModelRouter:
+    """Test picking the model of each LLM call from the routing rules"""
+
+    def test_default_rules_escalate_only_retries(self):
+        """Test that first attempts get the cheap model, whatever their size, and retries a
+        stronger one"""
+        router = ModelRouter(ModelRoutingConfig())
+
+        first = router.route(CallType.TRIAGE, n_turns=200, context_chars=50_000)
+        retry = router.route(CallType.TRIAGE, n_turns=2, retry=True)
+
+        assert (first.model, first.rule) == ("gpt-5-nano", DEFAULT_RULE)
+        assert (retry.model, retry.rule) == ("gpt-5-mini", "escalate_on_retry")
+
+    def test_first_matching_rule_wins(self):
+        """Test that rules are matched in order, on all of their conditions"""
+        router = ModelRouter(
+            ModelRoutingConfig(
+                rules=[
+                    RoutingRule(name="retry", model="gpt-5", retry=True),
+                    RoutingRule(
+                        name="long_triage",
+                        model="gpt-5-mini",
+                        call_types=[CallType.TRIAGE],
+                        min_turns=20,
+                    ),
+                    RoutingRule(name="big_context", model="gpt-5-mini", min_context_chars=4000),
+                ]
+            )
+        )
+
+        def model(call_type, n_turns, context_chars=0, retry=False):
+            return router.route(call_type, n_turns, context_chars, retry).model
+
+        assert model(CallType.TRIAGE, 30) == "gpt-5-mini"
+        assert model(CallType.SUMMARY, 30) == "gpt-5-nano"
+        assert model(CallType.SUMMARY, 2, context_chars=5000) == "gpt-5-mini"
+        assert model(CallType.TRIAGE, 30, retry=True) == "gpt-5"
@@ -0,0 +1,243 @@
+import json
+import sys
+from types import ModuleType, SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from conversational_agent.config.dependencies.rag import RAGConfig
+from conversational_agent.services.index_releases import (
+    current_release,
+    mark_failed,
+    publish_release,
+    release_at,
+)
+from conversational_agent.services.rag_service import RAGService
+
+
+class FakeLuceneSearcher:
+    """Stands in for pyserini's LuceneSearcher, returning one hit named after its index"""
+
+    def __init__(self, index_path: str) -> None:
+        self.index_path = index_path
+        self.name = index_path.rsplit("/", 1)[-1]
+        self.closed = False
+
+    def search(self, query: str, k: int) -> list:
+        return [SimpleNamespace(docid=f"{self.name}_001", score=float(len(self.name)))]
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def rag_service(tmp_path, monkeypatch):
+    """RAG service over a global index and shipping/returns/billing shards"""
+    for category in ("shipping", "returns", "billing"):
+        (tmp_path / "shards" / category).mkdir(parents=True)
+    lucene = ModuleType("pyserini.search.lucene")
+    lucene.LuceneSearcher = FakeLuceneSearcher  # type: ignore[attr-defined]
+    monkeypatch.setitem(sys.modules, "pyserini.search.lucene", lucene)
+
+    with (
+        patch("conversational_agent.services.rag_service.get_rag_config") as mock_config,
+        patch("conversational_agent.services.rag_service.get_document_store") as mock_store,
+    ):
+        mock_config.return_value.index_path = tmp_path / "sparse"
+        mock_config.return_value.shards_path = tmp_path / "shards"
+        mock_config.return_value.kb_path = tmp_path / "knowledge_base.jsonl"
+        mock_config.return_value.releases_path = tmp_path / "releases"
+        mock_config.return_value.reload_interval_s = 0
+        mock_config.return_value.tenants_path = tmp_path / "tenants"
+        mock_config.return_value.tenant_pool_size = 2
+        mock_config.return_value.tenant_pool_memory_mb = 1
+        mock_config.return_value.shard_routing = {
+            "delivery": ["shipping", "returns"],
+            "billing": ["billing", "account"],
+        }
+        mock_store.return_value = Mock(
+            path=tmp_path / "knowledge_base.jsonl", get=lambda doc_id: {"contents": doc_id}
+        )
+        yield RAGService()
+
+
+class TestShardRouting:
+    """Test that retrieval goes to the category shards routed to from the issue type"""
+
+    def test_issue_type_searches_its_shards(self, rag_service):
+        """Test that hits come from (and are merged across) the routed shards"""
+        docs = rag_service.search("where is my parcel", issue_type="delivery")
+
+        assert [doc.id for doc in docs] == ["shipping_001", "returns_001"]
+
+    def test_missing_shards_are_skipped(self, rag_service):
+        """Test that routed categories without a built shard are ignored"""
+        docs = rag_service.search("refund my card", issue_type="billing")
+
+        assert [doc.id for doc in docs] == ["billing_001"]
+
+    @pytest.mark.parametrize("issue_type", [None, "other"])
+    def test_unknown_issue_type_falls_back_to_global_index(self, rag_service, issue_type):
+        """Test that the global index is searched when the issue type has no shards"""
+        docs = rag_service.search("hello", issue_type=issue_type)
+
+        assert [doc.id for doc in docs] == ["sparse_001"]
+
+
+class TestHotReload:
+    """Test swapping in newly published index releases without downtime"""
+
+    @staticmethod
+    def publish(tmp_path, version: str) -> None:
+        (tmp_path / "releases" / version / "sparse").mkdir(parents=True)
+        (tmp_path / "releases" / "CURRENT").write_text(version)
+
+    def test_reload_swaps_in_published_release(self, rag_service, tmp_path):
+        """Test that a published release is served from the next query, the old one closed"""
+        legacy_searcher = rag_service.sparse_searcher
+        self.publish(tmp_path, "v2")
+
+        with patch("conversational_agent.services.rag_service.get_rag_config") as mock_config:
+            mock_config.return_value.releases_path = tmp_path / "releases"
+            assert rag_service.reload()
+            assert not rag_service.reload()
+
+        assert rag_service.version == "v2"
+        assert rag_service.sparse_searcher.index_path.endswith("v2/sparse")
+        assert legacy_searcher.closed
+
+    def test_reload_notifies_listeners_of_changes(self, rag_service, tmp_path):
+        """Test that listeners (e.g the reranker's cache) are told of reloads swapping releases"""
+        listener = Mock()
+        rag_service.on_reload(listener)
+        self.publish(tmp_path, "v2")
+
+        with patch("conversational_agent.services.rag_service.get_rag_config") as mock_config:
+            mock_config.return_value.releases_path = tmp_path / "releases"
+            rag_service.reload()
+            rag_service.reload()
+
+        listener.assert_called_once_with()
+
+    def test_previous_release_closed_once_queries_drain(self, rag_service, tmp_path):
+        """Test that a query in flight during the swap keeps its searchers open until it ends"""
+        in_flight = rag_service._acquire()
+        self.publish(tmp_path, "v2")
+
+        with patch("conversational_agent.services.rag_service.get_rag_config") as mock_config:
+            mock_config.return_value.releases_path = tmp_path / "releases"
+            rag_service.reload()
+
+        assert not in_flight.sparse_searcher.closed
+        rag_service._release(in_flight)
+        assert in_flight.sparse_searcher.closed
+
+    def test_publish_prunes_old_releases(self, tmp_path):
+        """Test that publishing points CURRENT at the release and keeps the newest ones only"""
+        config = RAGConfig(releases_path=tmp_path, keep_releases=2)
+        releases = []
+        for version in ("v1", "v2", "v3"):
+            (tmp_path / version).mkdir()
+            releases.append(release_at(tmp_path / version))
+
+        for release in releases:
+            publish_release(config, release)
+
+        assert current_release(config).version == "v3"
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["CURRENT", "v2", "v3"]
+
+    def test_prune_only_counts_published_releases(self, tmp_path):
+        """Test that failed builds don't push served releases out, and are pruned once superseded"""
+        config = RAGConfig(releases_path=tmp_path, keep_releases=2)
+        releases = {}
+        for version in ("v1", "v2", "v3", "v4", "v5"):
+            (tmp_path / version).mkdir()
+            releases[version] = release_at(tmp_path / version)
+
+        publish_release(config, releases["v1"])
+        mark_failed(releases["v2"])
+        mark_failed(releases["v3"])
+        publish_release(config, releases["v4"])
+
+        # v5 is still being built
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["CURRENT", "v1", "v4", "v5"]
+
+
+class TestTenantPool:
+    """Test searching per-tenant knowledge bases, opened lazily into a bounded LRU pool"""
+
+    @staticmethod
+    def publish(tmp_path, tenant: str, version: str = "v1", kb_bytes: int = 0) -> None:
+        release_path = tmp_path / "tenants" / tenant / "releases" / version
+        (release_path / "sparse").mkdir(parents=True)
+        document = {"id": "sparse_001", "contents": f"{tenant} policy", "padding": "x" * kb_bytes}
+        (release_path / "knowledge_base.jsonl").write_text(json.dumps(document) + "\n")
+        (release_path.parent / "CURRENT").write_text(version)
+
+    def test_searches_the_tenants_knowledge_base(self, rag_service, tmp_path):
+        """Test that a tenant's search hits its own index and documents, others the default"""
+        self.publish(tmp_path, "acme")
+
+        assert [doc.contents for doc in rag_service.search("refunds", tenant="acme")] == [
+            "acme policy"
+        ]
+        assert [doc.contents for doc in rag_service.search("refunds")] == ["sparse_001"]
+        # Documents are tagged with their release, e.g to key the reranker's scores
+        assert rag_service.search("refunds", tenant="acme")[0].release == "v1"
+        assert rag_service.search("refunds")[0].release == "legacy"
+
+    @pytest.mark.parametrize("tenant", ["globex", "../releases"])
+    def test_unknown_tenant_gets_no_documents(self, rag_service, tenant):
+        """Test that a tenant without a published index gets nothing, not the default's"""
+        assert rag_service.search("refunds", tenant=tenant) == []
+        assert rag_service.open_tenants == []
+
+    def test_least_recently_searched_tenant_is_evicted(self, rag_service, tmp_path):
+        """Test that the pool stays within its size, closing the least recently used tenant"""
+        for tenant in ("acme", "globex", "initech"):
+            self.publish(tmp_path, tenant)
+        rag_service.search("refunds", tenant="acme")
+        rag_service.search("refunds", tenant="globex")
+        globex_searcher = rag_service._tenants["globex"].sparse_searcher
+
+        rag_service.search("refunds", tenant="acme")
+        rag_service.search("refunds", tenant="initech")
+
+        assert rag_service.open_tenants == ["acme", "initech"]
+        assert globex_searcher.closed
+
+    def test_memory_budget_evicts_tenants(self, rag_service, tmp_path):
+        """Test that tenants are evicted once the open ones exceed the memory budget"""
+        self.publish(tmp_path, "acme", kb_bytes=600_000)
+        self.publish(tmp_path, "globex", kb_bytes=600_000)
+
+        rag_service.search("refunds", tenant="acme")
+        rag_service.search("refunds", tenant="globex")
+
+        assert rag_service.open_tenants == ["globex"]
+
+    def test_evicted_tenant_closed_once_queries_drain(self, rag_service, tmp_path):
+        """Test that a query in flight on an evicted tenant keeps its searchers open until done"""
+        for tenant in ("acme", "globex", "initech"):
+            self.publish(tmp_path, tenant)
+        in_flight = rag_service._acquire("acme")
+
+        rag_service.search("refunds", tenant="globex")
+        rag_service.search("refunds", tenant="initech")
+
+        assert "acme" not in rag_service.open_tenants
+        assert not in_flight.sparse_searcher.closed
+        rag_service._release(in_flight)
+        assert in_flight.sparse_searcher.closed
+
+    def test_reload_evicts_tenants_with_a_new_release(self, rag_service, tmp_path):
+        """Test that a tenant's newly published release is opened on its next search"""
+        self.publish(tmp_path, "acme", "v1")
+        rag_service.search("refunds", tenant="acme")
+        self.publish(tmp_path, "acme", "v2")
+
+        assert rag_service.reload()
+
+        assert rag_service.open_tenants == []
+        rag_service.search("refunds", tenant="acme")
+        assert rag_service._tenants["acme"].release.version == "v2"
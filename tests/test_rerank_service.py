@@ -0,0 +1,138 @@
+import asyncio
+import sys
+import time
+from types import ModuleType
+from unittest.mock import patch
+
+import pytest
+
+from conversational_agent.services.metrics import get_metrics
+from conversational_agent.services.rag_service import Document
+from conversational_agent.services.rerank_service import RerankService
+
+
+class FakeCrossEncoder:
+    """Stands in for sentence-transformers' CrossEncoder, scoring documents by their length"""
+
+    delay_s = 0.0
+
+    def __init__(self, model_name: str, device: str) -> None:
+        self.batches: list[list[tuple[str, str]]] = []
+
+    def predict(self, pairs: list[tuple[str, str]], batch_size: int) -> list[float]:
+        time.sleep(self.delay_s)
+        self.batches.append(pairs)
+        return [float(len(contents)) for _, contents in pairs]
+
+
+class TestRerankService:
+    """Test the cross-encoder reranking stage"""
+
+    @pytest.fixture
+    def rerank_service(self, monkeypatch):
+        """Reranker keeping the top 2 documents within a 200ms budget, on a single thread"""
+        sentence_transformers = ModuleType("sentence_transformers")
+        sentence_transformers.CrossEncoder = FakeCrossEncoder  # type: ignore[attr-defined]
+        monkeypatch.setitem(sys.modules, "sentence_transformers", sentence_transformers)
+
+        with patch("conversational_agent.services.rerank_service.get_rag_config") as mock_config:
+            mock_config.return_value.rerank_candidates = 20
+            mock_config.return_value.rerank_top_k = 2
+            mock_config.return_value.rerank_budget_ms = 200
+            mock_config.return_value.rerank_cache_size = 100
+            mock_config.return_value.rerank_workers = 1
+            rerank_service = RerankService()
+        yield rerank_service
+        rerank_service.close()
+
+    @pytest.fixture
+    def docs(self):
+        """First-stage candidates, in BM25 order"""
+        return [
+            Document(id="a", contents="short", score=3.0),
+            Document(id="b", contents="the longest document", score=2.0),
+            Document(id="c", contents="medium doc", score=1.0),
+        ]
+
+    def test_rerank_orders_by_cross_encoder_score(self, rerank_service, docs):
+        """Test that the top-k documents by cross-encoder score are kept, in one batch"""
+        reranked = asyncio.run(rerank_service.rerank("query", docs))
+
+        assert [doc.id for doc in reranked] == ["b", "c"]
+        assert reranked[0].score == len("the longest document")
+        assert len(rerank_service._model.batches) == 1
+
+    def test_top_k_can_be_overridden(self, rerank_service, docs):
+        """Test that callers can keep more (or fewer) documents than `rerank_top_k`"""
+        assert [doc.id for doc in asyncio.run(rerank_service.rerank("q", docs, top_k=3))] == [
+            "b",
+            "c",
+            "a",
+        ]
+
+    def test_scores_are_cached_per_query_and_document(self, rerank_service, docs):
+        """Test that only unseen (query, document) pairs are scored"""
+        asyncio.run(rerank_service.rerank("query", docs[:2]))
+        asyncio.run(rerank_service.rerank("query", docs))
+
+        assert rerank_service._model.batches[1] == [("query", "medium doc")]
+
+    def test_scores_are_cached_per_tenant_and_release(self, rerank_service, docs):
+        """Test that the same ids of another tenant's, or index release's, documents are rescored"""
+        asyncio.run(rerank_service.rerank("query", docs))
+        asyncio.run(rerank_service.rerank("query", docs, tenant="acme"))
+        republished = [doc.model_copy(update={"release": "20261019T120000Z"}) for doc in docs]
+        asyncio.run(rerank_service.rerank("query", republished, tenant="acme"))
+        asyncio.run(rerank_service.rerank("query", republished, tenant="acme"))
+
+        assert [len(batch) for batch in rerank_service._model.batches] == [3, 3, 3]
+
+    def test_cleared_cache_rescores(self, rerank_service, docs):
+        """Test that clearing the cache (e.g on an index reload) drops the scores cached so far"""
+        asyncio.run(rerank_service.rerank("query", docs))
+        rerank_service.clear_cache()
+        asyncio.run(rerank_service.rerank("query", docs))
+
+        assert [len(batch) for batch in rerank_service._model.batches] == [3, 3]
+
+    def test_over_budget_falls_back_to_first_stage_order(self, rerank_service, docs):
+        """Test that the first-stage order is used when reranking exceeds its budget"""
+        rerank_service._model.delay_s = 0.5
+
+        reranked = asyncio.run(rerank_service.rerank("query", docs))
+
+        assert [doc.id for doc in reranked] == ["a", "b"]
+
+    def test_exact_rerank_has_no_budget(self, rerank_service, docs):
+        """Test that exact reranking waits for the scores, however long they take"""
+        rerank_service._model.delay_s = 0.3
+
+        assert [doc.id for doc in rerank_service.rerank_exact("query", docs, top_k=3)] == [
+            "b",
+            "c",
+            "a",
+        ]
+
+    def test_busy_reranker_is_skipped(self, rerank_service, docs):
+        """Test that reranks are skipped while timed-out ones still hold every rerank thread"""
+        rerank_service._model.delay_s = 0.5
+        fallbacks = get_metrics().value("rerank_fallbacks_total")
+
+        async def scenario():
+            timed_out = await rerank_service.rerank("query", docs)
+            skipped = await rerank_service.rerank("other query", docs)
+            return timed_out, skipped
+
+        timed_out, skipped = asyncio.run(scenario())
+
+        assert [doc.id for doc in timed_out] == [doc.id for doc in skipped] == ["a", "b"]
+        assert get_metrics().value("rerank_fallbacks_total") == fallbacks + 2
+        # The thread is freed once the timed-out scoring is done, the skipped query never scored
+        assert rerank_service._slots.acquire(timeout=5)
+        rerank_service._slots.release()
+        assert [query for (query, _), *_ in rerank_service._model.batches] == ["query"]
+        rerank_service._model.delay_s = 0.0
+        assert [doc.id for doc in asyncio.run(rerank_service.rerank("other query", docs))] == [
+            "b",
+            "c",
+        ]
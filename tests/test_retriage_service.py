@@ -0,0 +1,279 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+
+from conversational_agent.config.dependencies.container import get_container
+from conversational_agent.config.dependencies.database import get_session_maker
+from conversational_agent.config.dependencies.openai import ModelPricing
+from conversational_agent.data_models.db_models import (
+    CallType,
+    Conversation,
+    Customer,
+    Issue,
+    IssueStatus,
+    IssueType,
+    LLMUsage,
+    Role,
+    Turn,
+    UrgencyLevel,
+)
+from conversational_agent.data_models.ml_models import OpenAIAPIIssueFormat
+from conversational_agent.services.archive_service import ArchiveService
+from conversational_agent.services.retriage_service import (
+    DB_SOURCE,
+    Checkpoint,
+    RetriageService,
+    db_transcripts,
+    failed_transcripts_path,
+    jsonl_transcripts,
+)
+
+
+def extraction(conversation_id, turns, max_attempts) -> tuple[OpenAIAPIIssueFormat, list[LLMUsage]]:
+    """Fake LLM extraction: a billing issue described by the customer's last message"""
+    model = OpenAIAPIIssueFormat(
+        description=[turn.text for turn in turns if turn.role == Role.USER][-1],
+        issue_type=IssueType.BILLING,
+        urgency=UrgencyLevel.HIGH,
+        create_issue=True,
+        assistant_reply="",
+    )
+    usage = LLMUsage(
+        conversation_id=conversation_id,
+        call_type=CallType.RETRIAGE,
+        model="gpt-5-nano",
+        prompt_tokens=1000,
+        completion_tokens=100,
+    )
+    return model, [usage]
+
+
+class TestRetriageService:
+    """Test re-triaging historical conversations (on a SQLite DB)"""
+
+    @pytest.fixture
+    def session_maker(self, tmp_path):
+        # A file rather than in memory: the source and the writer use concurrent connections
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'agent.db'}")
+
+        async def create_tables() -> None:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+
+        asyncio.run(create_tables())
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        with get_container().override(get_session_maker, session_maker):
+            yield session_maker
+        asyncio.run(engine.dispose())
+
+    @pytest.fixture(autouse=True)
+    def pricing(self):
+        with patch("conversational_agent.services.usage_service.get_openai_api_config") as config:
+            config.return_value.pricing = {
+                "gpt-5-nano": ModelPricing(prompt=0.05, cached_prompt=0.005, completion=0.40)
+            }
+            yield
+
+    @pytest.fixture
+    def llm_service(self):
+        llm_service = Mock()
+        llm_service.retriage = AsyncMock(side_effect=extraction)
+        return llm_service
+
+    @staticmethod
+    async def add_conversation(
+        session, message: str | None, issue: Issue | None = None
+    ) -> Conversation:
+        customer = Customer(name="Jane", email=f"{message}@example.com")
+        conversation = Conversation(customer=customer, issue=issue)
+        created_at = datetime.now(timezone.utc) - timedelta(days=60)
+        conversation.turns = [Turn(role=Role.SYSTEM, text="old prompt", created_at=created_at)]
+        if message is not None:
+            conversation.turns.append(Turn(role=Role.USER, text=message, created_at=created_at))
+        if issue is not None:
+            issue.customer = customer
+        session.add(conversation)
+        await session.commit()
+        return conversation
+
+    def run(self, llm_service, tmp_path, checkpoint=None, **kwargs):
+        checkpoint = checkpoint or Checkpoint(source=DB_SOURCE)
+        kwargs = {"concurrency": 2, "batch_size": 2} | kwargs
+        return asyncio.run(
+            RetriageService(llm_service).run(
+                db_transcripts(checkpoint.cursor, page_size=2),
+                checkpoint,
+                tmp_path / "checkpoint.json",
+                **kwargs,
+            )
+        )
+
+    def test_backfills_issues(self, session_maker, llm_service, tmp_path):
+        """Test that issues are updated (archived transcripts included) or created as extracted"""
+
+        async def setup():
+            async with session_maker() as session:
+                archived = await self.add_conversation(
+                    session,
+                    "I was charged twice",
+                    Issue(description="Something", status=IssueStatus.RESOLVED),
+                )
+                await ArchiveService().archive_batch(
+                    session, datetime.now(timezone.utc), batch_size=10
+                )
+                new = await self.add_conversation(session, "Refund my card")
+                await self.add_conversation(session, None)
+                return archived.issue_id, new.id
+
+        archived_issue_id, new_conversation_id = asyncio.run(setup())
+
+        stats = self.run(llm_service, tmp_path)
+
+        async def results():
+            async with session_maker() as session:
+                issues = {
+                    issue.description: issue
+                    for issue in (await session.execute(select(Issue))).scalars()
+                }
+                new = await session.get(Conversation, new_conversation_id)
+                usages = (await session.execute(select(LLMUsage.call_type))).scalars().all()
+                return issues, new.issue_id, usages
+
+        issues, new_issue_id, usages = asyncio.run(results())
+        updated = issues["I was charged twice"]
+        assert updated.id == archived_issue_id
+        assert updated.issue_type == IssueType.BILLING
+        # Workflow state is left to the support team
+        assert updated.status == IssueStatus.RESOLVED
+        assert issues["Refund my card"].id == new_issue_id
+        assert (stats.updated, stats.created, stats.skipped, stats.failed) == (1, 1, 1, 0)
+        assert usages == [CallType.RETRIAGE, CallType.RETRIAGE]
+        assert stats.prompt_tokens == 2000
+        assert stats.estimated_cost_usd == pytest.approx(2 * (1000 * 0.05 + 100 * 0.40) / 1e6)
+
+    def test_resumes_from_checkpoint(self, session_maker, llm_service, tmp_path):
+        """Test that a restarted run only re-triages the conversations not yet written back"""
+
+        async def setup():
+            async with session_maker() as session:
+                for n in range(5):
+                    await self.add_conversation(session, f"Message {n}")
+
+        asyncio.run(setup())
+        self.run(llm_service, tmp_path, batch_size=1, concurrency=1, limit=3)
+
+        checkpoint = Checkpoint.load(tmp_path / "checkpoint.json", DB_SOURCE)
+        stats = self.run(llm_service, tmp_path, checkpoint, batch_size=1, concurrency=1)
+
+        assert llm_service.retriage.await_count == 5
+        assert stats.created == 5
+
+    def test_checkpoint_waits_for_earlier_transcripts(self, session_maker, llm_service, tmp_path):
+        """Test that the checkpoint never moves past a transcript still being re-triaged"""
+        saved_cursors = []
+
+        async def scenario():
+            async with session_maker() as session:
+                for n in range(2):
+                    await self.add_conversation(session, f"Message {n}")
+            first_done, saved = asyncio.Event(), asyncio.Event()
+
+            async def slow_first(conversation_id, turns, max_attempts):
+                if llm_service.retriage.await_count == 1:
+                    await first_done.wait()
+                return extraction(conversation_id, turns, max_attempts)
+
+            def save(checkpoint, path):
+                saved_cursors.append(checkpoint.cursor)
+                saved.set()
+
+            llm_service.retriage.side_effect = slow_first
+            with patch.object(Checkpoint, "save", autospec=True, side_effect=save):
+                run = asyncio.create_task(
+                    RetriageService(llm_service).run(
+                        db_transcripts(None, page_size=10),
+                        Checkpoint(source=DB_SOURCE),
+                        tmp_path / "checkpoint.json",
+                        concurrency=2,
+                        batch_size=1,
+                    )
+                )
+                # The second transcript is written back while the first is still pending
+                await saved.wait()
+                first_done.set()
+                await run
+
+        asyncio.run(scenario())
+
+        assert saved_cursors[0] is None
+        assert saved_cursors[-1] is not None
+
+    def test_failed_transcripts_are_saved_for_a_retry(self, session_maker, llm_service, tmp_path):
+        """Test that a failed extraction is saved (not lost past the checkpoint) and retried"""
+
+        async def setup():
+            async with session_maker() as session:
+                for n in range(3):
+                    await self.add_conversation(session, f"Message {n}")
+
+        def failing(conversation_id, turns, max_attempts):
+            if turns[-1].text == "Message 1":
+                raise RuntimeError("Provider down")
+            return extraction(conversation_id, turns, max_attempts)
+
+        asyncio.run(setup())
+        llm_service.retriage.side_effect = failing
+        stats = self.run(llm_service, tmp_path, batch_size=1, concurrency=1)
+        failed_path = failed_transcripts_path(tmp_path / "checkpoint.json")
+
+        async def read():
+            return [transcript async for transcript in jsonl_transcripts(failed_path, None)]
+
+        retried = asyncio.run(read())
+
+        llm_service.retriage.side_effect = extraction
+        retry = asyncio.run(
+            RetriageService(llm_service).run(
+                jsonl_transcripts(failed_path, None),
+                Checkpoint(source=str(failed_path)),
+                tmp_path / "retry.json",
+                concurrency=1,
+                batch_size=1,
+            )
+        )
+
+        assert (stats.created, stats.failed) == (2, 1)
+        assert Checkpoint.load(tmp_path / "checkpoint.json", DB_SOURCE).cursor is not None
+        assert [transcript.turns[-1].text for transcript in retried] == ["Message 1"]
+        assert (retry.created, retry.failed) == (1, 0)
+
+    def test_jsonl_source_resumes_at_byte_offset(self, tmp_path):
+        """Test that JSONL transcripts are streamed from where a previous run stopped"""
+        path = tmp_path / "transcripts.jsonl"
+        with open(path, "w") as f:
+            for n in range(3):
+                record = {
+                    "conversation_id": f"00000000-0000-0000-0000-00000000000{n}",
+                    "turns": [{"role": "user", "text": f"Message {n}"}],
+                }
+                f.write(json.dumps(record) + "\n")
+
+        async def read(after):
+            return [transcript async for transcript in jsonl_transcripts(path, after)]
+
+        first, *_ = asyncio.run(read(None))
+        rest = asyncio.run(read(first.cursor))
+
+        assert [transcript.turns[0].text for transcript in rest] == ["Message 1", "Message 2"]
+
+    def test_checkpoint_of_another_source_is_refused(self, tmp_path):
+        """Test that a run can't resume from the checkpoint of a run over another source"""
+        Checkpoint(source="export.jsonl", cursor="42").save(tmp_path / "checkpoint.json")
+
+        with pytest.raises(ValueError, match="export.jsonl"):
+            Checkpoint.load(tmp_path / "checkpoint.json", DB_SOURCE)
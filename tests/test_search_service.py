@@ -0,0 +1,238 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, delete
+
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    Customer,
+    Issue,
+    IssueStatus,
+    IssueType,
+    Role,
+    Turn,
+)
+from conversational_agent.data_models.search_index import create_search_indexes
+from conversational_agent.services.archive_service import ArchiveService
+from conversational_agent.services.pagination import decode_cursor, encode_cursor
+from conversational_agent.services.search_service import SearchService
+
+
+class TestSearchService:
+    """Test ranked full-text search over issues and transcripts (on an in-memory SQLite DB)"""
+
+    @pytest.fixture
+    def engine(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+        async def create_tables() -> None:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+                await conn.run_sync(create_search_indexes)
+
+        asyncio.run(create_tables())
+        yield engine
+        asyncio.run(engine.dispose())
+
+    @pytest.fixture
+    def session_maker(self, engine):
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+    @staticmethod
+    async def add_issues(session, *descriptions: str, transcript: str = "Hi") -> list[Issue]:
+        customer = Customer(name="Jane", email=f"{uuid4()}@example.com")
+        issues = []
+        for description in descriptions:
+            issue = Issue(description=description, issue_type=IssueType.DELIVERY, customer=customer)
+            conversation = Conversation(customer=customer, issue=issue)
+            conversation.turns = [
+                Turn(role=Role.SYSTEM, text="You help with parcels"),
+                Turn(role=Role.USER, text=transcript),
+            ]
+            session.add(conversation)
+            issues.append(issue)
+        await session.commit()
+        return issues
+
+    @staticmethod
+    async def search_all(session, query: str, limit: int, **filters) -> list[list[UUID]]:
+        pages, cursor = [], None
+        while True:
+            page = await SearchService().search_issues(
+                session, query, limit=limit, cursor=cursor, **filters
+            )
+            pages.append([hit.issue_id for hit in page.items])
+            if (cursor := page.next_cursor) is None:
+                return pages
+
+    def test_best_matches_rank_first(self, session_maker):
+        """Test that issues match through their description or transcript, best first"""
+
+        async def scenario():
+            async with session_maker() as session:
+                parcel, *_ = await self.add_issues(
+                    session, "Parcel lost, parcel never arrived", "Broken keyboard", "Wrong size"
+                )
+                await self.add_issues(session, "Refund", transcript="My card was charged twice")
+                hits = (await SearchService().search_issues(session, "parcel")).items
+                by_transcript = (await SearchService().search_issues(session, "charged")).items
+                return [hit.issue_id for hit in hits], parcel.id, by_transcript
+
+        hits, parcel_id, by_transcript = asyncio.run(scenario())
+
+        assert hits == [parcel_id]
+        assert [hit.snippet for hit in by_transcript] == ["My card was charged twice"]
+
+    def test_pages_cover_ties_exactly_once(self, session_maker):
+        """Test that paging through more equally ranked issues than a page returns each once"""
+
+        async def scenario():
+            async with session_maker() as session:
+                issues = await self.add_issues(session, *["Parcel never arrived"] * 5)
+                return await self.search_all(session, "parcel", limit=2), issues
+
+        pages, issues = asyncio.run(scenario())
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert sorted(issue_id for page in pages for issue_id in page) == sorted(
+            issue.id for issue in issues
+        )
+
+    def test_archived_transcripts_are_searched(self, session_maker):
+        """Test that a conversation still matches by its transcript once archived"""
+
+        async def scenario():
+            async with session_maker() as session:
+                resolved, _ = await self.add_issues(
+                    session,
+                    "Refund",
+                    "Other refund",
+                    transcript="My card was charged twice\nfor one keyboard",
+                )
+                resolved.status = IssueStatus.RESOLVED
+                await session.commit()
+                archived = await ArchiveService().archive_batch(
+                    session, datetime.now(timezone.utc) + timedelta(days=1), batch_size=10
+                )
+                hits = (await SearchService().search_issues(session, "keyboard")).items
+                prompts = (await SearchService().search_issues(session, "parcels")).items
+                return archived, hits, prompts, resolved.id
+
+        archived, hits, prompts, resolved_id = asyncio.run(scenario())
+
+        assert archived == 1
+        assert len(hits) == 2
+        archived_hit = next(hit for hit in hits if hit.issue_id == resolved_id)
+        # The matching archived turn
+        assert archived_hit.snippet == "for one keyboard"
+        # System prompts are not searchable, archived or not
+        assert prompts == []
+
+    def test_index_follows_updates_deletes_and_renumbering(self, session_maker):
+        """Test that the index stays in sync with its table, even once its rowids are renumbered"""
+
+        async def scenario():
+            async with session_maker() as session:
+                first, second, third = await self.add_issues(
+                    session, "Parcel lost", "Parcel late", "Parcel damaged"
+                )
+                await session.execute(delete(Turn))
+                await session.execute(delete(Conversation))
+                await session.delete(first)
+                second.description = "Keyboard broken"
+                await session.commit()
+                # As VACUUM may do to tables without an INTEGER PRIMARY KEY
+                await session.execute(text("UPDATE issue SET rowid = rowid + 1000"))
+                await session.commit()
+                parcels = await self.search_all(session, "parcel", limit=10)
+                keyboards = await self.search_all(session, "keyboard", limit=10)
+                return parcels, keyboards, second.id, third.id
+
+        parcels, keyboards, second_id, third_id = asyncio.run(scenario())
+
+        assert parcels == [[third_id]]
+        assert keyboards == [[second_id]]
+
+    def test_legacy_rowid_index_is_rebuilt(self, engine, session_maker):
+        """Test that an index keyed on the implicit rowid (as first created) is replaced"""
+
+        async def scenario():
+            async with engine.begin() as conn:
+                for table, column in (("issue", "description"), ("turn", "text")):
+                    for event in ("ai", "ad", "au"):
+                        await conn.execute(text(f"DROP TRIGGER {table}_fts_{event}"))
+                    await conn.execute(text(f"DROP TABLE {table}_fts_key"))
+                    await conn.execute(text(f"DROP TABLE {table}_fts"))
+                    await conn.execute(
+                        text(
+                            f"CREATE VIRTUAL TABLE {table}_fts USING fts5({column}, "
+                            f"content='{table}', content_rowid='rowid')"
+                        )
+                    )
+            async with session_maker() as session:
+                await self.add_issues(session, "Parcel lost")
+            async with engine.begin() as conn:
+                await conn.run_sync(create_search_indexes)
+            async with session_maker() as session:
+                return await self.search_all(session, "parcel", limit=10)
+
+        assert len(asyncio.run(scenario())[0]) == 1
+
+    def test_postgres_ranks_are_doubles(self):
+        """Test that PostgreSQL ranks (real) are compared to cursors as double precision"""
+        stmt = SearchService()._postgres_matches("parcel")
+
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert sql.count("CAST(ts_rank(") == 3
+        assert "AS FLOAT(53))" in sql
+
+
+class TestPagination:
+    """Test the opaque keyset pagination cursors"""
+
+    def test_cursor_round_trips(self):
+        """Test that a cursor decodes back into the sort key it was encoded from"""
+        assert decode_cursor(encode_cursor(0.125, "abc"), float, str) == [0.125, "abc"]
+
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            "not-base64!",
+            encode_cursor(1.0),
+            encode_cursor("high", uuid4()),
+            encode_cursor(1.0, "not-a-uuid"),
+            encode_cursor(1.0, 42),
+            encode_cursor(None, uuid4()),
+        ],
+    )
+    def test_invalid_cursor_is_rejected(self, cursor):
+        """Test that tampered cursors (or of another listing) are a client error"""
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(cursor, float, UUID)
+
+        assert exc_info.value.status_code == 400
+
+    def test_search_with_invalid_cursor_is_rejected(self):
+        """Test that a well-formed cursor with a malformed sort key is a 400, not a 500"""
+
+        async def scenario():
+            engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+            try:
+                async with async_sessionmaker(engine)() as session:
+                    await SearchService().search_issues(
+                        session, "parcel", cursor=encode_cursor(1.0, "not-a-uuid")
+                    )
+            finally:
+                await engine.dispose()
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(scenario())
+
+        assert exc_info.value.status_code == 400
@@ -0,0 +1,151 @@
+import asyncio
+import random
+import statistics
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from frontend.simulator import (
+    SAMPLE_CONVOS_PATH,
+    EndpointStats,
+    SimulationPlan,
+    Simulator,
+    ThinkTime,
+    load_sample_convos,
+)
+
+
+class TestThinkTime:
+    """Test sampling the pause customers take before each turn"""
+
+    @pytest.mark.parametrize("distribution", ["constant", "uniform", "exponential", "lognormal"])
+    def test_samples_average_to_the_mean(self, distribution):
+        """Test that each distribution is parametrized to average `mean_s`, never negative"""
+        think_time = ThinkTime(distribution=distribution, mean_s=3.0, spread=0.5)
+        rng = random.Random(0)
+
+        samples = [think_time.sample(rng) for _ in range(20_000)]
+
+        assert min(samples) >= 0
+        assert statistics.fmean(samples) == pytest.approx(3.0, rel=0.05)
+
+    def test_uniform_is_clipped_at_zero(self):
+        """Test that a spread wider than the mean doesn't make negative pauses"""
+        think_time = ThinkTime(distribution="uniform", mean_s=0.5, spread=2.0)
+        rng = random.Random(0)
+
+        assert min(think_time.sample(rng) for _ in range(1_000)) == 0.0
+
+    @pytest.mark.parametrize("distribution", ["constant", "uniform", "exponential"])
+    def test_zero_mean(self, distribution):
+        """Test that a zero mean means no pauses"""
+        think_time = ThinkTime(distribution=distribution, mean_s=0.0, spread=0.0)
+
+        assert think_time.sample(random.Random(0)) == 0.0
+
+
+class TestLoadSampleConvos:
+    """Test making conversation scripts of the customer turns of sample conversations"""
+
+    def test_customer_turns_are_scripted(self, tmp_path):
+        """Test that each example with customer turns makes a script, agent turns dropped"""
+        path = tmp_path / "SAMPLE_CONVOS.md"
+        path.write_text(
+            "# Samples\n\n"
+            "### EXAMPLE 1: Refund\n\n"
+            "😁 You: I'd like a refund\n"
+            "🤖 Agent: Sure, what's your order number?\n"
+            "😁 You: It's 12345\n\n"
+            "### EXAMPLE 2: Empty\n\n"
+            "🤖 Agent: Hello?\n",
+            encoding="utf-8",
+        )
+
+        scripts = load_sample_convos(path)
+
+        assert [(script.name, script.turns) for script in scripts] == [
+            ("EXAMPLE 1: Refund", ["I'd like a refund", "It's 12345"])
+        ]
+
+    def test_shipped_samples_load(self):
+        """Test that the repo's SAMPLE_CONVOS.md (the default scripts) makes scripts"""
+        scripts = load_sample_convos(SAMPLE_CONVOS_PATH)
+
+        assert scripts
+        assert all(script.turns for script in scripts)
+
+
+class TestEndpointStats:
+    """Test reporting throughput and latency percentiles per endpoint"""
+
+    def test_report(self):
+        """Test that percentiles are nearest-rank over successes, failures reported apart"""
+        stats = EndpointStats()
+        for latency_ms in range(1, 101):
+            stats.record("chat", float(latency_ms))
+        stats.record("chat", 5_000.0, error="TimeoutError")
+        stats.record("log_in", 30.0, error="502")
+        stats.record("log_in", 10.0, error="502")
+
+        rows = {row["endpoint"]: row for row in stats.report(elapsed_s=10.0)}
+
+        assert list(rows) == ["chat", "log_in"]
+        assert rows["chat"] == {
+            "endpoint": "chat",
+            "ok": 100,
+            "errors": {"TimeoutError": 1},
+            "throughput_rps": 10.0,
+            "p50_ms": 50.0,
+            "p90_ms": 90.0,
+            "p95_ms": 95.0,
+            "p99_ms": 99.0,
+            "max_ms": 100.0,
+            "error_p50_ms": 5_000.0,
+        }
+        assert (rows["log_in"]["ok"], rows["log_in"]["p50_ms"]) == (0, None)
+        assert rows["log_in"]["errors"] == {"502": 2}
+        assert rows["log_in"]["error_p50_ms"] == 10.0
+
+
+class TestSimulatorCall:
+    """Test calling the API (a local aiohttp server) and recording the outcome"""
+
+    @staticmethod
+    async def slow_bad_gateway(request: web.Request) -> web.Response:
+        await asyncio.sleep(0.05)
+        return web.Response(status=502, text="<html>Bad Gateway</html>", content_type="text/html")
+
+    @staticmethod
+    async def log_in(request: web.Request) -> web.Response:
+        return web.json_response({"id": "abc"})
+
+    def call(self, path: str) -> tuple[object, EndpointStats]:
+        async def scenario():
+            app = web.Application()
+            app.router.add_post("/agent/log_in", self.log_in)
+            app.router.add_post("/agent/chat/1", self.slow_bad_gateway)
+            async with TestServer(app) as server, aiohttp.ClientSession() as http:
+                simulator = Simulator(
+                    str(server.make_url("/agent")), SimulationPlan(scripts=[]), 1, 0.0
+                )
+                body = await simulator._call(http, "endpoint", path, {})
+                return body, simulator.stats
+
+        return asyncio.run(scenario())
+
+    def test_success(self):
+        """Test that the JSON body of successful calls is returned, their latency recorded"""
+        body, stats = self.call("/log_in")
+
+        assert body == {"id": "abc"}
+        assert len(stats.latencies_ms["endpoint"]) == 1
+
+    def test_error_status_with_non_json_body(self):
+        """Test that an error status is recorded as such (with its latency), whatever the body"""
+        body, stats = self.call("/chat/1")
+
+        assert body is None
+        assert stats.errors["endpoint"] == {"502": 1}
+        assert stats.error_latencies_ms["endpoint"][0] >= 50
@@ -0,0 +1,233 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from conversational_agent.data_models.db_models import (
+    Conversation,
+    Customer,
+    Issue,
+    IssueStatus,
+    UrgencyLevel,
+)
+from conversational_agent.services.pagination import encode_cursor
+from conversational_agent.services.support_service import SupportService
+
+REVIEW = IssueStatus.REQUIRES_MANUAL_REVIEW
+
+
+class TestSupportService:
+    """Test the support listings and manual review work queue (on an in-memory SQLite DB)"""
+
+    @pytest.fixture
+    def session_maker(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+        async def create_tables() -> None:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+
+        asyncio.run(create_tables())
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        asyncio.run(engine.dispose())
+
+    @staticmethod
+    def customer() -> Customer:
+        return Customer(name="Jane", email=f"{uuid4()}@example.com")
+
+    @staticmethod
+    async def page_through(list_page, limit: int) -> list[list]:
+        pages, cursor = [], None
+        while True:
+            page = await list_page(limit=limit, cursor=cursor)
+            pages.append(page.items)
+            if (cursor := page.next_cursor) is None:
+                return pages
+
+    def test_conversation_pages_cover_every_row_once(self, session_maker):
+        """Test that paging a customer's conversations (with tied dates) returns each once"""
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        # Pairs of conversations created at the same time, across page boundaries
+        created_ats = [start + timedelta(hours=n // 2) for n in range(7)]
+
+        async def scenario():
+            async with session_maker() as session:
+                customer, other = self.customer(), self.customer()
+                conversations = [
+                    Conversation(customer=customer, created_at=created_at)
+                    for created_at in created_ats
+                ]
+                session.add_all([*conversations, Conversation(customer=other)])
+                await session.commit()
+                pages = await self.page_through(
+                    lambda **page: SupportService().list_conversations(
+                        session, customer.id, **page
+                    ),
+                    limit=2,
+                )
+                return pages, conversations
+
+        pages, conversations = asyncio.run(scenario())
+
+        assert [len(page) for page in pages] == [2, 2, 2, 1]
+        listed = [item.conversation_id for page in pages for item in page]
+        assert sorted(listed) == sorted(conversation.id for conversation in conversations)
+        # Newest first
+        newest_first = sorted(conversations, key=lambda c: (c.created_at, c.id), reverse=True)
+        assert listed == [conversation.id for conversation in newest_first]
+
+    def test_issue_pages_cover_every_row_once(self, session_maker):
+        """Test that paging issues of a status (and urgency) returns each once, oldest first"""
+        created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+        async def scenario():
+            async with session_maker() as session:
+                customer = self.customer()
+                high = [
+                    Issue(
+                        description=f"Issue {n}",
+                        status=REVIEW,
+                        urgency=UrgencyLevel.HIGH,
+                        created_at=created_at + timedelta(minutes=n // 3),
+                        customer=customer,
+                    )
+                    for n in range(5)
+                ]
+                others = [
+                    Issue(description="Low", status=REVIEW, urgency=UrgencyLevel.LOW),
+                    Issue(description="Done", status=IssueStatus.RESOLVED),
+                ]
+                for issue in others:
+                    issue.customer = customer
+                session.add_all(high + others)
+                await session.commit()
+                service = SupportService()
+                by_urgency = await self.page_through(
+                    lambda **page: service.list_issues(
+                        session, REVIEW, urgency=UrgencyLevel.HIGH, **page
+                    ),
+                    limit=2,
+                )
+                by_status = await self.page_through(
+                    lambda **page: service.list_issues(session, REVIEW, **page), limit=4
+                )
+                return by_urgency, by_status, high
+
+        by_urgency, by_status, high = asyncio.run(scenario())
+
+        oldest_first = [issue.id for issue in sorted(high, key=lambda i: (i.created_at, i.id))]
+        assert [[item.issue_id for item in page] for page in by_urgency] == [
+            oldest_first[:2],
+            oldest_first[2:4],
+            oldest_first[4:],
+        ]
+        assert [len(page) for page in by_status] == [4, 2]
+
+    def test_claims_follow_priority_order(self, session_maker):
+        """Test that agents claim the most urgent, then oldest, issues each once"""
+        created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        specs = [
+            ("Low", UrgencyLevel.LOW, 0),
+            ("Old medium", UrgencyLevel.MEDIUM, 0),
+            ("New high", UrgencyLevel.HIGH, 2),
+            ("New medium", UrgencyLevel.MEDIUM, 1),
+            ("Old high", UrgencyLevel.HIGH, 1),
+        ]
+
+        async def scenario():
+            async with session_maker() as session:
+                customer = self.customer()
+                session.add_all(
+                    Issue(
+                        description=description,
+                        status=REVIEW,
+                        urgency=urgency,
+                        created_at=created_at + timedelta(hours=age),
+                        customer=customer,
+                    )
+                    for description, urgency, age in specs
+                )
+                session.add(Issue(description="Resolved", customer=customer))
+                await session.commit()
+                claims = []
+                for n in range(len(specs) + 1):
+                    claims.append(await SupportService().claim_next_issue(session, f"agent{n}"))
+                    await session.commit()
+                return claims
+
+        *claims, none_left = asyncio.run(scenario())
+
+        assert [claim.description for claim in claims] == [
+            "Old high",
+            "New high",
+            "Old medium",
+            "New medium",
+            "Low",
+        ]
+        assert [claim.claimed_by for claim in claims] == [f"agent{n}" for n in range(5)]
+        assert none_left is None
+
+    def test_expired_claims_are_reclaimable(self, session_maker):
+        """Test that an issue claimed longer ago than the lease goes back into the queue"""
+        now = datetime.now(timezone.utc)
+
+        async def scenario():
+            async with session_maker() as session:
+                customer = self.customer()
+                abandoned = Issue(
+                    description="Abandoned",
+                    status=REVIEW,
+                    urgency=UrgencyLevel.LOW,
+                    claimed_by="agent0",
+                    claimed_at=now - SupportService._claim_lease - timedelta(minutes=1),
+                    customer=customer,
+                )
+                in_progress = Issue(
+                    description="In progress",
+                    status=REVIEW,
+                    urgency=UrgencyLevel.HIGH,
+                    claimed_by="agent1",
+                    claimed_at=now - timedelta(minutes=1),
+                    customer=customer,
+                )
+                session.add_all([abandoned, in_progress])
+                await session.commit()
+                first = await SupportService().claim_next_issue(session, "agent2")
+                second = await SupportService().claim_next_issue(session, "agent3")
+                return first, second
+
+        first, second = asyncio.run(scenario())
+
+        assert (first.description, first.claimed_by) == ("Abandoned", "agent2")
+        assert second is None
+
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            encode_cursor("yesterday", uuid4()),
+            encode_cursor(datetime(2025, 1, 1), uuid4()),  # No timezone
+            encode_cursor(datetime(2025, 1, 1, tzinfo=timezone.utc), "not-a-uuid"),
+            encode_cursor(123, None),
+        ],
+    )
+    def test_invalid_cursor_values_are_rejected(self, session_maker, cursor):
+        """Test that well-formed cursors with malformed sort key values are a 400, not a 500"""
+
+        async def scenario() -> list[int]:
+            statuses = []
+            async with session_maker() as session:
+                service = SupportService()
+                for list_page in (
+                    lambda: service.list_conversations(session, uuid4(), cursor=cursor),
+                    lambda: service.list_issues(session, REVIEW, cursor=cursor),
+                ):
+                    with pytest.raises(HTTPException) as exc_info:
+                        await list_page()
+                    statuses.append(exc_info.value.status_code)
+            return statuses
+
+        assert asyncio.run(scenario()) == [400, 400]
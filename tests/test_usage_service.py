@@ -0,0 +1,222 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+import pytest
+from openai.types import CompletionUsage
+from openai.types.completion_usage import PromptTokensDetails
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from conversational_agent.config.dependencies.openai import ModelPricing
+from conversational_agent.data_models.api_models import UsageGroupBy
+from conversational_agent.data_models.db_models import (
+    CallType,
+    Conversation,
+    Customer,
+    Issue,
+    IssueType,
+    LLMUsage,
+    Role,
+    Turn,
+)
+from conversational_agent.data_models.ml_models import OpenAIAPIIssueFormat
+from conversational_agent.services.llm_service import LLMService
+from conversational_agent.services.usage_service import UsageService, estimate_cost_usd
+
+PRICING = {
+    "cheap": ModelPricing(prompt=1.0, cached_prompt=0.1, completion=2.0),
+    "strong": ModelPricing(prompt=10.0, cached_prompt=1.0, completion=20.0),
+}
+# Estimated costs of the usage records reported on below
+CHEAP_COST = (600 * 1.0 + 400 * 0.1 + 100 * 2.0) / 1_000_000
+STRONG_COST = (500 * 10.0 + 50 * 20.0) / 1_000_000
+
+
+def completion_usage(prompt: int, completion: int, cached: int | None = None) -> CompletionUsage:
+    return CompletionUsage(
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        total_tokens=prompt + completion,
+        prompt_tokens_details=PromptTokensDetails(cached_tokens=cached),
+    )
+
+
+class TestTokenAccounting:
+    """Test recording the tokens reported by the API for each call"""
+
+    def test_response_usage_is_accumulated(self):
+        """Test that each response's tokens (cached ones included) are added to the record"""
+        usage = LLMUsage(call_type=CallType.TRIAGE, model="cheap", conversation_id=uuid4())
+
+        LLMService._add_response_usage(usage, Mock(usage=completion_usage(100, 10, cached=40)))
+        LLMService._add_response_usage(usage, Mock(usage=completion_usage(120, 5)))
+        LLMService._add_response_usage(usage, Mock(usage=None))
+
+        assert (usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens) == (220, 15, 40)
+
+    def test_retries_are_summed(self):
+        """Test that the tokens of every attempt of a call are recorded, not just the last's"""
+        parsed = OpenAIAPIIssueFormat(description="Charged twice", assistant_reply="")
+        client = Mock()
+        client.chat.completions.parse = AsyncMock(
+            side_effect=[
+                Mock(usage=completion_usage(100, 10), choices=[Mock(message=Mock(parsed=None))]),
+                Mock(usage=completion_usage(100, 10), choices=[Mock(message=Mock(parsed=None))]),
+                Mock(
+                    usage=completion_usage(100, 20, cached=80),
+                    choices=[Mock(message=Mock(parsed=parsed))],
+                ),
+            ]
+        )
+        turns = [Turn(role=Role.USER, text="I was charged twice", conversation_id=uuid4())]
+
+        _, usages = asyncio.run(LLMService(client).retriage(uuid4(), turns, max_attempts=3))
+
+        assert sum(usage.retries for usage in usages) == 2
+        assert sum(usage.prompt_tokens for usage in usages) == 300
+        assert sum(usage.completion_tokens for usage in usages) == 40
+        assert sum(usage.cached_tokens for usage in usages) == 80
+
+    def test_cached_tokens_are_priced_at_the_cached_rate(self):
+        """Test that cached prompt tokens are priced at their (lower) rate, not twice"""
+        cost = estimate_cost_usd("cheap", 1_000, 400, 100, PRICING)
+
+        assert cost == pytest.approx(CHEAP_COST)
+        assert estimate_cost_usd("unpriced", 1_000, 0, 100, PRICING) is None
+
+
+class TestUsageReport:
+    """Test aggregating recorded usage (on an in-memory SQLite DB)"""
+
+    @pytest.fixture
+    def session_maker(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+        async def create_tables() -> None:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+
+        asyncio.run(create_tables())
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        asyncio.run(engine.dispose())
+
+    @pytest.fixture(autouse=True)
+    def pricing(self):
+        config = Mock(pricing=PRICING)
+        with patch(
+            "conversational_agent.services.usage_service.get_openai_api_config",
+            return_value=config,
+        ):
+            yield
+
+    @pytest.fixture
+    def report(self, session_maker):
+        """Report usage of a triaged conversation (two models) and an untriaged one"""
+
+        async def seed() -> None:
+            async with session_maker() as session:
+                customer = Customer(name="Jane", email="jane@example.com")
+                issue = Issue(description="Lost parcel", issue_type=IssueType.DELIVERY)
+                issue.customer = customer
+                triaged = Conversation(customer=customer, issue=issue)
+                untriaged = Conversation(customer=customer)
+                first_day = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+                second_day = datetime(2025, 1, 2, 12, tzinfo=timezone.utc)
+                session.add_all(
+                    [
+                        LLMUsage(
+                            conversation=triaged,
+                            call_type=CallType.TRIAGE,
+                            model="cheap",
+                            prompt_tokens=1_000,
+                            cached_tokens=400,
+                            completion_tokens=100,
+                            retries=1,
+                            latency_ms=100.0,
+                            rag_enabled=True,
+                            created_at=first_day,
+                        ),
+                        LLMUsage(
+                            conversation=triaged,
+                            call_type=CallType.TRIAGE,
+                            model="strong",
+                            prompt_tokens=500,
+                            completion_tokens=50,
+                            latency_ms=300.0,
+                            rag_enabled=True,
+                            created_at=first_day,
+                        ),
+                        LLMUsage(
+                            conversation=untriaged,
+                            call_type=CallType.SUMMARY,
+                            model="unpriced",
+                            prompt_tokens=200,
+                            completion_tokens=20,
+                            latency_ms=200.0,
+                            created_at=second_day,
+                        ),
+                    ]
+                )
+                await session.commit()
+
+        asyncio.run(seed())
+
+        def report(group_by: UsageGroupBy, **filters) -> dict[str, tuple]:
+            async def run():
+                async with session_maker() as session:
+                    return await UsageService().report(session, group_by, **filters)
+
+            return {
+                row.group: (
+                    row.calls,
+                    row.prompt_tokens,
+                    row.retries,
+                    row.avg_latency_ms,
+                    row.estimated_cost_usd,
+                )
+                for row in asyncio.run(run())
+            }
+
+        return report
+
+    def test_by_day(self, report):
+        """Test that days sum their models' costs, unknown if any model has no pricing"""
+        assert report(UsageGroupBy.DAY) == {
+            "2025-01-01": (2, 1_500, 1, 200.0, pytest.approx(CHEAP_COST + STRONG_COST)),
+            "2025-01-02": (1, 200, 0, 200.0, None),
+        }
+
+    def test_by_issue_type(self, report):
+        """Test that usage of conversations not (yet) triaged is grouped as unknown"""
+        assert report(UsageGroupBy.ISSUE_TYPE) == {
+            "delivery": (2, 1_500, 1, 200.0, pytest.approx(CHEAP_COST + STRONG_COST)),
+            "unknown": (1, 200, 0, 200.0, None),
+        }
+
+    def test_by_rag(self, report):
+        """Test that usage is split by whether RAG was enabled"""
+        assert report(UsageGroupBy.RAG) == {
+            "rag_enabled": (2, 1_500, 1, 200.0, pytest.approx(CHEAP_COST + STRONG_COST)),
+            "rag_disabled": (1, 200, 0, 200.0, None),
+        }
+
+    def test_by_model(self, report):
+        """Test that each model is priced at its own rates"""
+        assert report(UsageGroupBy.MODEL) == {
+            "cheap": (1, 1_000, 1, 100.0, pytest.approx(CHEAP_COST)),
+            "strong": (1, 500, 0, 300.0, pytest.approx(STRONG_COST)),
+            "unpriced": (1, 200, 0, 200.0, None),
+        }
+
+    def test_filters(self, report):
+        """Test that usage is filtered by call type and by the [since, until) period"""
+        assert list(report(UsageGroupBy.MODEL, call_type=CallType.SUMMARY)) == ["unpriced"]
+        assert list(
+            report(
+                UsageGroupBy.MODEL,
+                since=datetime(2025, 1, 1, tzinfo=timezone.utc),
+                until=datetime(2025, 1, 2, 12, tzinfo=timezone.utc),
+            )
+        ) == ["cheap", "strong"]
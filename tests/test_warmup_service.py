@@ -0,0 +1,63 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from conversational_agent.services import warmup_service
+from conversational_agent.services.warmup_service import WarmupService
+
+
+class TestWarmupService:
+    """Test priming the process' expensive resources before reporting it ready"""
+
+    @pytest.fixture
+    def delays(self, monkeypatch):
+        """Backoff delays slept (without sleeping them)"""
+        delays = []
+
+        async def sleep(delay: float) -> None:
+            delays.append(delay)
+
+        monkeypatch.setattr(warmup_service.asyncio, "sleep", sleep)
+        return delays
+
+    @pytest.fixture
+    def service(self):
+        service = WarmupService()
+        service._warm_llm_service = AsyncMock()
+        service._warm_database = AsyncMock()
+        return service
+
+    def test_failed_steps_are_retried_with_backoff(self, service, delays):
+        """Test that only failed steps are retried, ever slower, until the process is ready"""
+        service._warm_database.side_effect = [ConnectionError("DB starting up")] * 7 + [None]
+
+        asyncio.run(service.warm_up())
+
+        assert service.ready
+        assert service.failed_steps == []
+        assert service._warm_llm_service.await_count == 1
+        assert service._warm_database.await_count == 8
+        assert delays == [1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 60.0]
+
+    def test_not_ready_while_retrying(self, service, delays):
+        """Test that failing steps are reported until stopped, the process never ready"""
+
+        async def scenario():
+            retried = asyncio.Event()
+
+            async def fail() -> None:
+                # The first attempt's outcome has been recorded once the step is retried
+                if service._warm_database.await_count > 1:
+                    retried.set()
+                raise ConnectionError("DB down")
+
+            service._warm_database.side_effect = fail
+            service._task = asyncio.create_task(service.warm_up())
+            await retried.wait()
+            failed_steps = service.failed_steps
+            await service.stop()
+            return failed_steps
+
+        assert asyncio.run(scenario()) == ["database"]
+        assert not service.ready